@@ -1 +1,4 @@
+import time
 
+# Début de l'import de l'application, référence de la durée de démarrage
+IMPORT_STARTED = time.perf_counter()
@@ -1,14 +1,19 @@
 import os
 from functools import lru_cache
 from pathlib import Path
-from typing import List, Set
+from typing import Any, List, Optional, Set
 
-from dotenv import load_dotenv
-from pydantic import BaseModel, ConfigDict, field_validator
-from pydantic.types import DirectoryPath, PositiveInt
+from pydantic import BaseModel, ConfigDict, Field, field_validator
+from pydantic.types import PositiveInt
 
-# Charger les variables d'environnement depuis le fichier .env
-load_dotenv()
+
+def env(name: str, default: Any) -> Any:
+    """
+    Valeur lue dans l'environnement à la création des paramètres, pas à l'import.
+
+    La chaîne lue est convertie selon le type du champ.
+    """
+    return Field(default_factory=lambda: os.getenv(name, default), validate_default=True)
 
 class Settings(BaseModel):
     # App Info
@@ -23,24 +28,97 @@ class Settings(BaseModel):
     PORT: PositiveInt = 8000
 
     # Upload
-    MAX_UPLOAD_SIZE: int = int(os.getenv("MAX_UPLOAD_SIZE", "10485760"))
+    MAX_UPLOAD_SIZE: int = env("MAX_UPLOAD_SIZE", 10485760)
     ALLOWED_EXTENSIONS: Set[str] = {"pdf", "docx", "doc", "odt", "txt", "rtf"}
-    UPLOAD_DIR: DirectoryPath = Path("uploads")
+    UPLOAD_DIR: Path = env("UPLOAD_DIR", Path("uploads"))
+    MAX_BATCH_FILES: PositiveInt = env("MAX_BATCH_FILES", 40)
+    BATCH_UPLOAD_CONCURRENCY: PositiveInt = env("BATCH_UPLOAD_CONCURRENCY", 4)
+
+    # Stockage des fichiers : bucket Supabase ou disque local sous UPLOAD_DIR
+    STORAGE_BACKEND: str = env("STORAGE_BACKEND", "supabase")  # "supabase" ou "local"
+
+    # Concurrence des I/O
+    STORAGE_MAX_CONCURRENCY: PositiveInt = env("STORAGE_MAX_CONCURRENCY", 20)
+    SNIFF_MAX_WORKERS: PositiveInt = env("SNIFF_MAX_WORKERS", 4)
+
+    # Écritures différées des statuts de temp_files : délai maximal et nombre de fichiers en attente
+    METADATA_FLUSH_INTERVAL: float = env("METADATA_FLUSH_INTERVAL", 1.0)
+    METADATA_MAX_PENDING: PositiveInt = env("METADATA_MAX_PENDING", 500)
+
+    # Cache de déduplication par empreinte de contenu
+    HASH_CACHE_SIZE: PositiveInt = env("HASH_CACHE_SIZE", 1024)
+    HASH_CACHE_TTL: PositiveInt = env("HASH_CACHE_TTL", 3600)
+
+    # File de transformations
+    JOB_CONCURRENCY: PositiveInt = env("JOB_CONCURRENCY", 2)
+    JOB_MAX_RETRIES: int = env("JOB_MAX_RETRIES", 3)
+    JOB_TIMEOUT: PositiveInt = env("JOB_TIMEOUT", 300)
+    JOB_RETRY_BACKOFF: float = env("JOB_RETRY_BACKOFF", 1.0)
+    # Processus de transformation des pages et sections (0 : un par cœur)
+    TRANSFORM_WORKERS: int = env("TRANSFORM_WORKERS", 0)
+
+    # Rendus adaptés produits avec le texte transformé ("html", "docx", "pdf"), séparés par des virgules
+    RENDER_FORMATS: List[str] = env("RENDER_FORMATS", "html,docx,pdf")
+    # Polices TrueType du rendu ; par défaut, la première police adaptée installée
+    RENDER_FONT: Optional[Path] = env("RENDER_FONT", None)
+    RENDER_BOLD_FONT: Optional[Path] = env("RENDER_BOLD_FONT", None)
+
+    # Nettoyage des fichiers expirés (intervalle 0 : désactivé)
+    CLEANUP_INTERVAL: int = env("CLEANUP_INTERVAL", 3600)
+    CLEANUP_PAGE_SIZE: PositiveInt = env("CLEANUP_PAGE_SIZE", 500)
+    CLEANUP_BATCH_SIZE: PositiveInt = env("CLEANUP_BATCH_SIZE", 100)
+    CLEANUP_CONCURRENCY: PositiveInt = env("CLEANUP_CONCURRENCY", 2)
+
+    # Service LLM, utilisé pour adapter les blocs s'il est activé
+    LLM_ENABLED: bool = env("LLM_ENABLED", False)
+    LLM_BACKEND: str = env("LLM_BACKEND", "http")  # "http" ou "local"
+    LLM_SERVICE_URL: str = env("LLM_SERVICE_URL", "http://llm-service:5001")
+    # Modèle exigé du service (nom de son backend : "rules", "mistral"), vide pour accepter celui qu'il sert
+    LLM_MODEL: str = env("LLM_MODEL", "")
+    LLM_BATCH_SIZE: PositiveInt = env("LLM_BATCH_SIZE", 16)
+    LLM_BATCH_WAIT_MS: PositiveInt = env("LLM_BATCH_WAIT_MS", 20)
+    LLM_CACHE_PATH: Path = env("LLM_CACHE_PATH", Path("cache/llm.sqlite3"))
 
     # API Keys
     API_KEY_HUGGING_FACE: str = ""
 
     # Sécurité
     CORS_ORIGINS: List[str] = ["http://localhost:3000"]
-    RATE_LIMIT_PER_MINUTE: PositiveInt = 60
+    RATE_LIMIT_PER_MINUTE: PositiveInt = env("RATE_LIMIT_PER_MINUTE", 60)
+    RATE_LIMIT_BURST: PositiveInt = env("RATE_LIMIT_BURST", 20)
+    RATE_LIMIT_BACKEND: str = env("RATE_LIMIT_BACKEND", "memory")  # "memory" ou "redis"
+    RATE_LIMIT_REDIS_URL: str = env("RATE_LIMIT_REDIS_URL", "redis://localhost:6379/0")
+    RATE_LIMIT_TRUST_PROXY: bool = env("RATE_LIMIT_TRUST_PROXY", False)
+    # Clés d'API reconnues (séparées par des virgules), chacune avec son propre seau
+    RATE_LIMIT_API_KEYS: Set[str] = env("RATE_LIMIT_API_KEYS", "")
+    # Contrôle d'admission des uploads
+    MAX_INFLIGHT_UPLOADS: PositiveInt = env("MAX_INFLIGHT_UPLOADS", 16)
+    MAX_PENDING_JOBS: PositiveInt = env("MAX_PENDING_JOBS", 200)
+    SIGNATURES_FILE: Path = env("SIGNATURES_FILE", Path("app/services/signatures.txt"))
 
     # Logging
     LOG_LEVEL: str = "INFO"
 
-    @field_validator("UPLOAD_DIR")
-    def create_upload_dir(cls, v):
-        v.mkdir(parents=True, exist_ok=True)
-        return v
+    # Démarrage : création des services avant la première requête, durée attendue
+    WARM_UP: bool = env("WARM_UP", False)
+    STARTUP_BUDGET_MS: PositiveInt = env("STARTUP_BUDGET_MS", 2000)
+
+    # Métriques Prometheus exposées sur /metrics
+    METRICS_ENABLED: bool = env("METRICS_ENABLED", True)
+
+    @field_validator("RENDER_FORMATS", mode="before")
+    @classmethod
+    def split_formats(cls, value: Any) -> Any:
+        if isinstance(value, str):
+            return [item.strip().lower() for item in value.split(",") if item.strip()]
+        return value
+
+    @field_validator("RATE_LIMIT_API_KEYS", mode="before")
+    @classmethod
+    def split_keys(cls, value: Any) -> Any:
+        if isinstance(value, str):
+            return {item.strip() for item in value.split(",") if item.strip()}
+        return value
 
     class Config:
         model_config = ConfigDict(
@@ -51,4 +129,13 @@ class Settings(BaseModel):
 
 @lru_cache()
 def get_settings() -> Settings:
+    """
+    Paramètres de l'application, lus une seule fois, au premier appel.
+
+    Le fichier .env est chargé à ce moment-là et non à l'import du module ;
+    les variables déjà définies dans l'environnement restent prioritaires.
+    """
+    from dotenv import load_dotenv
+
+    load_dotenv()
     return Settings()
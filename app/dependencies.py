@@ -0,0 +1,135 @@
+"""
+Services partagés de l'application, créés à leur première utilisation.
+
+Aucun service n'est construit à l'import des modules : les routes les
+reçoivent par injection de dépendances (Depends) et le cycle de vie de
+l'application démarre ceux qui tournent en tâche de fond. Les tests
+remplacent un service via `app.dependency_overrides`.
+"""
+import logging
+from functools import lru_cache
+from typing import Callable
+
+from .config import get_settings
+from .services.cleanup import ExpiredFileSweeper
+from .services.file_validator import FileValidator
+from .services.job_queue import Job, JobQueue
+from .services.llm_client import LLMTransform
+from .services.progress import ProgressBroker
+from .services.supabase_service import SupabaseService
+from .services.transformation import TransformationService
+from .static_assets import get_static_files
+from .templating import get_templates
+
+logger = logging.getLogger(__name__)
+
+settings = get_settings()
+
+
+@lru_cache()
+def get_file_validator() -> FileValidator:
+    return FileValidator()
+
+
+@lru_cache()
+def get_supabase_service() -> SupabaseService:
+    return SupabaseService()
+
+
+@lru_cache()
+def get_progress_broker() -> ProgressBroker:
+    return ProgressBroker()
+
+
+@lru_cache()
+def get_transformation_service() -> TransformationService:
+    if settings.LLM_ENABLED:
+        # Un thread par texte d'un lot : les unités d'un document remplissent les lots du client
+        return TransformationService(
+            get_supabase_service(), broker=get_progress_broker(),
+            transform_block=LLMTransform(), unit_threads=settings.LLM_BATCH_SIZE
+        )
+    return TransformationService(get_supabase_service(), broker=get_progress_broker())
+
+
+async def run_transformation(job: Job) -> str:
+    return await get_transformation_service().run(job)
+
+
+async def mark_transformation_failed(job: Job) -> None:
+    await get_transformation_service().mark_failed(job)
+
+
+@lru_cache()
+def get_job_queue() -> JobQueue:
+    # Le service de transformation n'est créé qu'à l'exécution de la première tâche
+    return JobQueue(
+        run_transformation,
+        concurrency=settings.JOB_CONCURRENCY,
+        max_retries=settings.JOB_MAX_RETRIES,
+        timeout=settings.JOB_TIMEOUT,
+        backoff=settings.JOB_RETRY_BACKOFF,
+        on_failure=mark_transformation_failed
+    )
+
+
+@lru_cache()
+def get_sweeper() -> ExpiredFileSweeper:
+    return ExpiredFileSweeper(
+        get_supabase_service(),
+        interval=settings.CLEANUP_INTERVAL,
+        page_size=settings.CLEANUP_PAGE_SIZE,
+        batch_size=settings.CLEANUP_BATCH_SIZE,
+        concurrency=settings.CLEANUP_CONCURRENCY,
+        render_formats=settings.RENDER_FORMATS
+    )
+
+
+def is_created(provider: Callable) -> bool:
+    """Indique si le service d'un fournisseur a déjà été créé."""
+    return provider.cache_info().currsize > 0
+
+
+async def warm_up() -> None:
+    """
+    Crée les services et charge leurs ressources avant la première requête.
+
+    La base libmagic est chargée dans un thread du pool de détection, les
+    templates de la page d'accueil sont compilés, les fichiers statiques lus
+    et compressés et les clients HTTP de Supabase construits.
+    """
+    await get_file_validator().sniff(b"%PDF-1.7\n")
+    get_transformation_service()
+    get_templates().get_template("index.html")
+    get_static_files().load()
+
+
+PROVIDERS = (
+    get_file_validator,
+    get_supabase_service,
+    get_progress_broker,
+    get_transformation_service,
+    get_job_queue,
+    get_sweeper,
+)
+
+
+async def shutdown() -> None:
+    """
+    Arrête les services créés, sans créer ceux qui ne l'ont jamais été.
+
+    Les services arrêtés sont oubliés : un redémarrage de l'application
+    (rechargement, tests) en crée de nouveaux.
+    """
+    if is_created(get_sweeper):
+        await get_sweeper().stop()
+    if is_created(get_job_queue):
+        await get_job_queue().stop()
+    if is_created(get_transformation_service):
+        get_transformation_service().shutdown()
+    if is_created(get_supabase_service):
+        # Fermeture des connexions conservées vers Supabase
+        await get_supabase_service().close()
+
+    for provider in PROVIDERS:
+        provider.cache_clear()
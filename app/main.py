@@ -1,19 +1,96 @@
+import logging
+import time
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI, Request
-from fastapi.staticfiles import StaticFiles
-from fastapi.templating import Jinja2Templates
 from fastapi.middleware.cors import CORSMiddleware
+from . import IMPORT_STARTED
 from .config import get_settings
-from .routes import upload
+from .dependencies import get_job_queue, get_sweeper, shutdown, warm_up
+from .middleware.body_limit import BodySizeLimitMiddleware
+from .middleware.metrics import MetricsMiddleware
+from .middleware.rate_limit import MemoryBucketStore, RateLimitMiddleware, RedisBucketStore
+from .routes import download, jobs, metrics, progress, upload
+from .services.metrics import registry
+from .static_assets import get_static_files
+from .templating import cached_page
+
+logger = logging.getLogger(__name__)
 
 settings = get_settings()
 
+startup_seconds = registry.gauge(
+    "todys_startup_seconds", "Durée du démarrage, de l'import de l'application à la première requête acceptée"
+)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await get_job_queue().start()
+    if settings.CLEANUP_INTERVAL:
+        await get_sweeper().start()
+    if settings.WARM_UP:
+        await warm_up()
+
+    elapsed = time.perf_counter() - IMPORT_STARTED
+    startup_seconds.set(elapsed)
+    if elapsed * 1000 > settings.STARTUP_BUDGET_MS:
+        logger.warning(
+            "Démarrage plus long que prévu",
+            extra={"startup_ms": round(elapsed * 1000), "budget_ms": settings.STARTUP_BUDGET_MS}
+        )
+    else:
+        logger.info("Application démarrée", extra={"startup_ms": round(elapsed * 1000)})
+    yield
+    await shutdown()
+
 app = FastAPI(
     title=settings.APP_TITLE,
     description=settings.APP_DESCRIPTION,
-    version=settings.APP_VERSION
+    version=settings.APP_VERSION,
+    lifespan=lifespan
 )
 
-# Configuration CORS
+# Rejet des uploads trop volumineux avant la lecture du corps
+app.add_middleware(
+    BodySizeLimitMiddleware,
+    limits={
+        "/api/upload": settings.MAX_UPLOAD_SIZE,
+        "/api/upload/batch": settings.MAX_UPLOAD_SIZE * settings.MAX_BATCH_FILES,
+    },
+)
+
+# Limitation de débit par client et plafond d'uploads simultanés
+def transformations_saturated() -> bool:
+    """Trop de transformations en attente ou en cours pour accepter de nouveaux uploads."""
+    return get_job_queue().active >= settings.MAX_PENDING_JOBS
+
+rate_limit_store = (
+    RedisBucketStore(settings.RATE_LIMIT_REDIS_URL) if settings.RATE_LIMIT_BACKEND == "redis"
+    else MemoryBucketStore()
+)
+app.add_middleware(
+    RateLimitMiddleware,
+    store=rate_limit_store,
+    rate=settings.RATE_LIMIT_PER_MINUTE / 60,
+    capacity=settings.RATE_LIMIT_BURST,
+    # Suivi des tâches (relu toutes les 2 s) et flux d'avancement
+    exempt_prefixes=("/api/jobs/", "/api/progress/"),
+    admission_paths=("/api/upload", "/api/upload/batch"),
+    max_in_flight=settings.MAX_INFLIGHT_UPLOADS,
+    is_overloaded=transformations_saturated,
+    trust_forwarded=settings.RATE_LIMIT_TRUST_PROXY,
+    api_keys=settings.RATE_LIMIT_API_KEYS,
+)
+
+# Durée et nombre de requêtes en cours par route, refus compris
+app.add_middleware(MetricsMiddleware, registry=registry, routes=app.router.routes)
+registry.gauge(
+    "todys_job_queue_depth",
+    "Transformations en attente ou en cours",
+    function=lambda: get_job_queue().active
+)
+
+# Configuration CORS, ajoutée en dernier pour envelopper aussi les refus 413/429/503
 app.add_middleware(
     CORSMiddleware,
     allow_origins=settings.CORS_ORIGINS,
@@ -22,14 +99,16 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-templates = Jinja2Templates(directory="app/frontend/templates")
-
-# Montage des fichiers statiques
-app.mount("/static", StaticFiles(directory="app/frontend/static"), name="static")
+# Montage des fichiers statiques, servis depuis la mémoire sous une adresse versionnée
+app.mount("/static", get_static_files(), name="static")
 
 # Routes API
 app.include_router(upload.router, tags=["upload"])
+app.include_router(jobs.router, tags=["jobs"])
+app.include_router(download.router, tags=["download"])
+app.include_router(progress.router, tags=["progress"])
+app.include_router(metrics.router, tags=["metrics"])
 
-@app.get("/")
+@app.api_route("/", methods=["GET", "HEAD"])
 async def read_root(request: Request):
-    return templates.TemplateResponse("index.html", {"request": request})
+    return cached_page(request, "index.html")
@@ -0,0 +1,60 @@
+"""
+Middleware limitant la taille des corps de requête.
+"""
+from typing import Dict
+
+from fastapi import HTTPException
+from fastapi.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+# Marge accordée à l'enveloppe multipart (bordures, en-têtes des parties)
+MULTIPART_OVERHEAD = 16 * 1024
+
+
+class BodySizeLimitMiddleware:
+    """
+    Rejette les corps de requête trop volumineux avant qu'ils ne soient lus.
+
+    Un Content-Length trop grand est refusé immédiatement avec une 413. Sans
+    Content-Length (transfert chunked), les octets reçus sont comptés et la
+    lecture est interrompue dès que la limite est franchie.
+    """
+
+    def __init__(self, app: ASGIApp, limits: Dict[str, int]):
+        """
+        Args:
+            app: Application ASGI encapsulée
+            limits: Taille maximale du contenu uploadé, en octets, par chemin de route.
+                L'enveloppe multipart s'y ajoute via MULTIPART_OVERHEAD.
+        """
+        self.app = app
+        self.limits = limits
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        max_size = self.limits.get(scope.get("path")) if scope["type"] == "http" else None
+        if max_size is None:
+            await self.app(scope, receive, send)
+            return
+
+        limit = max_size + MULTIPART_OVERHEAD
+        detail = "Le fichier depasse la taille maximale de {}MB".format(max_size / 1024 / 1024)
+
+        content_length = dict(scope["headers"]).get(b"content-length")
+        if content_length is not None and content_length.isdigit() and int(content_length) > limit:
+            response = JSONResponse(status_code=413, content={"detail": detail})
+            await response(scope, receive, send)
+            return
+
+        received = 0
+
+        async def limited_receive() -> Message:
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > limit:
+                    raise HTTPException(status_code=413, detail=detail)
+            return message
+
+        await self.app(scope, limited_receive, send)
+
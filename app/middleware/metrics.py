@@ -0,0 +1,70 @@
+"""
+Middleware de mesure des requêtes HTTP.
+"""
+import time
+from typing import List
+
+from starlette.routing import BaseRoute, Match
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from ..services.metrics import REQUEST_SECONDS, REQUESTS_IN_FLIGHT, Registry
+
+# Étiquette des chemins ne correspondant à aucune route, pour borner la cardinalité
+UNMATCHED_ROUTE = "unmatched"
+
+
+class MetricsMiddleware:
+    """
+    Mesure la durée des requêtes et le nombre de requêtes en cours, par route.
+
+    Les requêtes sont étiquetées par le gabarit de leur route
+    (/api/jobs/{job_id}) et non par leur chemin, pour que le nombre de
+    séries reste borné.
+    """
+
+    def __init__(self, app: ASGIApp, registry: Registry, routes: List[BaseRoute], excluded_paths=("/metrics",)):
+        """
+        Args:
+            app: Application ASGI encapsulée
+            registry: Registre des métriques ; rien n'est mesuré s'il est désactivé
+            routes: Routes de l'application, consultées à chaque requête
+            excluded_paths: Chemins non mesurés
+        """
+        self.app = app
+        self.registry = registry
+        self.routes = routes
+        self.excluded_paths = frozenset(excluded_paths)
+
+    def route_label(self, scope: Scope) -> str:
+        for route in self.routes:
+            match, _ = route.matches(scope)
+            if match is Match.FULL:
+                return getattr(route, "path", UNMATCHED_ROUTE)
+        return UNMATCHED_ROUTE
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not self.registry.enabled or scope["path"] in self.excluded_paths:
+            await self.app(scope, receive, send)
+            return
+
+        route = self.route_label(scope)
+        status_code = 500
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        REQUESTS_IN_FLIGHT.inc(route=route)
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            REQUESTS_IN_FLIGHT.dec(route=route)
+            REQUEST_SECONDS.observe(
+                time.perf_counter() - started,
+                method=scope["method"],
+                route=route,
+                status=str(status_code)
+            )
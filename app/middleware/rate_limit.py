@@ -0,0 +1,208 @@
+"""
+Middleware de limitation de débit et de contrôle d'admission.
+"""
+import hashlib
+import math
+import time
+from typing import Callable, Iterable, Optional, Protocol, Tuple
+
+from fastapi.responses import JSONResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from ..services.cache import TTLCache
+
+
+class BucketStore(Protocol):
+    """Stockage des seaux de jetons, local ou partagé entre instances."""
+
+    async def take(self, key: str, rate: float, capacity: float) -> float:
+        """
+        Prélève un jeton dans le seau d'un client.
+
+        Returns:
+            float: 0 si le jeton est accordé, sinon le délai en secondes avant
+                qu'un jeton soit disponible
+        """
+        ...
+
+
+class MemoryBucketStore:
+    """Seaux de jetons en mémoire, propres à l'instance."""
+
+    def __init__(self, maxsize: int = 100_000, clock: Callable[[], float] = time.monotonic):
+        self._clock = clock
+        # Un seau redevenu plein équivaut à un seau absent : il peut être évincé
+        self._buckets: TTLCache[str, Tuple[float, float]] = TTLCache(maxsize=maxsize, ttl=float("inf"), clock=clock)
+
+    async def take(self, key: str, rate: float, capacity: float) -> float:
+        now = self._clock()
+        tokens, updated = self._buckets.get(key) or (capacity, now)
+        tokens = min(capacity, tokens + (now - updated) * rate)
+        if tokens >= 1:
+            tokens -= 1
+            wait = 0.0
+        else:
+            wait = (1 - tokens) / rate
+        self._buckets.set(key, (tokens, now), ttl=(capacity - tokens) / rate + 1)
+        return wait
+
+    def clear(self) -> None:
+        self._buckets.clear()
+
+
+# Même algorithme que MemoryBucketStore, exécuté atomiquement par Redis
+REDIS_TAKE = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local now = tonumber(ARGV[3])
+local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'updated')
+local tokens = tonumber(bucket[1]) or capacity
+local updated = tonumber(bucket[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - updated) * rate)
+local wait = 0
+if tokens >= 1 then
+  tokens = tokens - 1
+else
+  wait = (1 - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'updated', now)
+redis.call('PEXPIRE', KEYS[1], math.ceil(((capacity - tokens) / rate + 1) * 1000))
+return tostring(wait)
+"""
+
+
+class RedisBucketStore:
+    """
+    Seaux de jetons partagés par toutes les instances, stockés dans Redis.
+
+    Nécessite le paquet redis, importé seulement si ce stockage est utilisé.
+    """
+
+    def __init__(self, url: str, prefix: str = "todys:ratelimit:"):
+        from redis.asyncio import Redis
+
+        self._redis = Redis.from_url(url)
+        self._take = self._redis.register_script(REDIS_TAKE)
+        self.prefix = prefix
+
+    async def take(self, key: str, rate: float, capacity: float) -> float:
+        wait = await self._take(keys=[self.prefix + key], args=[capacity, rate, time.time()])
+        return float(wait)
+
+
+class RateLimitMiddleware:
+    """
+    Limite le débit de chaque client et le nombre d'uploads simultanés.
+
+    Chaque client (clé d'API reconnue, à défaut adresse IP) dispose d'un seau de
+    jetons rempli à `rate` jetons par seconde, jusqu'à `capacity` ; une
+    requête sans jeton disponible reçoit une 429. Les lectures fréquentes et
+    bon marché (suivi d'une tâche, flux d'avancement) en sont exemptées, pour
+    qu'une page ouverte n'épuise pas le seau de son client. Les uploads sont en outre
+    soumis à un plafond global de requêtes en cours et refusés avec une 503
+    quand ce plafond est atteint ou que le service est surchargé. Les deux
+    réponses portent un en-tête Retry-After.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        store: BucketStore,
+        rate: float,
+        capacity: float,
+        limited_prefix: str = "/api/",
+        exempt_prefixes: Iterable[str] = (),
+        admission_paths: Iterable[str] = (),
+        max_in_flight: Optional[int] = None,
+        is_overloaded: Optional[Callable[[], bool]] = None,
+        trust_forwarded: bool = False,
+        busy_retry_after: int = 1,
+        api_keys: Iterable[str] = (),
+    ):
+        """
+        Args:
+            app: Application ASGI encapsulée
+            store: Stockage des seaux de jetons
+            rate: Jetons accordés par seconde à chaque client
+            capacity: Nombre maximal de jetons accumulés (rafale autorisée)
+            limited_prefix: Préfixe des chemins soumis à la limite de débit
+            exempt_prefixes: Préfixes des chemins exemptés de cette limite
+            admission_paths: Chemins soumis au plafond de requêtes en cours
+            max_in_flight: Plafond de requêtes en cours sur ces chemins
+            is_overloaded: Indique si le service doit refuser ces chemins
+                (par exemple une file de transformations saturée)
+            trust_forwarded: Identifier le client par X-Forwarded-For
+                (uniquement derrière un proxy de confiance)
+            busy_retry_after: Retry-After des réponses 503, en secondes
+            api_keys: Clés d'API reconnues ; une clé inconnue est ignorée,
+                pour qu'une clé inventée ne donne pas droit à un seau neuf
+        """
+        self.app = app
+        self.store = store
+        self.rate = rate
+        self.capacity = capacity
+        self.limited_prefix = limited_prefix
+        self.exempt_prefixes = tuple(exempt_prefixes)
+        self.admission_paths = frozenset(admission_paths)
+        self.max_in_flight = max_in_flight
+        self.is_overloaded = is_overloaded
+        self.trust_forwarded = trust_forwarded
+        self.busy_retry_after = busy_retry_after
+        self.in_flight = 0
+        # Seules les empreintes des clés sont conservées
+        self._api_keys = frozenset(self._digest(key.encode()) for key in api_keys)
+
+    @staticmethod
+    def _digest(api_key: bytes) -> str:
+        return hashlib.sha256(api_key).hexdigest()[:32]
+
+    def client_key(self, scope: Scope) -> str:
+        """Identifie le client : clé d'API reconnue si fournie, sinon adresse IP."""
+        headers = dict(scope["headers"])
+        api_key = headers.get(b"x-api-key")
+        if api_key:
+            digest = self._digest(api_key)
+            if digest in self._api_keys:
+                return "key:" + digest
+
+        forwarded = headers.get(b"x-forwarded-for") if self.trust_forwarded else None
+        if forwarded:
+            return "ip:" + forwarded.split(b",")[0].strip().decode("latin-1")
+        client = scope.get("client")
+        return "ip:" + (client[0] if client else "unknown")
+
+    @staticmethod
+    def _reject(status_code: int, detail: str, retry_after: float) -> JSONResponse:
+        return JSONResponse(
+            status_code=status_code,
+            content={"detail": detail},
+            headers={"Retry-After": str(max(1, math.ceil(retry_after)))}
+        )
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not scope["path"].startswith(self.limited_prefix) \
+                or scope["path"].startswith(self.exempt_prefixes):
+            await self.app(scope, receive, send)
+            return
+
+        wait = await self.store.take(self.client_key(scope), self.rate, self.capacity)
+        if wait > 0:
+            response = self._reject(429, "Trop de requêtes, réessayez plus tard", wait)
+            await response(scope, receive, send)
+            return
+
+        if scope["path"] not in self.admission_paths:
+            await self.app(scope, receive, send)
+            return
+
+        busy = self.max_in_flight is not None and self.in_flight >= self.max_in_flight
+        if busy or (self.is_overloaded is not None and self.is_overloaded()):
+            response = self._reject(503, "Service surchargé, réessayez plus tard", self.busy_retry_after)
+            await response(scope, receive, send)
+            return
+
+        self.in_flight += 1
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.in_flight -= 1
@@ -0,0 +1,227 @@
+"""
+Routes pour le téléchargement des documents transformés.
+"""
+import hashlib
+import mimetypes
+from pathlib import Path
+from typing import Any, Dict, Optional
+from urllib.parse import quote
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import FileResponse, JSONResponse, Response, StreamingResponse
+from starlette.background import BackgroundTask
+from starlette.types import Receive, Scope, Send
+
+from ..config import get_settings
+from ..dependencies import get_supabase_service, get_transformation_service
+from ..services.storage import SINGLE_RANGE
+from ..services.supabase_service import SupabaseService
+from ..services.transformation import TransformationService
+
+settings = get_settings()
+
+router = APIRouter()
+
+# Taille des morceaux relayés au client
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+
+# En-têtes du stockage relayés tels quels au client
+FORWARDED_HEADERS = ("content-length", "content-range", "content-encoding")
+
+# Extensions ASGI par lesquelles le serveur envoie lui-même un fichier
+ZERO_COPY_SEND = "http.response.zerocopysend"
+PATH_SEND = "http.response.pathsend"
+
+
+class LocalFileResponse(FileResponse):
+    """
+    Fichier du stockage local, confié au serveur ASGI quand il sait l'envoyer.
+
+    Avec l'extension zerocopysend, le noyau copie le fichier, ou la plage
+    demandée, vers la socket (sendfile) ; avec pathsend, le serveur envoie
+    lui-même le fichier entier. Sinon, il est lu par morceaux, comme avec
+    FileResponse.
+    """
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        self._extensions = scope.get("extensions") or {}
+        await super().__call__(scope, receive, send)
+
+    async def _handle_simple(self, send: Send, send_header_only: bool) -> None:
+        if send_header_only or not (ZERO_COPY_SEND in self._extensions or PATH_SEND in self._extensions):
+            await super()._handle_simple(send, send_header_only)
+            return
+        await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+        if ZERO_COPY_SEND in self._extensions:
+            await self._send_file(send, 0, int(self.headers["content-length"]))
+        else:
+            await send({"type": PATH_SEND, "path": str(self.path)})
+
+    async def _handle_single_range(self, send: Send, start: int, end: int, file_size: int,
+                                   send_header_only: bool) -> None:
+        if send_header_only or ZERO_COPY_SEND not in self._extensions:
+            await super()._handle_single_range(send, start, end, file_size, send_header_only)
+            return
+        self.headers["content-range"] = f"bytes {start}-{end - 1}/{file_size}"
+        self.headers["content-length"] = str(end - start)
+        await send({"type": "http.response.start", "status": 206, "headers": self.raw_headers})
+        await self._send_file(send, start, end - start)
+
+    async def _send_file(self, send: Send, offset: int, count: int) -> None:
+        with open(self.path, "rb") as file:
+            await send({"type": ZERO_COPY_SEND, "file": file, "offset": offset, "count": count, "more_body": False})
+
+
+def transformed_etag(record: Dict[str, Any], output_format: Optional[str] = None) -> str:
+    """
+    ETag fort d'un document transformé.
+
+    Dérivé de l'empreinte du document d'origine, de la date de sa
+    transformation et du format demandé : une nouvelle transformation change
+    l'ETag.
+    """
+    version = f"{record.get('content_hash') or record['id']}:{record.get('processed_at') or ''}"
+    if output_format:
+        version += f":{output_format}"
+    return '"{}"'.format(hashlib.sha256(version.encode("utf-8")).hexdigest()[:32])
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """Comparaison faible de If-None-Match, comme le prévoit la RFC 9110."""
+    if if_none_match.strip() == "*":
+        return True
+    candidates = (candidate.strip() for candidate in if_none_match.split(","))
+    return any(candidate.removeprefix("W/") == etag for candidate in candidates)
+
+
+def download_name(record: Dict[str, Any], object_path: str) -> str:
+    suffix = Path(object_path).suffix or ".txt"
+    return f"{Path(record['file_name']).stem}{suffix}"
+
+
+def content_headers(name: str) -> Dict[str, str]:
+    content_type = mimetypes.guess_type(name)[0] or "application/octet-stream"
+    if content_type.startswith("text/"):
+        content_type += "; charset=utf-8"
+    return {
+        "content-type": content_type,
+        "content-disposition": f"attachment; filename*=UTF-8''{quote(name)}",
+    }
+
+
+def requested_range(request: Request, etag: str) -> Optional[str]:
+    """
+    Plage demandée, si elle est valide et toujours applicable à ce document.
+
+    Une seule plage est prise en charge, les autres formes sont ignorées ;
+    ses bornes sont résolues par le stockage, qui connaît la taille (`parse_range`).
+    """
+    byte_range = (request.headers.get("range") or "").strip()
+    match = SINGLE_RANGE.match(byte_range)
+    if match is None or match.groups() == ("", ""):
+        return None
+    # If-Range : la plage ne vaut que pour la version connue du client
+    if_range = request.headers.get("if-range")
+    if if_range is not None and if_range.strip() != etag:
+        return None
+    return byte_range
+
+
+@router.get("/api/download/{file_id}")
+async def download(
+    file_id: str,
+    request: Request,
+    output_format: Optional[str] = Query(None, alias="format"),
+    supabase_service: SupabaseService = Depends(get_supabase_service),
+    transformation_service: TransformationService = Depends(get_transformation_service)
+):
+    """
+    Télécharge le document transformé d'un fichier.
+
+    Le document est relayé depuis le stockage par morceaux, sans être chargé
+    en mémoire ; depuis le stockage local, il est envoyé directement depuis
+    le disque (`LocalFileResponse`). Les requêtes Range (une plage) et
+    If-None-Match sont prises en charge. Pendant la transformation, les pages déjà produites sont
+    envoyées au fil de l'eau jusqu'à la fin du document.
+
+    Args:
+        file_id: L'identifiant du fichier
+        request: Requête HTTP, dont les en-têtes conditionnels
+        output_format: Rendu adapté demandé ("html", "docx", "pdf") ; par défaut
+            le texte transformé
+        supabase_service, transformation_service: Services injectés
+
+    Returns:
+        Response: Le document (200 ou 206), 304 s'il n'a pas changé, ou 202
+            si sa transformation n'a pas encore commencé
+
+    Raises:
+        HTTPException: Si le fichier est inconnu, le format non produit ou la
+            transformation en échec
+    """
+    output_format = output_format.lower() if output_format else None
+    if output_format is not None and output_format not in settings.RENDER_FORMATS:
+        raise HTTPException(status_code=404, detail=f"Format {output_format} non disponible")
+
+    # Transformation en cours dans ce processus : envoi progressif du texte, sans ETag ni plage
+    live = transformation_service.live_output(file_id) if output_format is None else None
+    if live is not None:
+        return StreamingResponse(
+            live.follow(DOWNLOAD_CHUNK_SIZE),
+            headers={**content_headers(live.path.name), "cache-control": "no-store"}
+        )
+
+    record = await supabase_service.get_file(file_id)
+    if record is None:
+        raise HTTPException(status_code=404, detail="Fichier introuvable")
+
+    if record.get("status") == "failed":
+        raise HTTPException(status_code=409, detail="La transformation a échoué")
+
+    if record.get("status") != "processed" or not record.get("transformed_file_path"):
+        return JSONResponse(
+            status_code=202,
+            content={"status": record.get("status"), "detail": "Transformation en cours"},
+            headers={"retry-after": "2"}
+        )
+
+    object_path = record["transformed_file_path"]
+    if output_format is not None:
+        # Les rendus sont stockés à côté du texte, sous la même racine
+        object_path = str(Path(object_path).with_suffix(f".{output_format}"))
+
+    etag = transformed_etag(record, output_format)
+    cache_headers = {"etag": etag, "cache-control": "private, no-cache"}
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None and etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=cache_headers)
+
+    headers = {**content_headers(download_name(record, object_path)), **cache_headers}
+
+    local_file = supabase_service.local_path(object_path)
+    if local_file is not None:
+        if not local_file.is_file():
+            raise HTTPException(status_code=404, detail="Document transformé introuvable")
+        # Range et If-Range sont traités par la réponse, avec le même ETag
+        return LocalFileResponse(local_file, headers=headers)
+
+    upstream = await supabase_service.open_object(object_path, requested_range(request, etag))
+    if upstream.status_code not in (200, 206, 416):
+        await upstream.aclose()
+        if upstream.status_code == 404:
+            raise HTTPException(status_code=404, detail="Document transformé introuvable")
+        raise HTTPException(status_code=502, detail="Stockage indisponible")
+
+    headers = {
+        **headers,
+        "accept-ranges": "bytes",
+        **{name: upstream.headers[name] for name in FORWARDED_HEADERS if name in upstream.headers},
+    }
+    return StreamingResponse(
+        # Relais des octets bruts : Content-Length et Content-Encoding restent exacts
+        upstream.aiter_raw(DOWNLOAD_CHUNK_SIZE),
+        status_code=upstream.status_code,
+        headers=headers,
+        background=BackgroundTask(upstream.aclose)
+    )
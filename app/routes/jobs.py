@@ -0,0 +1,60 @@
+"""
+Routes pour le suivi des tâches de transformation.
+"""
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.responses import HTMLResponse
+
+from ..dependencies import get_job_queue
+from ..schemas.jobs import JobResponse
+from ..services.job_queue import Job, JobQueue, JobStatus
+from ..templating import get_templates
+
+router = APIRouter()
+
+def get_job_or_404(job_queue: JobQueue, job_id: str) -> Job:
+    job = job_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Tâche introuvable")
+    return job
+
+@router.get("/api/jobs/{job_id}", response_model=JobResponse)
+async def get_job(job_id: str, job_queue: JobQueue = Depends(get_job_queue)) -> JobResponse:
+    """
+    Retourne l'état d'une tâche de transformation.
+
+    Args:
+        job_id: Identifiant de la tâche
+        job_queue: File des transformations
+
+    Returns:
+        JobResponse: État courant de la tâche
+
+    Raises:
+        HTTPException: Si la tâche est inconnue ou expirée
+    """
+    job = get_job_or_404(job_queue, job_id)
+    return JobResponse(
+        id=job.id,
+        file_id=job.file_id,
+        status=job.status.value,
+        attempts=job.attempts,
+        progress=job.progress,
+        finished=job.is_finished,
+        transformed_file_path=job.result if job.status == JobStatus.SUCCEEDED else None,
+        error=job.error,
+        created_at=job.created_at,
+        updated_at=job.updated_at
+    )
+
+@router.get("/api/jobs/{job_id}/fragment", response_class=HTMLResponse)
+async def get_job_fragment(request: Request, job_id: str, job_queue: JobQueue = Depends(get_job_queue)):
+    """
+    Fragment HTML de l'état d'une tâche, pour un polling HTMX.
+
+    Le fragment se recharge lui-même tant que la tâche n'est pas terminée.
+    """
+    job = get_job_or_404(job_queue, job_id)
+    return get_templates().TemplateResponse(
+        "components/_job_status.html",
+        {"request": request, "job": job}
+    )
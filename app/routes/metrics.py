@@ -0,0 +1,23 @@
+"""
+Route d'exposition des métriques Prometheus.
+"""
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import PlainTextResponse
+
+from ..services.metrics import registry
+
+router = APIRouter()
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+@router.get("/metrics", include_in_schema=False)
+async def metrics() -> PlainTextResponse:
+    """
+    Métriques de l'application au format texte de Prometheus.
+
+    Raises:
+        HTTPException: Si les métriques sont désactivées
+    """
+    if not registry.enabled:
+        raise HTTPException(status_code=404, detail="Not Found")
+    return PlainTextResponse(registry.render(), media_type=CONTENT_TYPE)
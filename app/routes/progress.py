@@ -0,0 +1,79 @@
+"""
+Routes pour le suivi en direct des transformations (Server-Sent Events).
+"""
+from typing import AsyncIterator, Optional
+
+from fastapi import APIRouter, Depends
+from fastapi.responses import StreamingResponse
+
+from ..dependencies import get_progress_broker, get_supabase_service
+from ..services.progress import ProgressBroker, ProgressEvent, Stage
+from ..services.supabase_service import SupabaseService
+
+router = APIRouter()
+
+# Intervalle des commentaires de maintien de connexion, en secondes
+KEEPALIVE_INTERVAL = 15.0
+
+# Étape correspondant à un statut temp_files, pour un fichier sans événement connu
+STATUS_STAGES = {
+    "uploaded": Stage.UPLOADED,
+    "processing": Stage.EXTRACTING,
+    "processed": Stage.READY,
+    "failed": Stage.FAILED,
+}
+
+
+async def initial_event(
+    file_id: str, progress_broker: ProgressBroker, supabase_service: SupabaseService
+) -> Optional[ProgressEvent]:
+    """État d'un fichier dont aucun événement n'a été publié dans ce processus."""
+    if progress_broker.last(file_id) is not None:
+        return None
+    record = await supabase_service.get_file(file_id)
+    if record is None:
+        return ProgressEvent(file_id, Stage.FAILED, detail="Fichier introuvable")
+    return ProgressEvent(file_id, STATUS_STAGES.get(record.get("status"), Stage.UPLOADED))
+
+
+async def event_stream(
+    file_id: str, progress_broker: ProgressBroker, supabase_service: SupabaseService
+) -> AsyncIterator[str]:
+    # Indique au navigateur le délai de reconnexion en cas de coupure
+    yield "retry: 3000\n\n"
+
+    first = await initial_event(file_id, progress_broker, supabase_service)
+    if first is not None:
+        yield first.to_sse()
+        if first.is_final:
+            return
+
+    async for event in progress_broker.subscribe(file_id, heartbeat=KEEPALIVE_INTERVAL):
+        yield ": keepalive\n\n" if event is None else event.to_sse()
+
+
+@router.get("/api/progress/{file_id}")
+async def progress(
+    file_id: str,
+    progress_broker: ProgressBroker = Depends(get_progress_broker),
+    supabase_service: SupabaseService = Depends(get_supabase_service)
+) -> StreamingResponse:
+    """
+    Flux Server-Sent Events de l'avancement d'un fichier.
+
+    Chaque message porte l'étape (uploaded, extracting, transforming, ready,
+    failed) et, pendant la transformation, le nombre de pages ou sections
+    traitées. Le flux se termine après l'étape finale.
+
+    Args:
+        file_id: L'identifiant du fichier
+        progress_broker, supabase_service: Services injectés
+
+    Returns:
+        StreamingResponse: Flux text/event-stream
+    """
+    return StreamingResponse(
+        event_stream(file_id, progress_broker, supabase_service),
+        media_type="text/event-stream",
+        headers={"cache-control": "no-cache", "x-accel-buffering": "no"}
+    )
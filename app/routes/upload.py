@@ -2,39 +2,108 @@
 Routes pour la gestion des uploads de fichiers.
 """
 import logging
-import traceback
-from pathlib import Path
-from typing import Optional
+from typing import Any, Dict, List, Optional
 
-from fastapi import APIRouter, File, HTTPException, UploadFile
+from fastapi import APIRouter, Depends, File, Form, HTTPException, UploadFile
 
 from ..config import get_settings
-from ..schemas.upload import UploadResponse
-from ..services.file_validator import FileValidator
+from ..dependencies import get_file_validator, get_job_queue, get_progress_broker, get_supabase_service
+from ..schemas.upload import BatchUploadResponse, UploadResponse
+from ..services.file_validator import FileRejectedError, FileValidator
+from ..services.job_queue import JobQueue
+from ..services.progress import ProgressBroker, ProgressEvent, Stage
 from ..services.supabase_service import SupabaseService
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter()
-file_validator = FileValidator()
-supabase_service = SupabaseService()
 settings = get_settings()
 
-async def get_upload_file_size(file: UploadFile) -> Optional[int]:
-  try:
-    return len(await file.read())
-  except Exception as e:
-    raise ValueError(f"Erreur lors de la lecture du fichier: {str(e)}")
-  finally:
-    await file.seek(0)
+def file_too_large_error() -> HTTPException:
+    return HTTPException(
+        status_code=413,
+        detail="Le fichier depasse la taille maximale de {}MB".format(settings.MAX_UPLOAD_SIZE / 1024 / 1024)
+    )
+
+def rejection_error(error: FileRejectedError) -> HTTPException:
+    if error.status_code == 413:
+        return file_too_large_error()
+    return HTTPException(
+        status_code=error.status_code,
+        detail="Le fichier n'est pas valide"
+    )
+
+def submit_transformation(
+    upload_result: Dict[str, Any],
+    filename: str,
+    job_queue: JobQueue,
+    progress_broker: ProgressBroker,
+    previous_id: Optional[str] = None
+) -> Optional[str]:
+    """Met en file la transformation d'un fichier, sauf si un résultat existe déjà."""
+    file_id = str(upload_result['id'])
+    if upload_result.get('status') == "processed":
+        progress_broker.publish(ProgressEvent(file_id, Stage.READY))
+        return None
+    payload = {"file_path": upload_result['file_path'], "file_name": filename}
+    if previous_id:
+        payload["previous_id"] = previous_id
+    job = job_queue.submit(file_id, payload)
+    # Une tâche déjà en cours pour ce fichier garde son avancement
+    if job.attempts == 0:
+        progress_broker.publish(ProgressEvent(file_id, Stage.UPLOADED))
+    return job.id
+
+def upload_success(upload_result: Dict[str, Any], job_id: Optional[str], content_type: Optional[str]) -> UploadResponse:
+    return UploadResponse(
+        success=True,
+        message="Fichier uploadé avec succès",
+        file_id=str(upload_result['id']),
+        job_id=job_id,
+        filename=upload_result['file_name'],
+        file_url=upload_result['file_url'],
+        mime_type=content_type,
+        deduplicated=upload_result.get('deduplicated', False)
+    )
+
+def upload_failure(file: UploadFile, error: Exception) -> UploadResponse:
+    """Résultat d'un fichier en échec au sein d'un lot."""
+    if isinstance(error, FileRejectedError):
+        message = rejection_error(error).detail
+        detail = error.result.error_message
+    elif isinstance(error, HTTPException):
+        message = detail = error.detail
+    else:
+        message = "Erreur lors du traitement du fichier"
+        detail = str(error)
+    return UploadResponse(
+        success=False,
+        message=message,
+        filename=file.filename,
+        error=detail
+    )
 
 @router.post("/api/upload", response_model=UploadResponse)
-async def upload_file(file: UploadFile = File(...)) -> UploadResponse:
+async def upload_file(
+    file: UploadFile = File(...),
+    replaces: Optional[str] = Form(None),
+    file_validator: FileValidator = Depends(get_file_validator),
+    supabase_service: SupabaseService = Depends(get_supabase_service),
+    job_queue: JobQueue = Depends(get_job_queue),
+    progress_broker: ProgressBroker = Depends(get_progress_broker)
+) -> UploadResponse:
     """
     Endpoint pour l'upload de fichiers avec validation et stockage dans Supabase.
 
+    Le fichier est lu par morceaux : chaque morceau est validé (taille, type
+    MIME, signatures) puis transmis au stockage. La transformation est mise
+    en file et suivie via /api/jobs/{job_id} : la réponse n'attend pas sa fin.
+
     Args:
         file: Le fichier à uploader
+        replaces: Identifiant d'une version précédente du document, dont les
+            blocs inchangés sont repris sans être transformés de nouveau
+        file_validator, supabase_service, job_queue, progress_broker: Services injectés
 
     Returns:
         UploadResponse: Résultat de l'opération
@@ -43,42 +112,29 @@ async def upload_file(file: UploadFile = File(...)) -> UploadResponse:
         HTTPException: En cas d'erreur lors de l'upload
     """
     try:
-        # Vérification de la taille du fichier
-        file_size = await get_upload_file_size(file)
-        if file_size > settings.MAX_UPLOAD_SIZE:
-            raise HTTPException(
-                status_code=413,
-                detail="Le fichier depasse la taille maximale de {}MB".format(settings.MAX_UPLOAD_SIZE / 1024 / 1024)
-            )
-
-        # Validation du fichier
-        validation_result = await file_validator.validate_file(file)
-
-        if not validation_result.is_valid:
-            raise HTTPException(
-                status_code=400,
-                detail="Le fichier n'est pas valide"
-            )
-
-        # Upload vers Supabase
-        upload_result = await supabase_service.upload_file(file)
-
-        return UploadResponse(
-            success=True,
-            message="Fichier uploadé avec succès",
-            filename=upload_result['file_name'],
-            file_url=upload_result['file_url'],
-            mime_type=file.content_type
-        )
+        # Vérification de la taille annoncée, avant toute lecture
+        if file.size is not None and file.size > settings.MAX_UPLOAD_SIZE:
+            raise file_too_large_error()
+
+        # Validation et upload vers Supabase en une seule passe
+        try:
+            stream = file_validator.open_stream(file.filename)
+            upload_result = await supabase_service.upload_file(file, stream)
+        except FileRejectedError as e:
+            raise rejection_error(e)
+
+        # Transformation en arrière-plan
+        job_id = submit_transformation(upload_result, file.filename, job_queue, progress_broker, replaces)
+
+        return upload_success(upload_result, job_id, file.content_type)
 
     except HTTPException as e:
         logger.error(
-            f"HTTP Exception interceptée",
+            "HTTP Exception interceptée",
             extra={
                 "status_code": e.status_code,
                 "error_detail": e.detail,
-                "file_name": file.filename,
-                "traceback": traceback.format_exc()
+                "file_name": file.filename
             }
         )
         raise e
@@ -88,3 +144,64 @@ async def upload_file(file: UploadFile = File(...)) -> UploadResponse:
             status_code=500,
             detail=f"Erreur lors du traitement du fichier: {str(e)}"
         )
+
+@router.post("/api/upload/batch", response_model=BatchUploadResponse)
+async def upload_batch(
+    files: List[UploadFile] = File(...),
+    file_validator: FileValidator = Depends(get_file_validator),
+    supabase_service: SupabaseService = Depends(get_supabase_service),
+    job_queue: JobQueue = Depends(get_job_queue),
+    progress_broker: ProgressBroker = Depends(get_progress_broker)
+) -> BatchUploadResponse:
+    """
+    Endpoint pour l'upload d'un lot de fichiers.
+
+    Les fichiers sont validés en parallèle puis stockés avec un nombre borné
+    d'envois simultanés ; toutes les lignes temp_files sont créées en une
+    seule insertion. Un fichier invalide n'empêche pas l'upload des autres.
+
+    Args:
+        files: Les fichiers à uploader
+        file_validator, supabase_service, job_queue, progress_broker: Services injectés
+
+    Returns:
+        BatchUploadResponse: Un résultat par fichier, dans l'ordre d'envoi
+
+    Raises:
+        HTTPException: Si le lot contient trop de fichiers
+    """
+    if len(files) > settings.MAX_BATCH_FILES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Un lot ne peut pas contenir plus de {settings.MAX_BATCH_FILES} fichiers"
+        )
+
+    results: List[Optional[UploadResponse]] = [None] * len(files)
+    accepted = []
+    for index, file in enumerate(files):
+        if file.size is not None and file.size > settings.MAX_UPLOAD_SIZE:
+            results[index] = upload_failure(file, file_too_large_error())
+            continue
+        try:
+            accepted.append((index, file, file_validator.open_stream(file.filename)))
+        except FileRejectedError as e:
+            results[index] = upload_failure(file, e)
+
+    outcomes = await supabase_service.upload_files(
+        [(file, stream) for _, file, stream in accepted],
+        max_parallel_uploads=settings.BATCH_UPLOAD_CONCURRENCY
+    )
+
+    for (index, file, _), outcome in zip(accepted, outcomes):
+        if isinstance(outcome, Exception):
+            results[index] = upload_failure(file, outcome)
+        else:
+            job_id = submit_transformation(outcome, file.filename, job_queue, progress_broker)
+            results[index] = upload_success(outcome, job_id, file.content_type)
+
+    uploaded = sum(result.success for result in results)
+    return BatchUploadResponse(
+        success=uploaded == len(files),
+        message=f"{uploaded}/{len(files)} fichiers uploadés avec succès",
+        results=results
+    )
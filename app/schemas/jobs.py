@@ -0,0 +1,21 @@
+"""
+Schémas Pydantic pour le suivi des tâches de transformation.
+"""
+from datetime import datetime
+from typing import Optional
+
+from pydantic import BaseModel
+
+
+class JobResponse(BaseModel):
+    """État d'une tâche de transformation."""
+    id: str
+    file_id: str
+    status: str
+    attempts: int
+    progress: int = 0
+    finished: bool
+    transformed_file_path: Optional[str] = None
+    error: Optional[str] = None
+    created_at: datetime
+    updated_at: datetime
@@ -1,7 +1,7 @@
 """
 Schémas Pydantic pour la validation des uploads de fichiers.
 """
-from typing import Optional
+from typing import List, Optional
 
 from pydantic import BaseModel
 
@@ -10,7 +10,17 @@ class UploadResponse(BaseModel):
     """Réponse de l'API pour les uploads de fichiers."""
     success: bool
     message: str
+    file_id: Optional[str] = None
+    job_id: Optional[str] = None
     filename: Optional[str] = None
     file_url: Optional[str] = None
     mime_type: Optional[str] = None
+    deduplicated: bool = False
     error: Optional[str] = None
+
+
+class BatchUploadResponse(BaseModel):
+    """Réponse de l'API pour les uploads par lot, un résultat par fichier."""
+    success: bool
+    message: str
+    results: List[UploadResponse]
@@ -0,0 +1,154 @@
+"""
+Nettoyage périodique des fichiers expirés.
+"""
+import asyncio
+import logging
+import time
+from dataclasses import asdict, dataclass
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional
+
+from pipeline.incremental import MANIFEST_SUFFIX
+
+from .metrics import SWEEPER_ERRORS, SWEEPER_OBJECTS_DELETED, SWEEPER_ROWS_DELETED
+from .supabase_service import SupabaseService
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class SweepStats:
+    """Bilan cumulé des passages du nettoyeur, aussi exposé sur /metrics."""
+    runs: int = 0
+    rows_deleted: int = 0
+    objects_deleted: int = 0
+    errors: int = 0
+    last_run_at: Optional[datetime] = None
+    last_duration: float = 0.0
+    last_rows_deleted: int = 0
+
+    def as_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+class ExpiredFileSweeper:
+    """
+    Supprime les fichiers temp_files expirés et leurs objets stockés.
+
+    Les enregistrements expirés sont lus par pages ; pour chaque lot, les
+    objets sont supprimés en une requête puis les lignes en une autre. Au
+    plus `concurrency` lots sont traités simultanément, avec une pause entre
+    deux lots, pour laisser la priorité au trafic des utilisateurs.
+    """
+
+    def __init__(
+        self,
+        supabase_service: SupabaseService,
+        interval: float = 3600.0,
+        page_size: int = 500,
+        batch_size: int = 100,
+        concurrency: int = 2,
+        pause: float = 0.1,
+        render_formats: Iterable[str] = (),
+    ):
+        """
+        Args:
+            supabase_service: Accès à Supabase
+            interval: Délai entre deux passages, en secondes
+            page_size: Nombre d'enregistrements lus par requête
+            batch_size: Nombre de fichiers supprimés par requête
+            concurrency: Nombre de lots supprimés simultanément
+            pause: Pause après chaque lot, en secondes
+            render_formats: Formats des rendus stockés avec chaque document transformé
+        """
+        self.supabase_service = supabase_service
+        self.interval = interval
+        self.page_size = page_size
+        self.batch_size = batch_size
+        self.concurrency = concurrency
+        self.pause = pause
+        self.render_formats = list(render_formats)
+        self.stats = SweepStats()
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self) -> None:
+        """Démarre les passages périodiques sur la boucle d'événements courante."""
+        if self._task is None:
+            self._task = asyncio.create_task(self._loop(), name="expired-file-sweeper")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _loop(self) -> None:
+        while True:
+            try:
+                await self.sweep()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                self.stats.errors += 1
+                SWEEPER_ERRORS.inc()
+                logger.exception("Échec du nettoyage des fichiers expirés")
+            await asyncio.sleep(self.interval)
+
+    def _object_paths(self, records: List[Dict[str, Any]]) -> List[str]:
+        paths = []
+        for record in records:
+            if record.get("transformed_file_path"):
+                paths.append(record["transformed_file_path"])
+                paths.append(f"transformed/{record['id']}{MANIFEST_SUFFIX}")
+                paths.extend(f"transformed/{record['id']}.{output_format}" for output_format in self.render_formats)
+        return paths
+
+    async def _delete_batch(self, records: List[Dict[str, Any]], slots: asyncio.Semaphore) -> None:
+        async with slots:
+            try:
+                # Un contenu réenvoyé depuis son expiration partage l'objet d'origine
+                originals = [record["original_file_path"] for record in records if record.get("original_file_path")]
+                still_used = await self.supabase_service.referenced_paths(originals)
+                paths = [path for path in originals if path not in still_used] + self._object_paths(records)
+
+                # Les objets d'abord : une ligne sans objet est moins gênante qu'un objet orphelin
+                removed = await self.supabase_service.remove_objects(paths)
+                self.stats.objects_deleted += removed
+                SWEEPER_OBJECTS_DELETED.inc(removed)
+                deleted = await self.supabase_service.delete_records([record["id"] for record in records])
+                self.stats.rows_deleted += deleted
+                self.stats.last_rows_deleted += deleted
+                SWEEPER_ROWS_DELETED.inc(deleted)
+            except Exception:
+                self.stats.errors += 1
+                SWEEPER_ERRORS.inc()
+                logger.exception("Échec de la suppression d'un lot de fichiers expirés")
+            await asyncio.sleep(self.pause)
+
+    async def sweep(self) -> SweepStats:
+        """
+        Effectue un passage complet.
+
+        Returns:
+            SweepStats: Le bilan cumulé, mis à jour
+        """
+        started = time.monotonic()
+        self.stats.last_rows_deleted = 0
+        slots = asyncio.Semaphore(self.concurrency)
+        after = None
+        while True:
+            page = await self.supabase_service.list_expired(self.page_size, after)
+            if not page:
+                break
+            batches = [page[i:i + self.batch_size] for i in range(0, len(page), self.batch_size)]
+            await asyncio.gather(*(self._delete_batch(batch, slots) for batch in batches))
+            if len(page) < self.page_size:
+                break
+            # Les lignes en échec restent derrière le curseur : pas de boucle infinie
+            after = page[-1]["id"]
+
+        self.stats.runs += 1
+        self.stats.last_run_at = datetime.now()
+        self.stats.last_duration = time.monotonic() - started
+        logger.info("Nettoyage des fichiers expirés terminé", extra=self.stats.as_dict())
+        return self.stats
@@ -1,89 +1,383 @@
 """
 Service de validation des fichiers pour toDys.
+
+Chaque format accepté est décrit par une règle : extension, types MIME
+admis et, quand le format en a une, signature d'en-tête. Les signatures
+sont compilées en une seule expression régulière testée sur les premiers
+octets du fichier ; libmagic n'est consulté que si elle ne conclut pas.
 """
+import asyncio
+import codecs
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
 from pathlib import Path
 import magic
-from typing import Optional
+from typing import Dict, Iterable, Optional, Tuple
 from pydantic import BaseModel
 from fastapi import UploadFile
 from ..config import get_settings
+from .metrics import LIBMAGIC_SECONDS, MIME_DETECTIONS, SIGNATURE_SCAN_SECONDS
+from .signatures import SignatureScanner, get_scanner
 
 settings = get_settings()
 
+# Taille des morceaux lus depuis le fichier uploadé
+CHUNK_SIZE = 64 * 1024
+
+# Octets examinés par la détection rapide du type MIME
+HEAD_SIZE = 512
+
+# Type MIME d'un fichier vide, comme le rapporte libmagic
+EMPTY_MIME_TYPE = "application/x-empty"
+
+
+@dataclass(frozen=True)
+class FileType:
+    """
+    Règle de validation d'un format de fichier.
+
+    Attributes:
+        extension: Extension, sans le point
+        mime_type: Type MIME retenu quand la signature d'en-tête est reconnue
+        accepted_mime_types: Types MIME admis pour l'extension ; une valeur
+            terminée par "/" admet toute la famille ("text/")
+        magic: Signature d'en-tête, en couples (position, octets) ; vide si le
+            format ne se reconnaît pas à ses premiers octets
+    """
+    extension: str
+    mime_type: str
+    accepted_mime_types: Tuple[str, ...]
+    magic: Tuple[Tuple[int, bytes], ...] = ()
+
+    def accepts(self, mime_type: str) -> bool:
+        """Indique si un type MIME détecté correspond à l'extension."""
+        return any(
+            mime_type.startswith(accepted) if accepted.endswith("/") else mime_type == accepted
+            for accepted in self.accepted_mime_types
+        )
+
+
+FILE_TYPES: Dict[str, FileType] = {rule.extension: rule for rule in (
+    FileType("pdf", "application/pdf", ("application/pdf",), ((0, b"%PDF-"),)),
+    FileType("rtf", "text/rtf", ("text/rtf", "application/rtf"), ((0, b"{\\rtf"),)),
+    # Archive ZIP dont la première entrée, non compressée, déclare le format
+    FileType(
+        "odt",
+        "application/vnd.oasis.opendocument.text",
+        ("application/vnd.oasis.opendocument.text",),
+        ((0, b"PK\x03\x04"), (30, b"mimetypeapplication/vnd.oasis.opendocument.text")),
+    ),
+    # Les formats suivants partagent leur en-tête avec d'autres (ZIP, OLE2) : libmagic tranche.
+    # Selon l'ordre des entrées de l'archive, libmagic peut ne voir qu'un ZIP.
+    FileType(
+        "docx",
+        "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+        ("application/vnd.openxmlformats-officedocument.wordprocessingml.document", "application/zip"),
+    ),
+    FileType("doc", "application/msword", ("application/msword", "application/CDFV2")),
+    FileType("txt", "text/plain", ("text/",)),
+)}
+
+# Octets de contrôle absents d'un texte (tabulations, sauts de ligne et échappement admis)
+_CONTROL_BYTES = re.compile(rb"[\x00-\x08\x0b\x0e-\x1a\x1c-\x1f\x7f]")
+
+
+def compile_magic(rules: Iterable[FileType]) -> "re.Pattern[bytes]":
+    """
+    Compile les signatures d'en-tête en une seule expression régulière.
+
+    Chaque règle devient un groupe nommé d'après son extension : le groupe
+    qui correspond désigne le format.
+    """
+    branches = []
+    for rule in rules:
+        if not rule.magic:
+            continue
+        parts, position = [], 0
+        for offset, prefix in sorted(rule.magic):
+            if offset > position:
+                parts.append(b".{%d}" % (offset - position))
+            parts.append(re.escape(prefix))
+            position = offset + len(prefix)
+        branches.append(b"(?P<%s>%s)" % (rule.extension.encode(), b"".join(parts)))
+    return re.compile(b"|".join(branches) or b"(?!)", re.DOTALL)
+
+
+def looks_like_text(head: bytes) -> bool:
+    """Indique si un en-tête est du texte UTF-8, un caractère pouvant être coupé à la fin."""
+    if not head or _CONTROL_BYTES.search(head):
+        return False
+    try:
+        codecs.getincrementaldecoder("utf-8")().decode(head, final=False)
+    except UnicodeDecodeError:
+        return False
+    return True
+
 class ValidationResult(BaseModel):
     """Résultat de la validation d'un fichier."""
     is_valid: bool
     error_message: Optional[str] = None
     mime_type: Optional[str] = None
     file_path: Optional[Path] = None
+    matched_signature: Optional[str] = None
+
+class FileRejectedError(Exception):
+    """Levée lorsqu'un fichier est rejeté pendant sa lecture par morceaux."""
+
+    def __init__(self, result: ValidationResult, status_code: int = 400):
+        super().__init__(result.error_message)
+        self.result = result
+        self.status_code = status_code
+
+class ValidationStream:
+    """
+    Validation incrémentale d'un fichier lu par morceaux.
+
+    Chaque morceau est contrôlé dès sa lecture : taille cumulée, type MIME
+    (détecté sur le premier morceau) et signatures malveillantes, y compris
+    celles qui chevauchent deux morceaux. La mémoire utilisée reste bornée
+    par la taille d'un morceau.
+    """
+
+    def __init__(self, validator: "FileValidator", filename: str, file_type: FileType, max_size: int):
+        self._validator = validator
+        self.filename = filename
+        self.file_type = file_type
+        self.max_size = max_size
+        self.size = 0
+        self.mime_type: Optional[str] = None
+        self._scan = validator.signatures.stream()
+
+    async def feed(self, chunk: bytes) -> None:
+        """
+        Valide un morceau du fichier.
+
+        Args:
+            chunk: Morceau suivant du contenu
+
+        Raises:
+            FileRejectedError: Si le fichier est trop volumineux ou malveillant
+        """
+        self.size += len(chunk)
+        if self.size > self.max_size:
+            raise FileRejectedError(
+                ValidationResult(
+                    is_valid=False,
+                    error_message=f"Le fichier dépasse la taille maximale de {self.max_size / 1024 / 1024}MB"
+                ),
+                status_code=413
+            )
+
+        # Détection du type MIME sur l'en-tête du fichier
+        if self.mime_type is None and chunk:
+            self.mime_type = await self._validator.detect(chunk)
+            if not self.file_type.accepts(self.mime_type):
+                raise FileRejectedError(
+                    ValidationResult(
+                        is_valid=False,
+                        error_message="L'extension du fichier ne correspond pas à son contenu",
+                        mime_type=self.mime_type
+                    )
+                )
+
+        # Le scan conserve la fin du morceau précédent pour les signatures à cheval
+        with SIGNATURE_SCAN_SECONDS.time():
+            match = self._scan.feed(chunk)
+        if match is not None:
+            raise FileRejectedError(
+                ValidationResult(
+                    is_valid=False,
+                    error_message="Le fichier semble malveillant",
+                    matched_signature=match.signature.name
+                )
+            )
+
+    async def result(self) -> ValidationResult:
+        """Retourne le résultat de la validation une fois le fichier entièrement lu."""
+        # Fichier vide : aucun contenu ne contredit l'extension
+        if self.mime_type is None:
+            self.mime_type = EMPTY_MIME_TYPE
+
+        return ValidationResult(
+            is_valid=True,
+            mime_type=self.mime_type,
+            file_path=self._validator._get_upload_path(self.filename)
+        )
 
 class FileValidator:
     """
     Validateur de fichiers avec vérifications de sécurité.
-    
+
     Caractéristiques:
-    - Validation MIME type
+    - Validation MIME type, cohérent avec l'extension
     - Vérification de la taille
     - Vérification des extensions
     - Détection de contenu malveillant basique
+
+    Le contenu n'est lu qu'une fois, par morceaux : l'upload web, l'upload
+    par lot et la validation de fichiers locaux partagent le même moteur.
     """
-    
-    def __init__(self):
-        self.magic = magic.Magic(mime=True)
+
+    def __init__(self, signatures: Optional[SignatureScanner] = None):
+        """
+        Args:
+            signatures: Jeu de signatures à détecter, par défaut celui de SIGNATURES_FILE
+
+        Raises:
+            ValueError: Si une extension autorisée n'a pas de règle dans FILE_TYPES
+        """
+        self.signatures = signatures or get_scanner(settings.SIGNATURES_FILE)
+        unknown = settings.ALLOWED_EXTENSIONS - FILE_TYPES.keys()
+        if unknown:
+            raise ValueError(f"Extensions autorisées sans règle de validation: {sorted(unknown)}")
+        self.file_types = {extension: FILE_TYPES[extension] for extension in settings.ALLOWED_EXTENSIONS}
+        self._magic_table = compile_magic(self.file_types.values())
+        # libmagic n'est pas réentrant : une instance par thread du pool
+        self._local = threading.local()
+        self._executor = ThreadPoolExecutor(
+            max_workers=settings.SNIFF_MAX_WORKERS,
+            thread_name_prefix="libmagic"
+        )
         self._ensure_upload_dir()
 
-    async def validate_file(self, file: UploadFile) -> ValidationResult:
+    @property
+    def magic(self) -> magic.Magic:
+        """Instance libmagic propre au thread courant."""
+        if not hasattr(self._local, "magic"):
+            self._local.magic = magic.Magic(mime=True)
+        return self._local.magic
+
+    async def sniff(self, head: bytes) -> str:
         """
-        Valide un fichier uploadé selon plusieurs critères de sécurité.
-        
+        Détecte le type MIME d'un en-tête de fichier hors de la boucle d'événements.
+
         Args:
-            file: Le fichier à valider
-            
+            head: Premiers octets du fichier
+
         Returns:
-            ValidationResult: Résultat de la validation
+            str: Type MIME détecté par libmagic
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, self._sniff, head)
+
+    @LIBMAGIC_SECONDS.time()
+    def _sniff(self, head: bytes) -> str:
+        return self.magic.from_buffer(head)
+
+    def detect_head(self, head: bytes) -> Optional[str]:
+        """
+        Reconnaît le type MIME sur les HEAD_SIZE premiers octets, sans libmagic.
+
+        Args:
+            head: Premiers octets du fichier
+
+        Returns:
+            Optional[str]: Le type MIME, ou None si l'en-tête ne suffit pas
+        """
+        head = head[:HEAD_SIZE]
+        match = self._magic_table.match(head)
+        if match is not None:
+            return self.file_types[match.lastgroup].mime_type
+        if "txt" in self.file_types and looks_like_text(head):
+            return "text/plain"
+        return None
+
+    async def detect(self, head: bytes) -> str:
+        """
+        Détecte le type MIME d'un en-tête : signatures d'abord, libmagic sinon.
+
+        Args:
+            head: Premiers octets du fichier, idéalement un morceau entier
+
+        Returns:
+            str: Type MIME détecté
+        """
+        mime_type = self.detect_head(head)
+        if mime_type is not None:
+            MIME_DETECTIONS.inc(method="header")
+            return mime_type
+        MIME_DETECTIONS.inc(method="libmagic")
+        return await self.sniff(head)
+
+    def open_stream(self, filename: Optional[str], max_size: Optional[int] = None) -> ValidationStream:
+        """
+        Prépare la validation par morceaux d'un fichier.
+
+        Args:
+            filename: Nom du fichier uploadé
+            max_size: Taille maximale autorisée, par défaut MAX_UPLOAD_SIZE
+
+        Returns:
+            ValidationStream: Validation incrémentale à alimenter morceau par morceau
+
+        Raises:
+            FileRejectedError: Si le nom ou l'extension du fichier est invalide
         """
         # Vérification du nom de fichier
-        if not file.filename:
-            return ValidationResult(
-                is_valid=False,
-                error_message="Nom de fichier manquant"
+        if not filename:
+            raise FileRejectedError(
+                ValidationResult(
+                    is_valid=False,
+                    error_message="Nom de fichier manquant"
+                )
             )
 
         # Vérification de l'extension
-        extension = Path(file.filename).suffix[1:].lower()
-        if extension not in settings.ALLOWED_EXTENSIONS:
-            return ValidationResult(
-                is_valid=False,
-                error_message=f"Extension .{extension} non autorisée"
+        extension = Path(filename).suffix[1:].lower()
+        if extension not in self.file_types:
+            raise FileRejectedError(
+                ValidationResult(
+                    is_valid=False,
+                    error_message=f"Extension .{extension} non autorisée"
+                )
             )
 
-        # Lecture du contenu pour validation
-        content = await file.read(settings.MAX_UPLOAD_SIZE + 1)
-        
-        # Vérification de la taille
-        if len(content) > settings.MAX_UPLOAD_SIZE:
+        return ValidationStream(self, filename, self.file_types[extension], max_size or settings.MAX_UPLOAD_SIZE)
+
+    async def validate_file(self, file: UploadFile) -> ValidationResult:
+        """
+        Valide un fichier uploadé selon plusieurs critères de sécurité.
+
+        Le fichier est lu une seule fois, par morceaux de CHUNK_SIZE octets.
+
+        Args:
+            file: Le fichier à valider
+
+        Returns:
+            ValidationResult: Résultat de la validation
+        """
+        try:
+            stream = self.open_stream(file.filename)
+            while chunk := await file.read(CHUNK_SIZE):
+                await stream.feed(chunk)
+            return await stream.result()
+        except FileRejectedError as e:
+            return e.result
+        finally:
             await file.seek(0)
-            return ValidationResult(
-                is_valid=False,
-                error_message=f"Le fichier dépasse la taille maximale de {settings.MAX_UPLOAD_SIZE / 1024 / 1024}MB"
-            )
 
-        # Vérification du type MIME
-        mime_type = self.magic.from_buffer(content)
-        await file.seek(0)
+    async def validate_path(self, path: Path, max_size: Optional[int] = None) -> ValidationResult:
+        """
+        Valide un fichier local, pour les traitements par lot et en ligne de commande.
 
-        # Vérification du contenu malveillant
-        if self._detect_malicious_content(content):
-            return ValidationResult(
-                is_valid=False,
-                error_message="Le fichier semble malveillant"
-            )
+        Args:
+            path: Chemin du fichier
+            max_size: Taille maximale autorisée, par défaut MAX_UPLOAD_SIZE
 
-        return ValidationResult(
-            is_valid=True,
-            mime_type=mime_type,
-            file_path=self._get_upload_path(file.filename)
-        )
+        Returns:
+            ValidationResult: Résultat de la validation, avec le chemin du fichier
+        """
+        try:
+            stream = self.open_stream(path.name, max_size)
+            with path.open("rb") as source:
+                while chunk := await asyncio.to_thread(source.read, CHUNK_SIZE):
+                    await stream.feed(chunk)
+            result = await stream.result()
+        except FileRejectedError as e:
+            return e.result
+        return result.model_copy(update={"file_path": path})
 
     def _ensure_upload_dir(self):
         """S'assure que le dossier d'upload existe."""
@@ -97,18 +391,11 @@ class FileValidator:
     def _detect_malicious_content(self, content: bytes) -> bool:
         """
         Détecte les contenus potentiellement malveillants.
-        
+
         Args:
             content: Contenu du fichier
-            
+
         Returns:
             bool: True si le contenu semble malveillant
         """
-        # Liste de signatures malveillantes (à enrichir)
-        malicious_signatures = [
-            b'X5O!P%@AP[4\\PZX54(P^)7CC)7}$',  # EICAR test signature
-            b'#!/',  # Scripts shell
-            b'<?php',  # Code PHP
-        ]
-        
-        return any(sig in content for sig in malicious_signatures)
+        return self.signatures.scan(content) is not None
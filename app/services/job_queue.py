@@ -0,0 +1,233 @@
+"""
+File de tâches asynchrone pour les transformations de documents.
+"""
+import asyncio
+import logging
+import uuid
+from concurrent.futures import Executor
+from dataclasses import dataclass, field
+from datetime import datetime
+from enum import Enum
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Union
+
+from .cache import TTLCache
+from .metrics import QUEUE_DEPTH
+
+logger = logging.getLogger(__name__)
+
+
+class JobStatus(str, Enum):
+    """États successifs d'une tâche."""
+    PENDING = "pending"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+
+
+@dataclass
+class Job:
+    """Tâche de transformation d'un fichier."""
+    file_id: str
+    payload: Dict[str, Any] = field(default_factory=dict)
+    id: str = field(default_factory=lambda: uuid.uuid4().hex)
+    status: JobStatus = JobStatus.PENDING
+    attempts: int = 0
+    progress: int = 0
+    result: Any = None
+    error: Optional[str] = None
+    created_at: datetime = field(default_factory=datetime.now)
+    updated_at: datetime = field(default_factory=datetime.now)
+
+    @property
+    def is_finished(self) -> bool:
+        return self.status in (JobStatus.SUCCEEDED, JobStatus.FAILED)
+
+
+JobHandler = Callable[[Job], Awaitable[Any]]
+# Handler exécuté dans un pool : fonction synchrone appelée avec (file_id, payload)
+JobFunction = Callable[[str, Dict[str, Any]], Any]
+
+
+class JobQueue:
+    """
+    File de tâches en mémoire, traitée par un nombre borné de workers asyncio.
+
+    Chaque tâche dispose d'un délai maximal par tentative ; en cas d'échec
+    elle est relancée avec un délai exponentiel, jusqu'à `max_retries`
+    nouvelles tentatives. Les tâches terminées restent consultables pendant
+    `retention` secondes.
+
+    Avec un pool (`executor`, par exemple un ProcessPoolExecutor), le
+    handler est une fonction synchrone exécutée dans le pool : le travail
+    de calcul ne bloque pas la boucle d'événements. Un appel déjà commencé
+    dans le pool ne peut pas être interrompu : après un délai dépassé, la
+    tentative suivante attend sa fin, pour que deux tentatives d'une même
+    tâche ne s'exécutent jamais en même temps.
+    """
+
+    def __init__(
+        self,
+        handler: Union[JobHandler, JobFunction],
+        concurrency: int = 2,
+        max_retries: int = 3,
+        timeout: float = 300.0,
+        backoff: float = 1.0,
+        retention: float = 86400.0,
+        on_failure: Optional[JobHandler] = None,
+        executor: Optional[Executor] = None,
+    ):
+        """
+        Args:
+            handler: Coroutine exécutée pour chaque tâche, son résultat est conservé ;
+                avec un pool, fonction picklable appelée avec (file_id, payload)
+            concurrency: Nombre de tâches traitées simultanément
+            max_retries: Nombre de nouvelles tentatives après un échec
+            timeout: Durée maximale d'une tentative, en secondes
+            backoff: Délai avant la première nouvelle tentative, doublé ensuite
+            retention: Durée de conservation des tâches, en secondes
+            on_failure: Coroutine appelée quand une tâche échoue définitivement
+            executor: Pool où exécuter le handler ; sans pool, il s'exécute sur la boucle
+        """
+        self.handler = handler
+        self.concurrency = concurrency
+        self.max_retries = max_retries
+        self.timeout = timeout
+        self.backoff = backoff
+        self.on_failure = on_failure
+        self.executor = executor
+        self._jobs: TTLCache[str, Job] = TTLCache(maxsize=100_000, ttl=retention)
+        self._active_by_file: Dict[str, str] = {}
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers: List[asyncio.Task] = []
+        self._running = 0
+
+    @property
+    def depth(self) -> int:
+        """Nombre de tâches en attente d'un worker."""
+        return self._queue.qsize() if self._queue is not None else 0
+
+    @property
+    def active(self) -> int:
+        """Nombre de tâches en attente ou en cours de traitement."""
+        return self.depth + self._running
+
+    async def start(self) -> None:
+        """Démarre les workers sur la boucle d'événements courante."""
+        if self._workers:
+            return
+        if self._queue is None:
+            self._queue = asyncio.Queue()
+        self._workers = [
+            asyncio.create_task(self._worker(), name=f"job-worker-{i}")
+            for i in range(self.concurrency)
+        ]
+
+    async def stop(self) -> None:
+        """Arrête les workers ; les tâches en cours sont annulées."""
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    def submit(self, file_id: str, payload: Optional[Dict[str, Any]] = None) -> Job:
+        """
+        Ajoute une tâche pour un fichier.
+
+        Si une tâche est déjà en cours pour ce fichier, elle est retournée
+        au lieu d'en créer une nouvelle.
+
+        Args:
+            file_id: Identifiant du fichier dans temp_files
+            payload: Données transmises au handler
+
+        Returns:
+            Job: La tâche créée ou déjà en cours
+        """
+        active_id = self._active_by_file.get(file_id)
+        if active_id is not None:
+            active = self._jobs.get(active_id)
+            if active is not None and not active.is_finished:
+                return active
+
+        if self._queue is None:
+            self._queue = asyncio.Queue()
+
+        job = Job(file_id=file_id, payload=payload or {})
+        self._jobs.set(job.id, job)
+        self._active_by_file[file_id] = job.id
+        self._queue.put_nowait(job)
+        QUEUE_DEPTH.observe(self._queue.qsize())
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        """Retourne une tâche par son identifiant."""
+        return self._jobs.get(job_id)
+
+    def _update(self, job: Job, status: JobStatus, **changes: Any) -> None:
+        job.status = status
+        for name, value in changes.items():
+            setattr(job, name, value)
+        job.updated_at = datetime.now()
+        self._jobs.set(job.id, job)
+        if job.is_finished and self._active_by_file.get(job.file_id) == job.id:
+            del self._active_by_file[job.file_id]
+
+    async def _attempt(self, job: Job) -> Any:
+        """Exécute une tentative ; après un délai dépassé, attend qu'elle soit réellement arrêtée."""
+        if self.executor is None:
+            call = asyncio.ensure_future(self.handler(job))
+            stop = call.cancel
+        else:
+            pooled = self.executor.submit(self.handler, job.file_id, job.payload)
+            call = asyncio.wrap_future(pooled)
+            # N'annule qu'un appel pas encore commencé
+            stop = pooled.cancel
+        try:
+            return await asyncio.wait_for(asyncio.shield(call), timeout=self.timeout)
+        except asyncio.TimeoutError:
+            stop()
+            await asyncio.gather(call, return_exceptions=True)
+            raise
+        except asyncio.CancelledError:
+            call.cancel()
+            raise
+
+    async def _worker(self) -> None:
+        while True:
+            job = await self._queue.get()
+            self._running += 1
+            try:
+                await self._run(job)
+            finally:
+                self._running -= 1
+                self._queue.task_done()
+
+    async def _run(self, job: Job) -> None:
+        delay = self.backoff
+        while True:
+            self._update(job, JobStatus.RUNNING, attempts=job.attempts + 1, progress=0)
+            try:
+                result = await self._attempt(job)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                error = "Délai dépassé" if isinstance(e, asyncio.TimeoutError) else str(e)
+                if job.attempts > self.max_retries:
+                    logger.error(
+                        "Échec définitif de la tâche",
+                        extra={"job_id": job.id, "file_id": job.file_id, "error_detail": error}
+                    )
+                    self._update(job, JobStatus.FAILED, error=error)
+                    if self.on_failure is not None:
+                        try:
+                            await self.on_failure(job)
+                        except Exception:
+                            logger.exception("Erreur dans on_failure", extra={"job_id": job.id})
+                    return
+
+                job.error = error
+                await asyncio.sleep(delay)
+                delay *= 2
+            else:
+                self._update(job, JobStatus.SUCCEEDED, result=result, error=None)
+                return
@@ -0,0 +1,343 @@
+"""
+Client asynchrone du service LLM de simplification de texte.
+
+Les demandes concurrentes sont regroupées en micro-lots : un seul appel au
+modèle traite toutes les demandes arrivées pendant une courte fenêtre. Les
+demandes identiques en cours partagent le même résultat, et les résultats
+sont conservés dans un cache persistant indexé par le texte normalisé, le
+modèle et sa version, tels que les annonce le service qui les produit.
+
+`LLMTransform` branche le client sur le pipeline, comme adaptation de bloc.
+"""
+import asyncio
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import unicodedata
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Protocol, Tuple, Union
+
+import httpx
+
+from pipeline.extractors import Block
+
+from ..config import get_settings
+
+logger = logging.getLogger(__name__)
+
+settings = get_settings()
+
+
+def normalize_text(text: str) -> str:
+    """Normalise un texte : forme Unicode NFC et espaces réduits."""
+    return " ".join(unicodedata.normalize("NFC", text).split())
+
+
+class LLMBackend(Protocol):
+    """Modèle capable de simplifier un lot de textes en un seul appel."""
+
+    async def identify(self) -> Tuple[str, str]:
+        """Modèle et version qui produiront les prochains résultats."""
+        ...
+
+    async def simplify(self, texts: List[str]) -> Tuple[List[str], str, str]:
+        """Résultats, dans l'ordre des textes, avec le modèle et la version qui les ont produits."""
+        ...
+
+
+class LocalBackend:
+    """
+    Remplaçant local du modèle, pour les tests et le travail hors ligne.
+
+    Déterministe : chaque texte est renvoyé normalisé. Les lots reçus sont
+    conservés dans `calls`.
+    """
+    model = "local"
+    version = "1"
+
+    def __init__(self):
+        self.calls: List[List[str]] = []
+
+    async def identify(self) -> Tuple[str, str]:
+        return self.model, self.version
+
+    async def simplify(self, texts: List[str]) -> Tuple[List[str], str, str]:
+        self.calls.append(list(texts))
+        return [normalize_text(text) for text in texts], self.model, self.version
+
+
+class HTTPBackend:
+    """
+    Modèle servi par llm-service, interrogé en HTTP.
+
+    Le modèle et la version sont ceux que le service annonce, sur /ready
+    puis dans chaque réponse, et non ceux de la configuration du client.
+    """
+
+    def __init__(self, base_url: str, model: str = "", timeout: float = 30.0):
+        """
+        Args:
+            base_url: Adresse du service
+            model: Modèle exigé du service, vide pour accepter celui qu'il sert
+            timeout: Délai maximal d'un appel, en secondes
+        """
+        self.model = model
+        self._served: Optional[Tuple[str, str]] = None
+        self._client = httpx.AsyncClient(base_url=base_url, timeout=timeout)
+
+    async def identify(self) -> Tuple[str, str]:
+        if self._served is None:
+            response = await self._client.get("/ready")
+            response.raise_for_status()
+            served = response.json()
+            self._served = (served["backend"], served["version"])
+        return self._served
+
+    async def simplify(self, texts: List[str]) -> Tuple[List[str], str, str]:
+        payload: Dict[str, object] = {"texts": texts}
+        if self.model:
+            # Le service refuse (422) un modèle qu'il ne sert pas
+            payload["model"] = self.model
+        response = await self._client.post("/v1/simplify", json=payload)
+        response.raise_for_status()
+        body = response.json()
+        results = body["results"]
+        if len(results) != len(texts):
+            raise ValueError(f"Réponse incomplète du modèle: {len(results)} résultats pour {len(texts)} textes")
+        # Le service a pu changer de modèle depuis le dernier appel
+        self._served = (body["model"], body["version"])
+        return results, body["model"], body["version"]
+
+    async def close(self) -> None:
+        await self._client.aclose()
+
+
+class PromptCache:
+    """
+    Cache persistant des résultats, stocké dans une base SQLite.
+
+    Les accès sont faits hors de la boucle d'événements ; ":memory:" donne
+    un cache non persistant.
+    """
+
+    def __init__(self, path: Union[str, Path] = ":memory:"):
+        if path != ":memory:":
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(str(path), check_same_thread=False)
+        self._db.execute("CREATE TABLE IF NOT EXISTS results (key TEXT PRIMARY KEY, result TEXT NOT NULL)")
+        self._db.commit()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(text: str, model: str, version: str) -> str:
+        """Clé d'un texte déjà normalisé pour un modèle et une version donnés."""
+        return hashlib.sha256(f"{model}\0{version}\0{text}".encode("utf-8")).hexdigest()
+
+    def _get_many(self, keys: List[str]) -> Dict[str, str]:
+        with self._lock:
+            rows = self._db.execute(
+                f"SELECT key, result FROM results WHERE key IN ({','.join('?' * len(keys))})", keys
+            ).fetchall()
+        return dict(rows)
+
+    def _set_many(self, items: List[Tuple[str, str]]) -> None:
+        with self._lock:
+            self._db.executemany("INSERT OR REPLACE INTO results (key, result) VALUES (?, ?)", items)
+            self._db.commit()
+
+    async def get_many(self, keys: Iterable[str]) -> Dict[str, str]:
+        """Retourne les résultats connus parmi les clés demandées."""
+        keys = list(keys)
+        if not keys:
+            return {}
+        return await asyncio.to_thread(self._get_many, keys)
+
+    async def set_many(self, items: Dict[str, str]) -> None:
+        """Enregistre des résultats."""
+        if items:
+            await asyncio.to_thread(self._set_many, list(items.items()))
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+
+class LLMClient:
+    """
+    Client de simplification avec micro-lots, regroupement et cache.
+
+    Une demande attend au plus `max_wait` secondes que d'autres la
+    rejoignent ; le lot part dès qu'il atteint `max_batch_size` textes.
+    """
+
+    def __init__(self, backend: LLMBackend, cache: Optional[PromptCache] = None,
+                 max_batch_size: int = 16, max_wait: float = 0.02):
+        """
+        Args:
+            backend: Modèle interrogé pour les textes absents du cache
+            cache: Cache des résultats, par défaut en mémoire
+            max_batch_size: Nombre maximal de textes par appel au modèle
+            max_wait: Délai maximal d'attente d'un lot, en secondes
+        """
+        self.backend = backend
+        self.cache = cache or PromptCache()
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        # Par texte normalisé
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._pending: List[str] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._batches: set = set()
+
+    async def simplify(self, text: str) -> str:
+        """
+        Simplifie un texte.
+
+        Args:
+            text: Texte à simplifier
+
+        Returns:
+            str: Texte simplifié
+        """
+        text = normalize_text(text)
+        if not text:
+            return text
+
+        future = self._inflight.get(text)
+        if future is None:
+            future = asyncio.get_running_loop().create_future()
+            self._inflight[text] = future
+            self._enqueue(text)
+        # Une demande annulée ne doit pas annuler celles qui partagent le résultat
+        return await asyncio.shield(future)
+
+    async def simplify_many(self, texts: Iterable[str]) -> List[str]:
+        """Simplifie plusieurs textes, dans l'ordre donné."""
+        return list(await asyncio.gather(*(self.simplify(text) for text in texts)))
+
+    def _enqueue(self, text: str) -> None:
+        self._pending.append(text)
+        if len(self._pending) >= self.max_batch_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = asyncio.get_running_loop().call_later(self.max_wait, self._flush)
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if batch:
+            task = asyncio.ensure_future(self._run_batch(batch))
+            self._batches.add(task)
+            task.add_done_callback(self._batches.discard)
+
+    async def _run_batch(self, batch: List[str]) -> None:
+        results: Dict[str, str] = {}
+        error: Optional[Exception] = None
+        try:
+            model, version = await self.backend.identify()
+            keys = {text: PromptCache.key(text, model, version) for text in batch}
+            known = await self.cache.get_many(keys.values())
+            results = {text: known[key] for text, key in keys.items() if key in known}
+            missing = [text for text in batch if text not in results]
+            if missing:
+                simplified, model, version = await self.backend.simplify(missing)
+                computed = dict(zip(missing, simplified))
+                results.update(computed)
+                try:
+                    # Rangés sous le modèle qui les a réellement produits
+                    await self.cache.set_many({
+                        PromptCache.key(text, model, version): result for text, result in computed.items()
+                    })
+                except Exception:
+                    logger.exception("Écriture impossible dans le cache LLM")
+        except Exception as e:
+            error = e
+        finally:
+            # Un lot annulé annule les demandes restées sans résultat
+            for text in batch:
+                future = self._inflight.pop(text, None)
+                if future is None or future.done():
+                    continue
+                if error is not None:
+                    future.set_exception(error)
+                elif text in results:
+                    future.set_result(results[text])
+                else:
+                    future.cancel()
+
+    async def close(self) -> None:
+        """Traite les demandes en attente puis libère les ressources."""
+        self._flush()
+        await asyncio.gather(*self._batches, return_exceptions=True)
+        if isinstance(self.backend, HTTPBackend):
+            await self.backend.close()
+        self.cache.close()
+
+
+def create_llm_client() -> LLMClient:
+    """Construit le client LLM décrit par la configuration."""
+    if settings.LLM_BACKEND == "local":
+        backend: LLMBackend = LocalBackend()
+    else:
+        backend = HTTPBackend(settings.LLM_SERVICE_URL, settings.LLM_MODEL)
+    return LLMClient(
+        backend,
+        PromptCache(settings.LLM_CACHE_PATH),
+        max_batch_size=settings.LLM_BATCH_SIZE,
+        max_wait=settings.LLM_BATCH_WAIT_MS / 1000
+    )
+
+
+# Clients LLM du processus courant, par fabrique : (boucle d'événements, client)
+_process_clients: Dict[Callable[[], LLMClient], Tuple[asyncio.AbstractEventLoop, LLMClient]] = {}
+_process_clients_pid: Optional[int] = None
+_process_clients_lock = threading.Lock()
+
+
+def process_client(factory: Callable[[], LLMClient]) -> Tuple[asyncio.AbstractEventLoop, LLMClient]:
+    """
+    Client LLM propre au processus courant, sur une boucle tournant dans un thread dédié.
+
+    Un processus issu d'un fork crée le sien : la boucle du parent n'y tourne pas.
+
+    Args:
+        factory: Fonction construisant le client, appelée une fois par processus
+    """
+    global _process_clients_pid
+    with _process_clients_lock:
+        if _process_clients_pid != os.getpid():
+            _process_clients.clear()
+            _process_clients_pid = os.getpid()
+        runner = _process_clients.get(factory)
+        if runner is None:
+            loop = asyncio.new_event_loop()
+            threading.Thread(target=loop.run_forever, name="llm-client", daemon=True).start()
+            runner = _process_clients[factory] = (loop, factory())
+        return runner
+
+
+@dataclass(frozen=True)
+class LLMTransform:
+    """
+    Adaptation de bloc du pipeline confiée au service LLM.
+
+    Les blocs adaptés en même temps par les threads d'un même processus
+    partent dans les mêmes lots. Picklable : elle peut être envoyée aux
+    processus du pool de transformation, qui créent chacun leur client.
+    """
+    factory: Callable[[], LLMClient] = create_llm_client
+
+    def __call__(self, block: Block) -> str:
+        loop, client = process_client(self.factory)
+        return asyncio.run_coroutine_threadsafe(client.simplify(block.text), loop).result()
+
+    def version(self) -> str:
+        """Modèle et version servis : en changer invalide les blocs d'une version précédente du document."""
+        loop, client = process_client(self.factory)
+        model, version = asyncio.run_coroutine_threadsafe(client.backend.identify(), loop).result()
+        return f"llm:{model}:{version}"
@@ -0,0 +1,187 @@
+"""
+Écritures différées des métadonnées temp_files.
+
+Les changements de statut ne sont pas envoyés un par un : ils sont gardés
+en mémoire, fusionnés par fichier (seul le dernier état compte), puis
+écrits ensemble au plus tard `flush_interval` secondes après le premier
+changement en attente. Les fichiers qui reçoivent le même statut sont mis
+à jour par une seule requête. Les changements en attente sont écrits à
+l'arrêt du service.
+
+Les colonnes propres à un fichier (chemin transformé, empreintes des blocs,
+processed_at) ne se grouperaient avec aucun autre : elles sont écrites
+aussitôt, avec les changements encore en attente pour ce fichier.
+"""
+import asyncio
+import importlib.util
+import json
+import logging
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+import httpx
+from postgrest import AsyncPostgrestClient
+
+from .metrics import DB_UPDATE_SECONDS, METADATA_FLUSH_ROWS
+
+logger = logging.getLogger(__name__)
+
+# Colonnes partagées par de nombreux fichiers, dont l'écriture est différée et groupée
+DEFERRED_COLUMNS = frozenset({"status"})
+
+# HTTP/2 nécessite le paquet h2 (httpx[http2] dans requirements.txt) ; sans lui,
+# le client reste en HTTP/1.1, avec ses connexions conservées entre les requêtes
+HTTP2 = importlib.util.find_spec("h2") is not None
+
+
+def pooled_client(base_url: str, headers: Dict[str, str], max_connections: int,
+                  timeout: float = 5.0) -> httpx.AsyncClient:
+    """
+    Client HTTP unique vers PostgREST, aux connexions conservées.
+
+    En HTTP/2, les requêtes simultanées partagent une même connexion.
+    """
+    return httpx.AsyncClient(
+        base_url=base_url,
+        headers=headers,
+        timeout=timeout,
+        http2=HTTP2,
+        limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+    )
+
+
+class MetadataRepository:
+    """
+    Mises à jour groupées de la table temp_files.
+
+    Les lectures du même processus voient les changements encore en attente
+    (`pending`) : une écriture différée ne retarde jamais une réponse locale.
+    """
+
+    def __init__(self, postgrest: AsyncPostgrestClient, slots: asyncio.Semaphore, flush_interval: float = 1.0,
+                 max_pending: int = 500, table: str = "temp_files",
+                 on_written: Optional[Callable[[Dict[str, Any]], None]] = None):
+        """
+        Args:
+            postgrest: Client PostgREST
+            slots: Appels simultanés autorisés vers Supabase, partagés avec le service
+            flush_interval: Délai maximal avant l'écriture d'un changement, en secondes
+            max_pending: Fichiers en attente au-delà desquels l'écriture est immédiate
+            table: Table mise à jour
+            on_written: Appelée avec chaque ligne écrite, telle que renvoyée par la base
+        """
+        self.postgrest = postgrest
+        self.slots = slots
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.table = table
+        self.on_written = on_written
+        self._pending: Dict[str, Dict[str, Any]] = {}
+        self._timer: Optional[asyncio.Task] = None
+        self._lock = asyncio.Lock()
+
+    def pending(self, file_id: str) -> Optional[Dict[str, Any]]:
+        """Changements d'un fichier pas encore écrits, s'il y en a."""
+        return self._pending.get(str(file_id))
+
+    async def update(self, file_id: str, changes: Dict[str, Any]) -> None:
+        """
+        Enregistre des changements, fusionnés avec ceux déjà en attente pour ce fichier.
+
+        Un fichier qui passe à "processed" reçoit l'heure du changement (processed_at).
+        Seuls les changements de statut sont différés ; les autres sont écrits
+        aussitôt.
+
+        Args:
+            file_id: Identifiant du fichier
+            changes: Colonnes à mettre à jour
+
+        Raises:
+            APIError, httpx.HTTPError: Si une écriture immédiate échoue
+        """
+        file_id = str(file_id)
+        changes = dict(changes)
+        if changes.get("status") == "processed":
+            changes["processed_at"] = datetime.now().isoformat()
+        if not DEFERRED_COLUMNS.issuperset(changes):
+            await self._write(file_id, changes)
+            return
+
+        self._pending.setdefault(file_id, {}).update(changes)
+        if len(self._pending) >= self.max_pending:
+            await self.flush()
+        elif self._timer is None:
+            self._timer = asyncio.create_task(self._flush_later(), name="metadata-flush")
+
+    async def _write(self, file_id: str, changes: Dict[str, Any]) -> None:
+        # Sous le verrou : une écriture groupée en cours, plus ancienne, ne peut pas passer après
+        async with self._lock:
+            changes = {**self._pending.pop(file_id, {}), **changes}
+            async with self.slots, DB_UPDATE_SECONDS.time(mode="single"):
+                result = await self.postgrest.from_(self.table)\
+                    .update(changes)\
+                    .eq("id", file_id)\
+                    .execute()
+        if self.on_written is not None:
+            for row in result.data or []:
+                self.on_written(row)
+
+    async def _flush_later(self) -> None:
+        await asyncio.sleep(self.flush_interval)
+        self._timer = None
+        await self.flush()
+
+    async def flush(self) -> int:
+        """
+        Écrit les changements en attente, une requête par statut.
+
+        Un groupe en échec reste en attente pour l'écriture suivante, sauf si
+        des changements plus récents l'ont remplacé entre-temps.
+
+        Returns:
+            int: Nombre de fichiers mis à jour
+        """
+        async with self._lock:
+            pending, self._pending = self._pending, {}
+            if not pending:
+                return 0
+            METADATA_FLUSH_ROWS.observe(len(pending))
+
+            groups: Dict[str, List[str]] = {}
+            for file_id, changes in pending.items():
+                groups.setdefault(json.dumps(changes, sort_keys=True, default=str), []).append(file_id)
+
+            written = 0
+            for payload, file_ids in groups.items():
+                try:
+                    async with self.slots, DB_UPDATE_SECONDS.time(mode="bulk"):
+                        result = await self.postgrest.from_(self.table)\
+                            .update(json.loads(payload))\
+                            .in_("id", file_ids)\
+                            .execute()
+                except Exception:
+                    logger.warning("Écriture des statuts reportée", extra={"files": len(file_ids)}, exc_info=True)
+                    for file_id in file_ids:
+                        self._pending[file_id] = {**pending[file_id], **self._pending.get(file_id, {})}
+                    continue
+                written += len(file_ids)
+                if self.on_written is not None:
+                    for row in result.data or []:
+                        self.on_written(row)
+
+            if self._pending and self._timer is None:
+                self._timer = asyncio.create_task(self._flush_later(), name="metadata-flush")
+            return written
+
+    async def close(self) -> None:
+        """Écrit tout ce qui est en attente ; appelée à l'arrêt de l'application."""
+        # Une écriture déjà commencée n'est pas interrompue : flush attend sa fin
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        await self.flush()
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if self._pending:
+            logger.error("Statuts non écrits à l'arrêt", extra={"files": len(self._pending)})
@@ -0,0 +1,298 @@
+"""
+Métriques au format Prometheus et mesure des temps sur les chemins critiques.
+
+Implémentation volontairement minimale : compteurs, jauges et histogrammes
+en mémoire, exposés au format texte de Prometheus. Une observation coûte
+une recherche dichotomique et quelques additions sous verrou ; lorsque les
+métriques sont désactivées (METRICS_ENABLED=false), les mesures ne lisent
+même pas l'horloge.
+"""
+import asyncio
+import bisect
+import functools
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from ..config import get_settings
+
+settings = get_settings()
+
+# Bornes par défaut des histogrammes de durée, en secondes
+DURATION_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# Bornes des histogrammes de taille, en octets
+SIZE_BUCKETS = (1024, 16 * 1024, 64 * 1024, 256 * 1024, 1024 ** 2, 4 * 1024 ** 2, 16 * 1024 ** 2, 64 * 1024 ** 2)
+
+Labels = Tuple[str, ...]
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class Metric:
+    """Base commune : nom, description et étiquettes."""
+    type = "untyped"
+
+    def __init__(self, registry: "Registry", name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._registry = registry
+        self._lock = threading.Lock()
+        registry.register(self)
+
+    def _key(self, labels: Dict[str, str]) -> Labels:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def samples(self) -> Iterable[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        header = f"# HELP {self.name} {self.help}\n# TYPE {self.name} {self.type}\n"
+        return header + "".join(line + "\n" for line in self.samples())
+
+
+class Counter(Metric):
+    """Valeur cumulée, qui ne fait qu'augmenter."""
+    type = "counter"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: Dict[Labels, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        if not self._registry.enabled:
+            return
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def samples(self) -> Iterable[str]:
+        with self._lock:
+            values = list(self._values.items())
+        for key, value in values:
+            yield f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+
+
+class Gauge(Metric):
+    """Valeur instantanée, éventuellement lue à la demande via une fonction."""
+    type = "gauge"
+
+    def __init__(self, *args, function: Optional[Callable[[], float]] = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: Dict[Labels, float] = {}
+        self.function = function
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        if not self._registry.enabled:
+            return
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels: str) -> None:
+        self.inc(-amount, **labels)
+
+    def set(self, value: float, **labels: str) -> None:
+        if not self._registry.enabled:
+            return
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def samples(self) -> Iterable[str]:
+        if self.function is not None:
+            yield f"{self.name} {_format_value(self.function())}"
+            return
+        with self._lock:
+            values = list(self._values.items())
+        for key, value in values:
+            yield f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+
+
+class Histogram(Metric):
+    """Distribution d'observations par intervalles cumulés."""
+    type = "histogram"
+
+    def __init__(self, *args, buckets: Sequence[float] = DURATION_BUCKETS, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.buckets = tuple(sorted(buckets))
+        # Par jeu d'étiquettes : effectifs par intervalle (le dernier pour +Inf), somme
+        self._series: Dict[Labels, Tuple[List[int], List[float]]] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        if not self._registry.enabled:
+            return
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = ([0] * (len(self.buckets) + 1), [0.0])
+            series[0][index] += 1
+            series[1][0] += value
+
+    def time(self, **labels: str) -> "Timer":
+        """Mesure une durée, comme gestionnaire de contexte ou décorateur."""
+        return Timer(self, labels)
+
+    def samples(self) -> Iterable[str]:
+        with self._lock:
+            series = [(key, list(counts), total[0]) for key, (counts, total) in self._series.items()]
+        for key, counts, total in series:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = 'le="{}"'.format(_format_value(bound))
+                yield f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}"
+            yield f"{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(total)}"
+            yield f"{self.name}_count{_format_labels(self.labelnames, key)} {cumulative}"
+
+
+class Timer:
+    """
+    Mesure la durée d'un bloc ou d'une fonction dans un histogramme.
+
+    S'utilise avec `with`, `async with` ou comme décorateur d'une fonction
+    synchrone ou asynchrone.
+    """
+
+    __slots__ = ("histogram", "labels", "_start")
+
+    def __init__(self, histogram: Histogram, labels: Dict[str, str]):
+        self.histogram = histogram
+        self.labels = labels
+        self._start: Optional[float] = None
+
+    def __enter__(self) -> "Timer":
+        if self.histogram._registry.enabled:
+            self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        if self._start is not None:
+            self.histogram.observe(time.perf_counter() - self._start, **self.labels)
+            self._start = None
+
+    async def __aenter__(self) -> "Timer":
+        return self.__enter__()
+
+    async def __aexit__(self, *exc_info) -> None:
+        self.__exit__(*exc_info)
+
+    def __call__(self, function: Callable) -> Callable:
+        histogram, labels = self.histogram, self.labels
+        if asyncio.iscoroutinefunction(function):
+            @functools.wraps(function)
+            async def async_wrapper(*args, **kwargs):
+                with Timer(histogram, labels):
+                    return await function(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            with Timer(histogram, labels):
+                return function(*args, **kwargs)
+        return wrapper
+
+
+class Registry:
+    """Ensemble des métriques exposées par /metrics."""
+
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self._metrics: Dict[str, Metric] = {}
+
+    def register(self, metric: Metric) -> None:
+        if metric.name in self._metrics:
+            raise ValueError(f"Métrique déjà déclarée: {metric.name}")
+        self._metrics[metric.name] = metric
+
+    def counter(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Counter:
+        return Counter(self, name, help, labelnames)
+
+    def gauge(self, name: str, help: str, labelnames: Sequence[str] = (),
+              function: Optional[Callable[[], float]] = None) -> Gauge:
+        return Gauge(self, name, help, labelnames, function=function)
+
+    def histogram(self, name: str, help: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DURATION_BUCKETS) -> Histogram:
+        return Histogram(self, name, help, labelnames, buckets=buckets)
+
+    def render(self) -> str:
+        """Toutes les métriques au format texte de Prometheus (version 0.0.4)."""
+        return "".join(metric.render() for metric in self._metrics.values())
+
+
+registry = Registry(enabled=settings.METRICS_ENABLED)
+
+# Requêtes HTTP
+REQUEST_SECONDS = registry.histogram(
+    "todys_http_request_duration_seconds", "Durée des requêtes HTTP", ("method", "route", "status")
+)
+REQUESTS_IN_FLIGHT = registry.gauge(
+    "todys_http_requests_in_flight", "Requêtes HTTP en cours de traitement", ("route",)
+)
+
+# Upload
+UPLOAD_BYTES = registry.histogram(
+    "todys_upload_bytes", "Octets lus par fichier uploadé", buckets=SIZE_BUCKETS
+)
+VALIDATION_SECONDS = registry.histogram(
+    "todys_upload_validation_seconds", "Lecture, validation et empreinte d'un fichier uploadé"
+)
+LIBMAGIC_SECONDS = registry.histogram(
+    "todys_libmagic_seconds", "Détection du type MIME par libmagic"
+)
+MIME_DETECTIONS = registry.counter(
+    "todys_mime_detections_total", "Types MIME détectés, par méthode de détection", ("method",)
+)
+SIGNATURE_SCAN_SECONDS = registry.histogram(
+    "todys_signature_scan_seconds", "Recherche de signatures malveillantes dans un morceau"
+)
+
+# Stockage et base
+STORAGE_PUT_SECONDS = registry.histogram(
+    "todys_storage_put_seconds", "Envoi d'un objet au stockage", ("kind",)
+)
+DB_INSERT_SECONDS = registry.histogram(
+    "todys_db_insert_seconds", "Insertion dans temp_files", ("mode",)
+)
+DB_UPDATE_SECONDS = registry.histogram(
+    "todys_db_update_seconds", "Mise à jour de temp_files", ("mode",)
+)
+METADATA_FLUSH_ROWS = registry.histogram(
+    "todys_metadata_flush_rows", "Fichiers dont les statuts sont écrits ensemble",
+    buckets=(1, 2, 5, 10, 20, 50, 100, 200, 500)
+)
+
+# Nettoyage des fichiers expirés
+SWEEPER_ROWS_DELETED = registry.counter(
+    "todys_sweeper_rows_deleted_total", "Lignes temp_files expirées supprimées"
+)
+SWEEPER_OBJECTS_DELETED = registry.counter(
+    "todys_sweeper_objects_deleted_total", "Objets stockés supprimés avec les fichiers expirés"
+)
+SWEEPER_ERRORS = registry.counter(
+    "todys_sweeper_errors_total", "Échecs du nettoyage, par lot ou par passage"
+)
+
+# File de transformations, mesurée à chaque ajout
+QUEUE_DEPTH = registry.histogram(
+    "todys_job_queue_depth_on_submit", "Tâches en attente à l'ajout d'une tâche",
+    buckets=(0, 1, 2, 5, 10, 20, 50, 100, 200, 500)
+)
@@ -0,0 +1,109 @@
+"""
+Diffusion en mémoire de l'avancement des transformations.
+"""
+import asyncio
+import json
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+from typing import AsyncIterator, Dict, Optional, Set
+
+from .cache import TTLCache
+
+
+class Stage:
+    """Étapes successives du traitement d'un fichier."""
+    UPLOADED = "uploaded"
+    EXTRACTING = "extracting"
+    TRANSFORMING = "transforming"
+    READY = "ready"
+    FAILED = "failed"
+
+    FINAL = (READY, FAILED)
+
+
+@dataclass(frozen=True)
+class ProgressEvent:
+    """Avancement d'un fichier à un instant donné."""
+    file_id: str
+    stage: str
+    done: Optional[int] = None
+    total: Optional[int] = None
+    detail: Optional[str] = None
+    at: str = field(default_factory=lambda: datetime.now().isoformat())
+
+    @property
+    def is_final(self) -> bool:
+        return self.stage in Stage.FINAL
+
+    def to_sse(self) -> str:
+        """Message au format Server-Sent Events."""
+        return f"data: {json.dumps(asdict(self), ensure_ascii=False)}\n\n"
+
+
+class ProgressBroker:
+    """
+    Publication/abonnement en mémoire, un sujet par fichier.
+
+    Chaque abonné dispose d'une file bornée : un abonné trop lent perd les
+    événements intermédiaires les plus anciens, jamais le dernier. Le
+    dernier événement de chaque fichier est conservé pour être remis
+    immédiatement aux nouveaux abonnés.
+    """
+
+    def __init__(self, subscriber_buffer: int = 32, retention: float = 3600.0):
+        """
+        Args:
+            subscriber_buffer: Nombre d'événements en attente par abonné
+            retention: Durée de conservation du dernier événement, en secondes
+        """
+        self.subscriber_buffer = subscriber_buffer
+        self._subscribers: Dict[str, Set[asyncio.Queue]] = {}
+        self._last: TTLCache[str, ProgressEvent] = TTLCache(maxsize=10_000, ttl=retention)
+
+    def last(self, file_id: str) -> Optional[ProgressEvent]:
+        """Dernier événement publié pour un fichier."""
+        return self._last.get(file_id)
+
+    def publish(self, event: ProgressEvent) -> None:
+        """Diffuse un événement à tous les abonnés du fichier, sans attendre."""
+        self._last.set(event.file_id, event)
+        for queue in self._subscribers.get(event.file_id, ()):
+            if queue.full():
+                queue.get_nowait()
+            queue.put_nowait(event)
+
+    async def subscribe(self, file_id: str, heartbeat: Optional[float] = None) -> AsyncIterator[Optional[ProgressEvent]]:
+        """
+        Produit les événements d'un fichier, à commencer par le dernier connu.
+
+        L'itération s'arrête après l'événement final (prêt ou échec).
+
+        Args:
+            file_id: Fichier suivi
+            heartbeat: Si fourni, None est produit après ce délai sans événement,
+                pour permettre à l'appelant de maintenir sa connexion
+        """
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.subscriber_buffer)
+        last = self.last(file_id)
+        if last is not None:
+            queue.put_nowait(last)
+
+        subscribers = self._subscribers.setdefault(file_id, set())
+        subscribers.add(queue)
+        try:
+            while True:
+                try:
+                    event = await asyncio.wait_for(queue.get(), heartbeat)
+                except asyncio.TimeoutError:
+                    yield None
+                    continue
+                yield event
+                if event.is_final:
+                    return
+        finally:
+            subscribers.discard(queue)
+            if not subscribers:
+                self._subscribers.pop(file_id, None)
+
+    def subscriber_count(self, file_id: str) -> int:
+        return len(self._subscribers.get(file_id, ()))
@@ -0,0 +1,170 @@
+"""
+Moteur de détection de signatures malveillantes.
+
+Les signatures sont compilées en une seule expression régulière construite à
+partir d'un trie des motifs : le moteur `re` (en C) ne teste, à chaque
+position, que les branches compatibles avec les octets déjà lus, si bien que
+le coût du scan dépend de la profondeur du trie et non du nombre de règles.
+"""
+import codecs
+import re
+from dataclasses import dataclass
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Union
+
+# Jeu de signatures livré avec l'application
+DEFAULT_SIGNATURES_FILE = Path(__file__).with_name("signatures.txt")
+
+
+@dataclass(frozen=True)
+class Signature:
+    """Règle de détection : un nom et le motif binaire recherché."""
+    name: str
+    pattern: bytes
+
+
+@dataclass(frozen=True)
+class SignatureMatch:
+    """Occurrence d'une signature dans un contenu."""
+    signature: Signature
+    offset: int
+
+
+def load_signatures(path: Union[str, Path]) -> List[Signature]:
+    """
+    Charge un jeu de signatures depuis un fichier texte.
+
+    Chaque ligne non vide est de la forme `nom = motif` ; le motif accepte
+    les séquences d'échappement Python (`\\x00`, `\\\\`...). Les lignes
+    commençant par `#` sont ignorées.
+
+    Args:
+        path: Chemin du fichier de signatures
+
+    Returns:
+        List[Signature]: Les signatures, dans l'ordre du fichier
+
+    Raises:
+        ValueError: Si une ligne est mal formée
+    """
+    signatures = []
+    for line_number, line in enumerate(Path(path).read_text(encoding="utf-8").splitlines(), start=1):
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+
+        name, separator, raw_pattern = line.partition("=")
+        name, raw_pattern = name.strip(), raw_pattern.strip()
+        if not separator or not name or not raw_pattern:
+            raise ValueError(f"Signature invalide ligne {line_number}: {line!r}")
+
+        pattern = codecs.escape_decode(raw_pattern.encode("utf-8"))[0]
+        signatures.append(Signature(name=name, pattern=pattern))
+
+    return signatures
+
+
+def _trie_regex(patterns: Iterable[bytes]) -> bytes:
+    """Construit une expression régulière équivalente à l'alternative des motifs, factorisée en trie."""
+    trie: Dict = {}
+    for pattern in patterns:
+        node = trie
+        for byte in pattern:
+            node = node.setdefault(byte, {})
+        node[None] = True
+
+    def emit(node: Dict) -> bytes:
+        # Un motif se termine ici : inutile d'aller plus loin pour détecter
+        if None in node:
+            return b""
+        branches = [re.escape(bytes([byte])) + emit(child) for byte, child in sorted(node.items())]
+        if len(branches) == 1:
+            return branches[0]
+        return b"(?:" + b"|".join(branches) + b")"
+
+    return emit(trie)
+
+
+class SignatureScanner:
+    """
+    Recherche simultanée de toutes les signatures d'un jeu de règles.
+    """
+
+    def __init__(self, signatures: Iterable[Signature]):
+        self.signatures = list(signatures)
+        if not self.signatures:
+            raise ValueError("Le jeu de signatures est vide")
+
+        # Pour un même motif, la première règle déclarée l'emporte
+        self._by_pattern: Dict[bytes, Signature] = {}
+        for signature in self.signatures:
+            self._by_pattern.setdefault(signature.pattern, signature)
+        self._regex = re.compile(_trie_regex(self._by_pattern), re.DOTALL)
+
+        # Octets à conserver entre deux morceaux pour les motifs à cheval
+        self.overlap = max(len(pattern) for pattern in self._by_pattern) - 1
+
+    @classmethod
+    def from_file(cls, path: Union[str, Path]) -> "SignatureScanner":
+        return cls(load_signatures(path))
+
+    def scan(self, content: bytes, offset: int = 0) -> Optional[SignatureMatch]:
+        """
+        Recherche la première signature présente dans un contenu.
+
+        Args:
+            content: Contenu à analyser
+            offset: Position de `content` dans le fichier, reportée dans le résultat
+
+        Returns:
+            Optional[SignatureMatch]: La première occurrence trouvée, ou None
+        """
+        match = self._regex.search(content)
+        if match is None:
+            return None
+        return SignatureMatch(signature=self._by_pattern[match.group()], offset=offset + match.start())
+
+    def stream(self) -> "StreamScan":
+        """Prépare l'analyse d'un contenu lu par morceaux."""
+        return StreamScan(self)
+
+
+class StreamScan:
+    """
+    Analyse incrémentale d'un contenu découpé en morceaux.
+
+    La fin de chaque morceau est conservée pour détecter les signatures qui
+    chevauchent deux morceaux ; la mémoire utilisée reste bornée par la
+    taille d'un morceau plus celle de la plus longue signature.
+    """
+
+    def __init__(self, scanner: SignatureScanner):
+        self._scanner = scanner
+        self._tail = b""
+        self._position = 0
+
+    def feed(self, chunk: bytes) -> Optional[SignatureMatch]:
+        """
+        Analyse le morceau suivant.
+
+        Args:
+            chunk: Morceau suivant du contenu
+
+        Returns:
+            Optional[SignatureMatch]: Une occurrence trouvée, avec sa position dans le contenu complet
+        """
+        window = self._tail + chunk
+        window_start = self._position - len(self._tail)
+        self._position += len(chunk)
+
+        match = self._scanner.scan(window, offset=window_start)
+        if self._scanner.overlap:
+            self._tail = window[-self._scanner.overlap:]
+        return match
+
+
+@lru_cache()
+def get_scanner(path: Union[str, Path] = DEFAULT_SIGNATURES_FILE) -> SignatureScanner:
+    """Scanner d'un fichier de signatures, compilé une seule fois par fichier."""
+    return SignatureScanner.from_file(path)
@@ -0,0 +1,237 @@
+"""
+Stockage des fichiers : bucket Supabase ou disque local.
+"""
+import asyncio
+import mmap
+import os
+import re
+import shutil
+import tempfile
+from pathlib import Path
+from typing import AsyncIterable, AsyncIterator, List, Optional, Protocol, Tuple
+
+import httpx
+from storage3 import AsyncStorageClient
+
+from .file_validator import CHUNK_SIZE
+
+# Une seule plage d'octets, seule forme acceptée par la route de téléchargement
+SINGLE_RANGE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+class ObjectStorage(Protocol):
+    """Stockage d'objets adressés par un chemin relatif au bucket."""
+
+    async def put(self, path: str, chunks: AsyncIterable[bytes], content_type: str) -> None:
+        """Écrit un objet, en remplaçant l'éventuel objet existant."""
+        ...
+
+    async def download_to(self, path: str, destination: Path) -> Path:
+        """Copie un objet dans un fichier local."""
+        ...
+
+    async def open(self, path: str, byte_range: Optional[str] = None) -> httpx.Response:
+        """
+        Ouvre un objet en flux, éventuellement partiellement.
+
+        La réponse n'est pas lue : l'appelant la consomme par morceaux puis la
+        ferme avec `aclose()`. Son statut suit HTTP (200, 206, 404, 416).
+        """
+        ...
+
+    async def public_url(self, path: str) -> Optional[str]:
+        """Adresse publique d'un objet, ou None s'il n'est servi que par l'application."""
+        ...
+
+    async def remove(self, paths: List[str]) -> int:
+        """Supprime des objets et retourne le nombre d'objets effectivement supprimés."""
+        ...
+
+
+class SupabaseStorage:
+    """Objets stockés dans un bucket Supabase Storage, envoyés et lus en flux."""
+
+    def __init__(self, client: AsyncStorageClient, bucket_name: str, slots: asyncio.Semaphore):
+        """
+        Args:
+            client: Client Storage, dont la session httpx conserve ses connexions
+            bucket_name: Bucket des objets
+            slots: Limite des appels simultanés, partagée avec la base
+        """
+        self.client = client
+        self.bucket_name = bucket_name
+        self._slots = slots
+
+    async def put(self, path: str, chunks: AsyncIterable[bytes], content_type: str) -> None:
+        async with self._slots:
+            response = await self.client.session.post(
+                f"/object/{self.bucket_name}/{path}",
+                content=chunks,
+                headers={
+                    "content-type": content_type,
+                    # Deux uploads simultanés du même contenu écrivent le même objet
+                    "x-upsert": "true"
+                }
+            )
+        response.raise_for_status()
+
+    async def download_to(self, path: str, destination: Path) -> Path:
+        async with self._slots:
+            async with self.client.session.stream("GET", f"/object/{self.bucket_name}/{path}") as response:
+                response.raise_for_status()
+                with destination.open("wb") as output:
+                    async for chunk in response.aiter_bytes(CHUNK_SIZE):
+                        output.write(chunk)
+        return destination
+
+    async def open(self, path: str, byte_range: Optional[str] = None) -> httpx.Response:
+        headers = {"range": byte_range} if byte_range else {}
+        request = self.client.session.build_request(
+            "GET", f"/object/{self.bucket_name}/{path}", headers=headers
+        )
+        async with self._slots:
+            return await self.client.session.send(request, stream=True)
+
+    async def public_url(self, path: str) -> str:
+        return await self.client.from_(self.bucket_name).get_public_url(path)
+
+    async def remove(self, paths: List[str]) -> int:
+        if not paths:
+            return 0
+        async with self._slots:
+            removed = await self.client.from_(self.bucket_name).remove(paths)
+        return len(removed) if isinstance(removed, list) else 0
+
+
+class MappedFileStream(httpx.AsyncByteStream):
+    """Lecture d'une portion de fichier projetée en mémoire, par morceaux."""
+
+    def __init__(self, path: Path, start: int, end: int, chunk_size: int = CHUNK_SIZE):
+        self.path = path
+        self.start = start
+        self.end = end
+        self.chunk_size = chunk_size
+
+    async def __aiter__(self) -> AsyncIterator[bytes]:
+        if self.start >= self.end:
+            return
+        with self.path.open("rb") as source, mmap.mmap(source.fileno(), 0, access=mmap.ACCESS_READ) as view:
+            view.madvise(mmap.MADV_SEQUENTIAL)
+            for offset in range(self.start, self.end, self.chunk_size):
+                yield view[offset:min(offset + self.chunk_size, self.end)]
+
+    async def aclose(self) -> None:
+        pass
+
+
+def parse_range(byte_range: str, size: int) -> Optional[Tuple[int, int]]:
+    """
+    Bornes [début, fin[ d'une plage d'octets simple.
+
+    Returns:
+        Optional[Tuple[int, int]]: Les bornes, ou None si la plage ne peut
+            pas être satisfaite
+    """
+    match = SINGLE_RANGE.match(byte_range.strip())
+    if match is None or match.group(1) == match.group(2) == "":
+        return None
+    first, last = match.groups()
+    if first == "":
+        # Suffixe : les N derniers octets
+        start, end = max(0, size - int(last)), size
+    else:
+        start = int(first)
+        end = min(size, int(last) + 1) if last else size
+    if start >= size or start >= end:
+        return None
+    return start, end
+
+
+class LocalStorage:
+    """
+    Objets stockés sur le disque local, sous un répertoire racine.
+
+    Pour les déploiements où l'application et ses workers partagent un
+    disque : aucun aller-retour réseau. Les écritures sont atomiques (fichier
+    temporaire puis renommage) et les copies faites par le noyau
+    (sendfile/copy_file_range). La route de téléchargement envoie les
+    fichiers directement depuis le disque (`path_of`) ; `open` les lit par
+    projection en mémoire.
+    """
+
+    def __init__(self, root: Path):
+        self.root = Path(root).resolve()
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    def path_of(self, path: str) -> Path:
+        """
+        Fichier local d'un objet.
+
+        Raises:
+            ValueError: Si le chemin sort du répertoire racine
+        """
+        resolved = (self.root / path).resolve()
+        if not resolved.is_relative_to(self.root) or resolved == self.root:
+            raise ValueError(f"Chemin d'objet invalide: {path}")
+        return resolved
+
+    async def put(self, path: str, chunks: AsyncIterable[bytes], content_type: str) -> None:
+        target = self.path_of(path)
+        await asyncio.to_thread(target.parent.mkdir, parents=True, exist_ok=True)
+        descriptor, temporary = tempfile.mkstemp(dir=target.parent, prefix=f".{target.name}.", suffix=".tmp")
+        try:
+            with os.fdopen(descriptor, "wb") as output:
+                async for chunk in chunks:
+                    await asyncio.to_thread(output.write, chunk)
+                await asyncio.to_thread(os.fsync, output.fileno())
+            # Les lecteurs voient l'ancien objet ou le nouveau, jamais un objet partiel
+            await asyncio.to_thread(os.replace, temporary, target)
+        except BaseException:
+            Path(temporary).unlink(missing_ok=True)
+            raise
+
+    async def download_to(self, path: str, destination: Path) -> Path:
+        source = self.path_of(path)
+        # shutil.copyfile délègue la copie au noyau sous Linux
+        await asyncio.to_thread(shutil.copyfile, source, destination)
+        return destination
+
+    async def open(self, path: str, byte_range: Optional[str] = None) -> httpx.Response:
+        source = self.path_of(path)
+        try:
+            size = source.stat().st_size
+        except FileNotFoundError:
+            return httpx.Response(404)
+
+        if byte_range is None:
+            return httpx.Response(
+                200,
+                headers={"content-length": str(size)},
+                stream=MappedFileStream(source, 0, size)
+            )
+
+        bounds = parse_range(byte_range, size)
+        if bounds is None:
+            return httpx.Response(416, headers={"content-range": f"bytes */{size}"})
+        start, end = bounds
+        return httpx.Response(
+            206,
+            headers={"content-length": str(end - start), "content-range": f"bytes {start}-{end - 1}/{size}"},
+            stream=MappedFileStream(source, start, end)
+        )
+
+    async def public_url(self, path: str) -> Optional[str]:
+        # Un chemin du disque du serveur n'a pas de sens pour le client
+        return None
+
+    async def remove(self, paths: List[str]) -> int:
+        def unlink_all() -> int:
+            removed = 0
+            for path in paths:
+                try:
+                    self.path_of(path).unlink()
+                    removed += 1
+                except FileNotFoundError:
+                    pass
+            return removed
+        return await asyncio.to_thread(unlink_all)
@@ -1,93 +1,591 @@
 """
 Service pour gérer les interactions avec Supabase.
 """
+import asyncio
+import hashlib
+import mimetypes
 import os
 from datetime import datetime, timedelta
-from typing import Any, Dict
+from pathlib import Path
+from typing import Any, AsyncIterator, Dict, List, Optional, Set, Tuple, Union
 
+import httpx
 from fastapi import UploadFile
-from supabase import Client, create_client
-from dotenv import load_dotenv
+from postgrest import AsyncPostgrestClient
+from postgrest.constants import DEFAULT_POSTGREST_CLIENT_HEADERS
+from storage3 import AsyncStorageClient
 
-load_dotenv()
+from ..config import get_settings
+from .cache import TTLCache
+from .file_validator import CHUNK_SIZE, FileRejectedError, ValidationStream
+from .metadata import MetadataRepository, pooled_client
+from .metrics import DB_INSERT_SECONDS, DB_UPDATE_SECONDS, STORAGE_PUT_SECONDS, UPLOAD_BYTES, VALIDATION_SECONDS
+from .storage import LocalStorage, ObjectStorage, SupabaseStorage
+
+settings = get_settings()
+
+# Durée de vie d'un fichier uploadé, prolongée s'il est renvoyé peu avant son expiration
+FILE_LIFETIME = timedelta(days=1)
+# Un fichier réutilisé qui expire avant ce délai est prolongé, pour ne pas être
+# supprimé par le nettoyage pendant sa transformation ou son téléchargement
+REUSE_MARGIN = timedelta(hours=1)
 
 class SupabaseService:
-    def __init__(self):
+    """
+    Accès asynchrone à Supabase (Storage et base PostgREST).
+
+    Les clients httpx sous-jacents sont natifs asynchrones et conservent leurs
+    connexions keep-alive entre les requêtes ; aucun appel ne bloque la boucle
+    d'événements. Le nombre d'appels simultanés est borné par
+    STORAGE_MAX_CONCURRENCY. Les enregistrements temp_files récents sont
+    gardés dans un cache local indexé par empreinte de contenu.
+
+    Les fichiers sont confiés à un ObjectStorage : le bucket Supabase par
+    défaut, ou le disque local si STORAGE_BACKEND vaut "local".
+
+    Les requêtes PostgREST passent par un seul client HTTP, en HTTP/2 si
+    possible. Les changements de statut sont différés et écrits par lots
+    (MetadataRepository) ; `close` écrit ceux encore en attente.
+    """
+
+    def __init__(self, objects: Optional[ObjectStorage] = None):
+        """
+        Args:
+            objects: Stockage des fichiers, par défaut celui de STORAGE_BACKEND
+        """
         url = os.environ.get("SUPABASE_URL")
         key = os.environ.get("SUPABASE_KEY")
-        self.supabase: Client = create_client(url, key)
+        if not url or not key:
+            raise ValueError("SUPABASE_URL et SUPABASE_KEY doivent être définis")
+
+        auth_headers = {"apiKey": key, "Authorization": f"Bearer {key}"}
+        postgrest_headers = {**DEFAULT_POSTGREST_CLIENT_HEADERS, **auth_headers}
+        self.postgrest = AsyncPostgrestClient(f"{url}/rest/v1", headers=postgrest_headers)
+        # La session créée par le client, jamais ouverte, est remplacée par le client partagé
+        self.postgrest.session = pooled_client(
+            f"{url}/rest/v1",
+            {**postgrest_headers, "Accept-Profile": "public", "Content-Profile": "public"},
+            max_connections=settings.STORAGE_MAX_CONCURRENCY
+        )
+        self.storage = AsyncStorageClient(f"{url}/storage/v1", auth_headers)
         self.bucket_name = "temp_files"
+        self._slots = asyncio.Semaphore(settings.STORAGE_MAX_CONCURRENCY)
+        if objects is None:
+            objects = (
+                LocalStorage(settings.UPLOAD_DIR / self.bucket_name) if settings.STORAGE_BACKEND == "local"
+                else SupabaseStorage(self.storage, self.bucket_name, self._slots)
+            )
+        self.objects = objects
+        self._hash_cache: TTLCache[str, Dict[str, Any]] = TTLCache(
+            maxsize=settings.HASH_CACHE_SIZE,
+            ttl=settings.HASH_CACHE_TTL
+        )
+        self.metadata = MetadataRepository(
+            self.postgrest,
+            self._slots,
+            flush_interval=settings.METADATA_FLUSH_INTERVAL,
+            max_pending=settings.METADATA_MAX_PENDING,
+            on_written=self._remember
+        )
+
+    async def close(self) -> None:
+        """Écrit les statuts en attente, puis ferme les connexions HTTP conservées par les clients."""
+        await self.metadata.close()
+        await self.postgrest.aclose()
+        await self.storage.aclose()
+
+    async def _iter_chunks(self, file: UploadFile) -> AsyncIterator[bytes]:
+        """Relit le fichier par morceaux pour l'envoyer au stockage."""
+        await file.seek(0)
+        while chunk := await file.read(CHUNK_SIZE):
+            yield chunk
+
+    async def _hash_file(self, file: UploadFile, stream: Optional[ValidationStream]) -> str:
+        """
+        Lit le fichier une fois, par morceaux, pour le valider et calculer son empreinte.
+
+        Cette passe est purement locale : aucun octet n'est envoyé tant que le
+        fichier n'a pas été validé et que son empreinte n'est pas connue.
+
+        Raises:
+            FileRejectedError: Si la validation échoue
+        """
+        sha256 = hashlib.sha256()
+        size = 0
+        with VALIDATION_SECONDS.time():
+            await file.seek(0)
+            while chunk := await file.read(CHUNK_SIZE):
+                if stream is not None:
+                    await stream.feed(chunk)
+                sha256.update(chunk)
+                size += len(chunk)
+        UPLOAD_BYTES.observe(size)
+        return sha256.hexdigest()
+
+    def _remember(self, record: Dict[str, Any]) -> None:
+        """Met en cache un enregistrement temp_files jusqu'à son expiration."""
+        content_hash = record.get("content_hash")
+        expires_at = record.get("expires_at")
+        if not content_hash or not expires_at:
+            return
+
+        expires_at = datetime.fromisoformat(expires_at)
+        now = datetime.now(expires_at.tzinfo)
+        self._hash_cache.set(content_hash, record, ttl=(expires_at - now).total_seconds())
+
+    async def find_by_hash(self, content_hash: str) -> Optional[Dict[str, Any]]:
+        """
+        Recherche un fichier non expiré ayant le même contenu.
+
+        Le cache local est consulté avant la table temp_files.
+
+        Args:
+            content_hash (str): Empreinte SHA-256 du contenu
+
+        Returns:
+            Optional[Dict[str, Any]]: L'enregistrement existant, ou None
+        """
+        record = self._hash_cache.get(content_hash)
+        if record is not None:
+            return record
+
+        async with self._slots:
+            result = await self.postgrest.from_("temp_files")\
+                .select("*")\
+                .eq("content_hash", content_hash)\
+                .gt("expires_at", datetime.now().isoformat())\
+                .limit(1)\
+                .execute()
+
+        if not result.data:
+            return None
+
+        record = result.data[0]
+        self._remember(record)
+        return record
+
+    async def _store_object(self, file: UploadFile, content_hash: str) -> str:
+        """
+        Envoie le fichier au bucket, en flux, sous un chemin dérivé de son contenu.
+
+        Returns:
+            str: Chemin du fichier dans le bucket
+        """
+        file_path = f"{content_hash}{Path(file.filename).suffix.lower()}"
+        with STORAGE_PUT_SECONDS.time(kind="original"):
+            await self.objects.put(
+                file_path,
+                self._iter_chunks(file),
+                file.content_type or "application/octet-stream"
+            )
+        await file.seek(0)
+        return file_path
 
-    async def upload_file(self, file: UploadFile) -> Dict[str, Any]:
+    async def _keep_alive(self, record: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        Prolonge un fichier réutilisé qui expire bientôt.
+
+        Returns:
+            Optional[Dict[str, Any]]: L'enregistrement, prolongé si nécessaire, ou
+                None s'il a expiré entre-temps et ne peut plus être réutilisé
+        """
+        expires_at = datetime.fromisoformat(record["expires_at"])
+        now = datetime.now(expires_at.tzinfo)
+        if expires_at - now > REUSE_MARGIN:
+            return record
+
+        async with self._slots, DB_UPDATE_SECONDS.time(mode="single"):
+            result = await self.postgrest.from_("temp_files")\
+                .update({"expires_at": (now + FILE_LIFETIME).isoformat()})\
+                .eq("id", record["id"])\
+                .gt("expires_at", now.isoformat())\
+                .execute()
+        if not result.data:
+            self._hash_cache.pop(record["content_hash"])
+            return None
+        record = {**record, **result.data[0]}
+        self._remember(record)
+        return record
+
+    def _new_record(self, file: UploadFile, file_path: str, content_hash: str) -> Dict[str, Any]:
+        """Prépare la ligne temp_files d'un fichier nouvellement stocké."""
+        expires_at = datetime.now() + FILE_LIFETIME
+        return {
+            "file_name": file.filename,
+            "file_type": file.content_type,
+            "original_file_path": file_path,
+            "content_hash": content_hash,
+            "status": "uploaded",
+            "expires_at": expires_at.isoformat()
+        }
+
+    async def _upload_result(self, file: UploadFile, record: Dict[str, Any], deduplicated: bool) -> Dict[str, Any]:
+        """Construit le résultat retourné pour un fichier uploadé."""
+        file_path = record["original_file_path"]
+        return {
+            "id": record["id"],
+            "file_name": file.filename,
+            "file_path": file_path,
+            # Sans adresse publique (stockage local), le document est servi par l'application
+            "file_url": await self.objects.public_url(file_path) or f"/api/download/{record['id']}",
+            "status": record.get("status"),
+            "transformed_file_path": record.get("transformed_file_path"),
+            "deduplicated": deduplicated
+        }
+
+    async def upload_file(self, file: UploadFile, stream: Optional[ValidationStream] = None) -> Dict[str, Any]:
         """
         Upload un fichier vers Supabase et crée un enregistrement dans la base.
 
+        Le fichier est identifié par l'empreinte SHA-256 de son contenu : si un
+        fichier identique n'a pas encore expiré, son objet stocké et son
+        éventuel résultat de transformation sont réutilisés, sans upload ni
+        insertion ; s'il expire bientôt, son expiration est repoussée. Le contenu est lu et envoyé par morceaux, sans jamais être
+        chargé entièrement en mémoire.
+
         Args:
             file (UploadFile): Le fichier à uploader
-        
+            stream (ValidationStream, optional): Validation appliquée à chaque morceau lu
+
         Returns:
             Dict[str, Any]: Informations sur le fichier uploadé incluant URL et ID en base
+
+        Raises:
+            FileRejectedError: Si la validation échoue
         """
         try:
-            # Lire le contenu du fichier
-            content = await file.read()
-            
-            # Upload vers Supabase Storage
-            file_path = f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{file.filename}"
-            upload_response = self.supabase.storage.from_(self.bucket_name).upload(
-                file_path,
-                content
-            )
+            content_hash = await self._hash_file(file, stream)
+
+            # Réutilisation d'un fichier identique déjà stocké
+            existing = await self.find_by_hash(content_hash)
+            if existing is not None:
+                existing = await self._keep_alive(existing)
+            if existing is not None:
+                await file.seek(0)
+                return await self._upload_result(file, existing, deduplicated=True)
 
-            # Obtenir l'URL publique
-            file_url = self.supabase.storage.from_(self.bucket_name).get_public_url(file_path)
+            file_path = await self._store_object(file, content_hash)
 
             # Créer l'enregistrement dans la base de données
-            expires_at = datetime.now() + timedelta(days=1)
-            db_response = self.supabase.table("temp_files").insert({
-                "file_name": file.filename,
-                "file_type": file.content_type,
-                "original_file_path": file_path,
-                "status": "uploaded",
-                "expires_at": expires_at.isoformat()
-            }).execute()
-
-            # Réinitialiser le curseur du fichier pour une utilisation ultérieure
-            await file.seek(0)
+            new_record = self._new_record(file, file_path, content_hash)
+            async with self._slots, DB_INSERT_SECONDS.time(mode="single"):
+                db_response = await self.postgrest.from_("temp_files").insert(new_record).execute()
+            record = {**new_record, **db_response.data[0]}
+            self._remember(record)
+
+            return await self._upload_result(file, record, deduplicated=False)
 
-            return {
-                "id": db_response.data[0]["id"],
-                "file_name": file.filename,
-                "file_url": file_url
-            }
+        except FileRejectedError:
+            raise
 
         except Exception as e:
             # En cas d'erreur, propager l'exception
             raise Exception(f"Erreur lors de l'upload: {str(e)}")
 
-    async def update_file_status(self, file_id: str, status: str, transformed_path: str = None) -> Dict[str, Any]:
+    async def upload_files(
+        self,
+        files: List[Tuple[UploadFile, Optional[ValidationStream]]],
+        max_parallel_uploads: int = 4
+    ) -> List[Union[Dict[str, Any], Exception]]:
+        """
+        Upload un lot de fichiers.
+
+        Les fichiers sont validés en parallèle, les fichiers déjà connus sont
+        recherchés en une seule requête, les nouveaux contenus sont envoyés au
+        bucket avec au plus `max_parallel_uploads` envois simultanés, et toutes
+        les lignes temp_files sont créées par une unique insertion groupée. Un
+        fichier en échec n'interrompt pas le lot.
+
+        Args:
+            files: Fichiers à uploader, chacun avec sa validation éventuelle
+            max_parallel_uploads: Nombre maximal d'envois simultanés vers le bucket
+
+        Returns:
+            List[Union[Dict[str, Any], Exception]]: Pour chaque fichier, dans l'ordre,
+                le même résultat que upload_file ou l'exception rencontrée
+        """
+        results: List[Union[Dict[str, Any], Exception]] = list(await asyncio.gather(
+            *(self._hash_file(file, stream) for file, stream in files),
+            return_exceptions=True
+        ))
+        hashes = {i: h for i, h in enumerate(results) if isinstance(h, str)}
+
+        try:
+            existing = await self._find_many_by_hash(set(hashes.values()))
+            kept = await asyncio.gather(*(self._keep_alive(record) for record in existing.values()))
+            existing = {content_hash: record for content_hash, record in zip(existing, kept) if record is not None}
+        except Exception as e:
+            return [Exception(f"Erreur lors de l'upload: {str(e)}") if isinstance(r, str) else r for r in results]
+
+        # Un contenu nouveau n'est envoyé qu'une fois, même présent plusieurs fois dans le lot
+        first_index: Dict[str, int] = {}
+        for i, content_hash in hashes.items():
+            if content_hash not in existing:
+                first_index.setdefault(content_hash, i)
+
+        parallel = asyncio.Semaphore(max_parallel_uploads)
+
+        async def store(i: int) -> str:
+            async with parallel:
+                return await self._store_object(files[i][0], hashes[i])
+
+        stored = await asyncio.gather(*(store(i) for i in first_index.values()), return_exceptions=True)
+        stored_paths = dict(zip(first_index.keys(), stored))
+        failures = {h: path for h, path in stored_paths.items() if isinstance(path, Exception)}
+
+        # Une seule insertion pour toutes les nouvelles lignes
+        new_records = [
+            self._new_record(files[i][0], stored_paths[content_hash], content_hash)
+            for content_hash, i in first_index.items()
+            if content_hash not in failures
+        ]
+        if new_records:
+            try:
+                async with self._slots, DB_INSERT_SECONDS.time(mode="batch"):
+                    db_response = await self.postgrest.from_("temp_files").insert(new_records).execute()
+                for new_record, row in zip(new_records, db_response.data):
+                    record = {**new_record, **row}
+                    self._remember(record)
+                    existing[record["content_hash"]] = record
+            except Exception as e:
+                failures.update({record["content_hash"]: e for record in new_records})
+
+        for i, content_hash in hashes.items():
+            if content_hash in failures:
+                results[i] = Exception(f"Erreur lors de l'upload: {str(failures[content_hash])}")
+            else:
+                deduplicated = first_index.get(content_hash) != i
+                results[i] = await self._upload_result(files[i][0], existing[content_hash], deduplicated)
+
+        return results
+
+    async def _find_many_by_hash(self, content_hashes: Set[str]) -> Dict[str, Dict[str, Any]]:
+        """Recherche en une requête les fichiers non expirés correspondant aux empreintes."""
+        found = {}
+        missing = []
+        for content_hash in content_hashes:
+            record = self._hash_cache.get(content_hash)
+            if record is not None:
+                found[content_hash] = record
+            else:
+                missing.append(content_hash)
+
+        if missing:
+            async with self._slots:
+                result = await self.postgrest.from_("temp_files")\
+                    .select("*")\
+                    .in_("content_hash", missing)\
+                    .gt("expires_at", datetime.now().isoformat())\
+                    .execute()
+            for record in result.data:
+                self._remember(record)
+                found.setdefault(record["content_hash"], record)
+
+        return found
+
+    async def download_to(self, file_path: str, destination: Path) -> Path:
+        """
+        Télécharge un fichier stocké vers le disque, par morceaux.
+
+        Args:
+            file_path (str): Chemin du fichier dans le bucket
+            destination (Path): Fichier local à écrire
+
+        Returns:
+            Path: Le fichier local écrit
+        """
+        return await self.objects.download_to(file_path, destination)
+
+    async def open_object(self, file_path: str, byte_range: Optional[str] = None) -> httpx.Response:
+        """
+        Ouvre en flux un objet stocké, éventuellement partiellement.
+
+        La réponse n'est pas lue : l'appelant la consomme par morceaux puis la
+        ferme avec `aclose()`.
+
+        Args:
+            file_path (str): Chemin de l'objet dans le bucket
+            byte_range (str, optional): En-tête Range transmis au stockage
+
+        Returns:
+            httpx.Response: Réponse du stockage (200, 206, 404, 416...)
+        """
+        return await self.objects.open(file_path, byte_range)
+
+    def local_path(self, file_path: str) -> Optional[Path]:
+        """
+        Fichier local d'un objet, si le stockage est le disque local.
+
+        Le fichier peut alors être envoyé sans passer par `open_object`.
+
+        Args:
+            file_path (str): Chemin de l'objet dans le bucket
+
+        Returns:
+            Optional[Path]: Le fichier, ou None si le stockage est distant
+        """
+        if isinstance(self.objects, LocalStorage):
+            return self.objects.path_of(file_path)
+        return None
+
+    async def _iter_path(self, source: Path) -> AsyncIterator[bytes]:
+        with source.open("rb") as document:
+            while chunk := document.read(CHUNK_SIZE):
+                yield chunk
+
+    async def upload_transformed(self, file_id: str, source: Path) -> str:
+        """
+        Stocke le résultat de la transformation d'un fichier, envoyé en flux.
+
+        Args:
+            file_id (str): L'identifiant du fichier d'origine
+            source (Path): Document transformé, dont l'extension est conservée
+
+        Returns:
+            str: Chemin du fichier transformé dans le bucket
+        """
+        file_path = f"transformed/{file_id}{source.suffix}"
+        content_type = mimetypes.guess_type(source.name)[0] or "application/octet-stream"
+        with STORAGE_PUT_SECONDS.time(kind="transformed"):
+            await self.objects.put(file_path, self._iter_path(source), content_type)
+        return file_path
+
+    async def list_expired(self, limit: int, after: Optional[Any] = None) -> List[Dict[str, Any]]:
+        """
+        Retourne une page d'enregistrements expirés, par identifiant croissant.
+
+        Args:
+            limit (int): Taille de la page
+            after (optional): Dernier identifiant de la page précédente
+
+        Returns:
+            List[Dict[str, Any]]: Les enregistrements expirés de la page
+        """
+        query = self.postgrest.from_("temp_files")\
+            .select("id, content_hash, original_file_path, transformed_file_path")\
+            .lt("expires_at", datetime.now().isoformat())
+        if after is not None:
+            query = query.gt("id", after)
+        async with self._slots:
+            result = await query.order("id").limit(limit).execute()
+        return result.data
+
+    async def referenced_paths(self, file_paths: List[str]) -> Set[str]:
+        """
+        Parmi des chemins du bucket, ceux encore utilisés par un fichier non expiré.
+
+        Un même contenu réenvoyé après expiration réutilise le même objet.
+        """
+        if not file_paths:
+            return set()
+        async with self._slots:
+            result = await self.postgrest.from_("temp_files")\
+                .select("original_file_path")\
+                .in_("original_file_path", file_paths)\
+                .gte("expires_at", datetime.now().isoformat())\
+                .execute()
+        return {record["original_file_path"] for record in result.data}
+
+    async def remove_objects(self, file_paths: List[str]) -> int:
+        """
+        Supprime des objets stockés, en une seule requête pour le bucket Supabase.
+
+        Returns:
+            int: Nombre d'objets effectivement supprimés
+        """
+        return await self.objects.remove(file_paths)
+
+    async def delete_records(self, file_ids: List[Any]) -> int:
+        """
+        Supprime des enregistrements temp_files en une seule requête.
+
+        Returns:
+            int: Nombre d'enregistrements supprimés
+        """
+        if not file_ids:
+            return 0
+        async with self._slots:
+            result = await self.postgrest.from_("temp_files")\
+                .delete()\
+                .in_("id", file_ids)\
+                .execute()
+        # Le cache local n'a rien à oublier : ses entrées expirent avec les enregistrements
+        return len(result.data)
+
+    async def get_file(self, file_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Retourne l'enregistrement temp_files d'un fichier.
+
+        Args:
+            file_id (str): L'identifiant du fichier
+
+        Returns:
+            Optional[Dict[str, Any]]: L'enregistrement, ou None s'il n'existe pas
+        """
+        async with self._slots:
+            result = await self.postgrest.from_("temp_files")\
+                .select("*")\
+                .eq("id", file_id)\
+                .limit(1)\
+                .execute()
+
+        if not result.data:
+            return None
+        # Les changements pas encore écrits sont déjà visibles
+        return {**result.data[0], **(self.metadata.pending(file_id) or {})}
+
+    async def find_previous_version(self, previous_id: str, exclude_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Recherche la version précédente d'un document, désignée par le client à l'upload.
+
+        Un simple nom de fichier ne suffit pas : deux documents distincts
+        peuvent porter le même nom.
+
+        Args:
+            previous_id (str): Identifiant du fichier que le nouvel upload remplace
+            exclude_id (str): Identifiant du fichier en cours, à ignorer
+
+        Returns:
+            Optional[Dict[str, Any]]: L'enregistrement transformé et non expiré
+                portant des empreintes de blocs, ou None
+        """
+        async with self._slots:
+            result = await self.postgrest.from_("temp_files")\
+                .select("*")\
+                .eq("id", previous_id)\
+                .eq("status", "processed")\
+                .neq("id", exclude_id)\
+                .gt("expires_at", datetime.now().isoformat())\
+                .limit(1)\
+                .execute()
+
+        if not result.data or not result.data[0].get("block_fingerprints"):
+            return None
+        return result.data[0]
+
+    async def update_file_status(self, file_id: str, status: str, transformed_path: str = None,
+                                 block_fingerprints: Optional[List[str]] = None) -> None:
         """
         Met à jour le statut d'un fichier.
-        
+
+        Un simple changement de statut est différé d'au plus
+        METADATA_FLUSH_INTERVAL secondes et groupé avec ceux des autres
+        fichiers ; `get_file` le voit immédiatement. Le passage à "processed",
+        avec le chemin transformé et l'heure du traitement, est écrit aussitôt.
+
         Args:
             file_id (str): L'identifiant du fichier à mettre à jour
             status (str): Le nouveau statut du fichier
             transformed_path (str, optional): Le chemin du fichier transformé, si applicable
-            
-        Returns:
-            Dict[str, Any]: Les données mises à jour du fichier
+            block_fingerprints (List[str], optional): Empreintes des blocs du document, dans l'ordre
         """
-        update_data = {
-            'status': status,
-            'processed_at': datetime.now().isoformat()
-        }
+        update_data = {'status': status}
 
         if transformed_path:
             update_data['transformed_file_path'] = transformed_path
 
-        result = self.supabase.table('temp_files')\
-            .update(update_data)\
-            .eq('id', file_id)\
-            .execute()
+        if block_fingerprints is not None:
+            update_data['block_fingerprints'] = block_fingerprints
 
-        return result.data[0] if result.data else None
+        # Le cache de déduplication reflète le nouveau statut une fois écrit (on_written)
+        await self.metadata.update(file_id, update_data)
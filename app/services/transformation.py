@@ -0,0 +1,336 @@
+"""
+Service de transformation des documents uploadés.
+"""
+import asyncio
+import functools
+import logging
+import multiprocessing
+import tempfile
+import threading
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import ExitStack
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, AsyncIterator, Callable, Dict, Iterable, Optional, Tuple
+
+from pipeline import RenderStyle, transform_document
+from pipeline.render import rendered_path
+from pipeline.transform import keep_text, output_path
+from pipeline.incremental import MANIFEST_SUFFIX, BlockCache, manifest_path, read_fingerprints, read_manifest
+from pipeline.parallel import BlockTransform, Progress, default_workers
+
+from ..config import get_settings
+from .job_queue import Job
+from .progress import ProgressBroker, ProgressEvent, Stage
+from .supabase_service import SupabaseService
+
+logger = logging.getLogger(__name__)
+
+settings = get_settings()
+
+# Fonction de transformation : (document, nom d'origine, dossier de sortie) -> document transformé,
+# avec en arguments nommés l'adaptation des blocs (transform_block), le pool des pages (executor),
+# le suivi d'avancement (progress), les résultats connus (cache), les formats de rendu (formats)
+# et leur mise en forme (style)
+Transform = Callable[..., Path]
+
+# Intervalle de relecture d'un document en cours d'écriture, en secondes
+FOLLOW_INTERVAL = 0.2
+
+# Attente maximale des derniers messages d'avancement après la fin d'une transformation, en secondes
+PROGRESS_DRAIN_TIMEOUT = 5.0
+
+# File d'avancement partagée avec le service, fixée au démarrage de chaque processus du pool
+_progress_queue: Optional[multiprocessing.SimpleQueue] = None
+
+
+def _init_worker(queue: multiprocessing.SimpleQueue) -> None:
+    global _progress_queue
+    _progress_queue = queue
+
+
+@dataclass(frozen=True)
+class WorkerProgress:
+    """Avancement d'une tâche exécutée dans un processus du pool, renvoyé au service par sa file."""
+    job_id: str
+
+    def __call__(self, done: int, total: Optional[int]) -> None:
+        _progress_queue.put((self.job_id, done, total))
+
+    def close(self) -> None:
+        """Signale que la tâche n'enverra plus d'avancement."""
+        _progress_queue.put((self.job_id, None, None))
+
+
+class TransformCancelled(Exception):
+    """Transformation abandonnée par le service, par exemple après un délai dépassé."""
+
+
+def run_in_worker(transform: Transform, *args: Any, progress: Progress, unit_threads: int = 0,
+                  cancel_flag: Optional[Path] = None, **kwargs: Any) -> Path:
+    """
+    Exécute une transformation dans le pool, puis ferme son suivi d'avancement.
+
+    Avec `unit_threads`, les pages et sections du document sont adaptées par
+    autant de threads : utile lorsque l'adaptation attend un service.
+
+    Un processus du pool ne peut pas être interrompu de l'extérieur : dès que
+    le fichier `cancel_flag` existe, la transformation s'arrête avant de
+    commencer ou à la fin de la page ou section en cours.
+
+    Raises:
+        TransformCancelled: Si la transformation est abandonnée
+    """
+    def check() -> None:
+        if cancel_flag is not None and cancel_flag.exists():
+            raise TransformCancelled()
+
+    def checked(done: int, total: Optional[int]) -> None:
+        check()
+        progress(done, total)
+
+    with ExitStack() as stack:
+        if unit_threads:
+            kwargs["executor"] = stack.enter_context(
+                ThreadPoolExecutor(max_workers=unit_threads, thread_name_prefix="todys-unit")
+            )
+        try:
+            check()
+            return transform(*args, progress=checked, **kwargs)
+        finally:
+            if isinstance(progress, WorkerProgress):
+                progress.close()
+
+
+class LiveOutput:
+    """Document transformé en cours d'écriture, lisible pendant sa production."""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.done = asyncio.Event()
+        self.failed = False
+
+    def finish(self, failed: bool = False) -> None:
+        self.failed = failed
+        self.done.set()
+
+    async def follow(self, chunk_size: int = 64 * 1024) -> AsyncIterator[bytes]:
+        """
+        Produit le document au fur et à mesure de son écriture.
+
+        Une transformation terminée sans avoir créé le document ne produit rien.
+
+        Raises:
+            RuntimeError: Si la transformation échoue avant la fin du document
+        """
+        while not self.path.exists():
+            if self.done.is_set():
+                if self.failed:
+                    raise RuntimeError("La transformation a échoué")
+                return
+            await asyncio.sleep(FOLLOW_INTERVAL)
+
+        with self.path.open("rb") as document:
+            while True:
+                # La fin est lue après avoir constaté l'arrêt de l'écriture
+                finished = self.done.is_set()
+                chunk = document.read(chunk_size)
+                if chunk:
+                    yield chunk
+                elif finished:
+                    break
+                else:
+                    await asyncio.sleep(FOLLOW_INTERVAL)
+
+        if self.failed:
+            raise RuntimeError("La transformation a échoué")
+
+
+class TransformationService:
+    """
+    Fait passer un fichier de l'état "uploaded" à "processed".
+
+    Le document est téléchargé sur disque, transformé par le pipeline bloc
+    par bloc puis renvoyé en flux : la mémoire utilisée ne dépend pas de sa
+    taille. L'extraction, l'adaptation et les rendus d'un document se font
+    dans un processus d'un pool partagé par toutes les tâches, d'un
+    processus par cœur sauf si TRANSFORM_WORKERS est fixé : le processus web
+    ne fait que les échanges avec Supabase. L'avancement remonte par une
+    file lue dans un thread du service.
+
+    Chaque bloc passe par `transform_block` : le texte tel quel par défaut,
+    ou le service LLM (`LLMTransform`), dont les appels d'un même document
+    partent ensemble depuis `unit_threads` threads.
+
+    Les rendus adaptés (RENDER_FORMATS) sont produits dans la même passe
+    que le texte et stockés à côté de lui, sous la même racine.
+
+    Les empreintes des blocs sont enregistrées avec le fichier : lorsqu'une
+    nouvelle version d'un document déjà transformé est envoyée en désignant
+    la précédente (champ `replaces` de l'upload), seuls les blocs modifiés
+    sont transformés, les autres reprennent le résultat de cette version.
+    """
+
+    def __init__(self, supabase_service: SupabaseService, transform: Transform = transform_document,
+                 executor: Optional[Executor] = None, broker: Optional[ProgressBroker] = None,
+                 formats: Optional[Iterable[str]] = None, style: Optional[RenderStyle] = None,
+                 transform_block: BlockTransform = keep_text, unit_threads: int = 0):
+        self.supabase_service = supabase_service
+        self.transform = transform
+        self.transform_block = transform_block
+        self.unit_threads = unit_threads
+        self.formats = list(settings.RENDER_FORMATS if formats is None else formats)
+        self.style = style or RenderStyle(font_path=settings.RENDER_FONT, bold_font_path=settings.RENDER_BOLD_FONT)
+        self.broker = broker or ProgressBroker()
+        # Par tâche en cours dans le pool : suivi d'avancement et fonction appelée à sa fermeture
+        self._reports: Dict[str, Tuple[Progress, Callable[[], None]]] = {}
+        self._progress_queue: Optional[multiprocessing.SimpleQueue] = None
+        if executor is None:
+            # Les processus ne sont lancés qu'à la première soumission
+            self._progress_queue = multiprocessing.SimpleQueue()
+            executor = ProcessPoolExecutor(
+                max_workers=settings.TRANSFORM_WORKERS or default_workers(),
+                initializer=_init_worker, initargs=(self._progress_queue,)
+            )
+            threading.Thread(target=self._relay_progress, name="transform-progress", daemon=True).start()
+        self.executor = executor
+        self._live: Dict[str, LiveOutput] = {}
+
+    def _relay_progress(self) -> None:
+        """Transmet l'avancement envoyé par les processus du pool, jusqu'à l'arrêt du service."""
+        for job_id, done, total in iter(self._progress_queue.get, None):
+            handlers = self._reports.get(job_id)
+            if handlers is None:
+                continue
+            report, close = handlers
+            if done is None:
+                close()
+            else:
+                report(done, total)
+
+    async def _drain_progress(self, job: Job, reported: asyncio.Event) -> None:
+        # L'avancement transite par une autre file que le résultat : ses derniers messages peuvent le suivre
+        try:
+            await asyncio.wait_for(reported.wait(), timeout=PROGRESS_DRAIN_TIMEOUT)
+        except asyncio.TimeoutError:
+            logger.warning("Avancement incomplet", extra={"job_id": job.id, "file_id": job.file_id})
+
+    def live_output(self, file_id: str) -> Optional[LiveOutput]:
+        """Document en cours de transformation pour un fichier, s'il y en a un."""
+        return self._live.get(file_id)
+
+    async def run(self, job: Job) -> str:
+        """
+        Exécute la transformation d'un fichier.
+
+        Args:
+            job: Tâche portant l'identifiant du fichier et, dans son payload,
+                son chemin dans le bucket et son nom d'origine
+
+        Returns:
+            str: Chemin du fichier transformé dans le bucket
+        """
+        await self.supabase_service.update_file_status(job.file_id, "processing")
+        self.broker.publish(ProgressEvent(job.file_id, Stage.EXTRACTING))
+
+        filename = job.payload["file_name"]
+        with tempfile.TemporaryDirectory(prefix="todys-") as workdir:
+            workdir = Path(workdir)
+            source = await self.supabase_service.download_to(
+                job.payload["file_path"], workdir / f"source{Path(filename).suffix.lower()}"
+            )
+
+            cache = await self._previous_results(job.file_id, job.payload.get("previous_id"), workdir)
+
+            output_dir = workdir / "output"
+            output_dir.mkdir()
+            live = self._live[job.file_id] = LiveOutput(output_path(filename, output_dir))
+            try:
+                loop = asyncio.get_running_loop()
+
+                def report(done: int, total: Optional[int]) -> None:
+                    # Appelée depuis un thread : celui de la file d'avancement ou du pool
+                    job.progress = done
+                    event = ProgressEvent(job.file_id, Stage.TRANSFORMING, done=done, total=total)
+                    loop.call_soon_threadsafe(self.broker.publish, event)
+
+                options = dict(transform_block=self.transform_block, unit_threads=self.unit_threads,
+                               cache=cache, formats=self.formats, style=self.style)
+                reported = asyncio.Event()
+                progress: Progress = report
+                if self._progress_queue is None:
+                    reported.set()
+                else:
+                    self._reports[job.id] = (report, functools.partial(loop.call_soon_threadsafe, reported.set))
+                    progress = WorkerProgress(job.id)
+                cancel_flag = workdir / "cancelled"
+                transform = functools.partial(run_in_worker, self.transform, source, filename, output_dir,
+                                              progress=progress, cancel_flag=cancel_flag, **options)
+                try:
+                    pooled = loop.run_in_executor(self.executor, transform)
+                    try:
+                        output = await asyncio.shield(pooled)
+                    except asyncio.CancelledError:
+                        # Tâche annulée (délai dépassé, arrêt) : le pool est prévenu puis attendu, pour
+                        # ne pas supprimer le dossier de travail ni laisser une nouvelle tentative
+                        # démarrer pendant que celle-ci s'exécute encore
+                        cancel_flag.touch()
+                        await asyncio.gather(pooled, return_exceptions=True)
+                        raise
+                    await self._drain_progress(job, reported)
+                except BaseException:
+                    live.finish(failed=True)
+                    raise
+                finally:
+                    self._reports.pop(job.id, None)
+                live.finish()
+
+                transformed_path = await self.supabase_service.upload_transformed(job.file_id, output)
+                manifest = manifest_path(output)
+                await self.supabase_service.upload_transformed(job.file_id, manifest)
+                for output_format in self.formats:
+                    await self.supabase_service.upload_transformed(job.file_id, rendered_path(output, output_format))
+                fingerprints = read_fingerprints(manifest)
+            finally:
+                # Les lecteurs en cours gardent le fichier ouvert jusqu'à la fin de leur lecture
+                if self._live.get(job.file_id) is live:
+                    del self._live[job.file_id]
+
+        await self.supabase_service.update_file_status(
+            job.file_id, "processed", transformed_path, block_fingerprints=fingerprints
+        )
+        self.broker.publish(ProgressEvent(job.file_id, Stage.READY, done=job.progress, total=job.progress))
+        return transformed_path
+
+    async def _previous_results(self, file_id: str, previous_id: Optional[str],
+                                workdir: Path) -> Optional[BlockCache]:
+        """
+        Récupère les blocs transformés de la version précédente d'un document.
+
+        Sans version précédente désignée à l'upload, rien n'est réutilisé.
+        Une erreur ici ne fait que désactiver la réutilisation : le document
+        est alors entièrement transformé.
+        """
+        if previous_id is None:
+            return None
+        try:
+            previous = await self.supabase_service.find_previous_version(previous_id, file_id)
+            if previous is None:
+                return None
+            manifest = await self.supabase_service.download_to(
+                f"transformed/{previous['id']}{MANIFEST_SUFFIX}", workdir / f"previous{MANIFEST_SUFFIX}"
+            )
+            return read_manifest(manifest)
+        except Exception:
+            logger.warning("Résultats précédents indisponibles", extra={"file_id": file_id}, exc_info=True)
+            return None
+
+    async def mark_failed(self, job: Job) -> None:
+        """Enregistre l'échec définitif d'une transformation."""
+        self.broker.publish(ProgressEvent(job.file_id, Stage.FAILED, detail=job.error))
+        await self.supabase_service.update_file_status(job.file_id, "failed")
+
+    def shutdown(self) -> None:
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        if self._progress_queue is not None:
+            self._progress_queue.put(None)
@@ -0,0 +1,189 @@
+"""
+Fichiers statiques et pages fixes servis depuis la mémoire.
+
+Chaque fichier statique est lu une seule fois, à la première requête ou au
+préchauffage : son empreinte donne une adresse versionnée
+(css/styles.3f2a1b9c0d4e.css) que les navigateurs gardent en cache sans la
+revalider, et ses variantes gzip et brotli sont compressées d'avance.
+L'adresse d'origine reste servie, à revalider à chaque visite.
+
+Les réponses portent un ETag : une requête conditionnelle dont la version
+est à jour reçoit un 304 sans corps. La compression brotli nécessite le
+paquet brotli, importé seulement s'il est installé ; sans lui, seul gzip
+est proposé.
+"""
+import gzip
+import hashlib
+import mimetypes
+from dataclasses import dataclass, field
+from functools import cached_property, lru_cache
+from pathlib import Path, PurePosixPath
+from typing import Dict, Optional, Tuple
+
+from fastapi.staticfiles import StaticFiles
+from starlette.datastructures import Headers
+from starlette.responses import Response
+from starlette.types import Scope
+
+# Adresses versionnées : le contenu ne change jamais pour une même adresse
+IMMUTABLE = "public, max-age=31536000, immutable"
+# Adresses non versionnées et pages : gardées en cache mais revalidées à chaque visite
+REVALIDATE = "no-cache"
+
+# Types compressés ; les images et polices le sont déjà
+COMPRESSIBLE = ("text/", "application/javascript", "application/json", "image/svg+xml")
+# En deçà, l'en-tête Content-Encoding coûte plus qu'il ne rapporte
+MIN_COMPRESS_SIZE = 1024
+
+# Longueur de l'empreinte insérée dans les adresses versionnées
+DIGEST_LENGTH = 12
+
+
+def brotli_compress(content: bytes) -> Optional[bytes]:
+    """Variante brotli d'un contenu, ou None si le paquet brotli n'est pas installé."""
+    try:
+        import brotli
+    except ImportError:
+        return None
+    return brotli.compress(content, quality=11)
+
+
+def compress(content: bytes, media_type: str) -> Dict[str, bytes]:
+    """Variantes compressées d'un contenu, par codage, lorsqu'elles sont plus petites."""
+    if len(content) < MIN_COMPRESS_SIZE or not media_type.startswith(COMPRESSIBLE):
+        return {}
+    variants = {"br": brotli_compress(content), "gzip": gzip.compress(content, compresslevel=9, mtime=0)}
+    return {encoding: body for encoding, body in variants.items() if body is not None and len(body) < len(content)}
+
+
+def accepted_encodings(accept_encoding: str) -> Dict[str, float]:
+    """Codages acceptés par le client, avec leur poids (en-tête Accept-Encoding)."""
+    accepted = {}
+    for item in accept_encoding.split(","):
+        name, _, parameters = item.strip().partition(";")
+        quality = 1.0
+        parameter, _, value = parameters.strip().partition("=")
+        if parameter.strip() == "q":
+            try:
+                quality = float(value)
+            except ValueError:
+                quality = 0.0
+        if name:
+            accepted[name.strip().lower()] = quality
+    return accepted
+
+
+@dataclass(frozen=True)
+class CachedBody:
+    """
+    Contenu servi depuis la mémoire, avec ses variantes compressées.
+
+    Attributes:
+        content: Contenu non compressé
+        media_type: Type MIME du contenu
+        digest: Empreinte SHA-256 du contenu, en hexadécimal
+        variants: Contenu compressé, par codage ("br", "gzip"), du préféré au moins bon
+    """
+    content: bytes
+    media_type: str
+    digest: str
+    variants: Dict[str, bytes] = field(default_factory=dict)
+
+    @classmethod
+    def build(cls, content: bytes, media_type: str) -> "CachedBody":
+        return cls(content, media_type, hashlib.sha256(content).hexdigest(), compress(content, media_type))
+
+    def etag(self, encoding: Optional[str] = None) -> str:
+        return f'"{self.digest[:32]}-{encoding}"' if encoding else f'"{self.digest[:32]}"'
+
+    def negotiate(self, accept_encoding: str) -> Optional[str]:
+        """Meilleure variante acceptée par le client, None pour le contenu non compressé."""
+        accepted = accepted_encodings(accept_encoding)
+        for encoding in self.variants:
+            if accepted.get(encoding, accepted.get("*", 0.0)) > 0:
+                return encoding
+        return None
+
+    def is_fresh(self, if_none_match: str) -> bool:
+        """Indique si la version connue du client (If-None-Match) est à jour, quel que soit son codage."""
+        if if_none_match.strip() == "*":
+            return True
+        known = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+        return any(self.etag(encoding) in known for encoding in (None, *self.variants))
+
+    def response(self, headers: Headers, cache_control: str, head: bool = False) -> Response:
+        """
+        Réponse à une requête GET ou HEAD, conditionnelle ou non.
+
+        Args:
+            headers: En-têtes de la requête (Accept-Encoding, If-None-Match)
+            cache_control: Politique de cache de la réponse
+            head: Requête HEAD : en-têtes seuls
+        """
+        encoding = self.negotiate(headers.get("accept-encoding", ""))
+        response_headers = {"ETag": self.etag(encoding), "Cache-Control": cache_control}
+        if self.variants:
+            response_headers["Vary"] = "Accept-Encoding"
+        if self.is_fresh(headers.get("if-none-match", "")):
+            return Response(status_code=304, headers=response_headers)
+
+        body = self.variants[encoding] if encoding else self.content
+        if encoding:
+            response_headers["Content-Encoding"] = encoding
+        response = Response(b"" if head else body, media_type=self.media_type, headers=response_headers)
+        response.headers["Content-Length"] = str(len(body))
+        return response
+
+
+class CachedStaticFiles(StaticFiles):
+    """
+    Fichiers statiques lus une fois et servis depuis la mémoire.
+
+    Les fichiers ajoutés après le premier chargement sont servis par
+    StaticFiles, depuis le disque.
+    """
+
+    def __init__(self, directory: Path):
+        super().__init__(directory=directory)
+        self.root = Path(directory)
+
+    @cached_property
+    def _files(self) -> Tuple[Dict[str, Tuple[CachedBody, str]], Dict[str, str]]:
+        # Chemin servi -> (contenu, politique de cache), et chemin d'origine -> chemin versionné
+        files: Dict[str, Tuple[CachedBody, str]] = {}
+        versioned: Dict[str, str] = {}
+        for path in sorted(self.root.rglob("*")):
+            if not path.is_file():
+                continue
+            relative = PurePosixPath(path.relative_to(self.root).as_posix())
+            media_type = mimetypes.guess_type(path.name)[0] or "application/octet-stream"
+            if media_type.startswith("text/"):
+                media_type += "; charset=utf-8"
+            body = CachedBody.build(path.read_bytes(), media_type)
+            stem, suffix = relative.name.rsplit(".", 1) if "." in relative.name else (relative.name, "")
+            hashed = relative.with_name(f"{stem}.{body.digest[:DIGEST_LENGTH]}" + (f".{suffix}" if suffix else ""))
+            files[str(relative)] = (body, REVALIDATE)
+            files[str(hashed)] = (body, IMMUTABLE)
+            versioned[str(relative)] = str(hashed)
+        return files, versioned
+
+    def load(self) -> None:
+        """Lit et compresse les fichiers statiques, s'ils ne le sont pas déjà."""
+        self._files
+
+    def versioned(self, path: str) -> str:
+        """Chemin versionné d'un fichier statique, le chemin tel quel s'il est inconnu."""
+        return self._files[1].get(path, path)
+
+    async def get_response(self, path: str, scope: Scope) -> Response:
+        cached = self._files[0].get(PurePosixPath(path).as_posix())
+        if cached is None or scope["method"] not in ("GET", "HEAD"):
+            return await super().get_response(path, scope)
+        body, cache_control = cached
+        return body.response(Headers(scope=scope), cache_control, head=scope["method"] == "HEAD")
+
+
+@lru_cache()
+def get_static_files() -> CachedStaticFiles:
+    """Fichiers statiques du frontend, lus à leur première utilisation."""
+    return CachedStaticFiles(directory=Path("app/frontend/static"))
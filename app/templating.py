@@ -0,0 +1,47 @@
+"""
+Moteur de templates partagé par l'application et les routes.
+"""
+from functools import lru_cache
+from typing import Dict, Tuple
+
+from fastapi import Request
+from fastapi.templating import Jinja2Templates
+from starlette.responses import Response
+
+from .static_assets import REVALIDATE, CachedBody, get_static_files
+
+# Pages fixes déjà rendues, par nom de template et préfixe d'adresse (root_path)
+_pages: Dict[Tuple[str, str], CachedBody] = {}
+
+
+@lru_cache()
+def get_templates() -> Jinja2Templates:
+    """
+    Moteur de templates, créé à la première page rendue.
+
+    `asset(path)` donne le chemin versionné d'un fichier statique, à passer
+    à `url_for('static', path=...)`.
+    """
+    templates = Jinja2Templates(directory="app/frontend/templates")
+    templates.env.globals["asset"] = lambda path: get_static_files().versioned(path)
+    return templates
+
+
+def cached_page(request: Request, name: str) -> Response:
+    """
+    Page sans contenu propre à la requête, rendue une seule fois.
+
+    Le rendu ne dépend que du préfixe de l'application : les adresses de la
+    page doivent être relatives au serveur (`url_for(...).path`). Les visites
+    suivantes reçoivent la page compressée, ou un 304 si elles l'ont déjà.
+
+    Args:
+        request: Requête, pour les adresses de la page et la négociation
+        name: Nom du template
+    """
+    key = (name, request.scope.get("root_path", ""))
+    page = _pages.get(key)
+    if page is None:
+        html = get_templates().get_template(name).render({"request": request})
+        page = _pages[key] = CachedBody.build(html.encode("utf-8"), "text/html; charset=utf-8")
+    return page.response(request.headers, REVALIDATE, head=request.method == "HEAD")
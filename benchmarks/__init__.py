@@ -0,0 +1,3 @@
+"""
+Benchmarks de toDys : microbenchmarks de la validation et test de charge des uploads.
+"""
@@ -0,0 +1,97 @@
+"""
+Documents synthétiques, identiques d'une exécution à l'autre.
+"""
+import random
+
+KB = 1024
+MB = 1024 * KB
+
+# Tailles couvertes par défaut, de 1 Ko à la taille maximale d'upload
+SIZES = (KB, 10 * KB, 100 * KB, MB, 10 * MB)
+
+WORDS = (
+    "le", "la", "les", "un", "une", "des", "élève", "lecture", "phrase", "texte",
+    "cahier", "leçon", "écrire", "comprendre", "histoire", "maîtresse", "école",
+    "chapitre", "exercice", "mot", "syllabe", "question", "réponse", "et", "puis",
+)
+
+# Textes de classe (fables du domaine public, leçons de cycle 3) : un
+# vocabulaire varié, aux formes de mots répétées comme dans un vrai cours
+CLASSROOM_TEXTS = (
+    "Maître Corbeau, sur un arbre perché, tenait en son bec un fromage. Maître Renard, par "
+    "l'odeur alléché, lui tint à peu près ce langage : « Hé ! bonjour, Monsieur du Corbeau. Que "
+    "vous êtes joli ! que vous me semblez beau ! Sans mentir, si votre ramage se rapporte à votre "
+    "plumage, vous êtes le phénix des hôtes de ces bois. » À ces mots le Corbeau ne se sent pas de "
+    "joie ; et pour montrer sa belle voix, il ouvre un large bec, laisse tomber sa proie.",
+    "La Cigale, ayant chanté tout l'été, se trouva fort dépourvue quand la bise fut venue : pas un "
+    "seul petit morceau de mouche ou de vermisseau. Elle alla crier famine chez la Fourmi sa "
+    "voisine, la priant de lui prêter quelque grain pour subsister jusqu'à la saison nouvelle.",
+    "Le cycle de l'eau. Chauffée par le soleil, l'eau des océans, des lacs et des rivières "
+    "s'évapore. La vapeur d'eau monte dans l'atmosphère, se refroidit et se condense en fines "
+    "gouttelettes qui forment les nuages. Quand les gouttes deviennent trop lourdes, elles tombent "
+    "sous forme de pluie, de neige ou de grêle, puis ruissellent jusqu'aux cours d'eau ou "
+    "s'infiltrent dans le sol pour alimenter les nappes phréatiques.",
+    "Les fractions. Une fraction représente une partie d'un tout partagé en parts égales. Dans la "
+    "fraction trois quarts, le dénominateur indique que l'unité est partagée en quatre parts et le "
+    "numérateur indique que l'on prend trois de ces parts. Pour comparer deux fractions de même "
+    "dénominateur, il suffit de comparer leurs numérateurs.",
+    "Charlemagne. Couronné empereur à Rome en l'an huit cents, Charlemagne gouverne un immense "
+    "territoire. Il le divise en comtés confiés à des comtes, que surveillent les missi dominici. "
+    "Il encourage la création d'écoles dans les monastères, où les moines recopient les manuscrits "
+    "et enseignent la lecture, l'écriture et le calcul.",
+    "Le verbe. Dans une phrase, le verbe se conjugue : il change de forme selon la personne, le "
+    "nombre et le temps. Pour trouver le verbe, on change le temps de la phrase : hier, nous "
+    "chantions ; aujourd'hui, nous chantons ; demain, nous chanterons. Le sujet indique qui fait "
+    "l'action ; on le trouve en posant la question « qui est-ce qui ? » devant le verbe.",
+)
+
+
+def classroom_text(words: int) -> str:
+    """Texte d'au moins `words` mots, fait des textes de classe mis bout à bout en paragraphes."""
+    paragraphs = []
+    count = 0
+    while count < words:
+        for text in CLASSROOM_TEXTS:
+            paragraphs.append(text)
+            count += len(text.split())
+    return "\n\n".join(paragraphs)
+
+
+def make_text(size: int, seed: int = 0) -> bytes:
+    """
+    Texte français pseudo-aléatoire d'exactement `size` octets.
+
+    Le texte ne contient aucune signature malveillante : l'analyse va
+    jusqu'au bout du contenu, ce qui correspond au pire cas mesurable.
+    """
+    rng = random.Random(seed)
+    # Un paragraphe d'environ 4 Ko répété : la génération reste instantanée même à 10 Mo
+    sentences = []
+    length = 0
+    while length < 4 * KB:
+        sentence = " ".join(rng.choice(WORDS) for _ in range(rng.randint(6, 14))).capitalize() + ". "
+        sentences.append(sentence)
+        length += len(sentence.encode("utf-8"))
+    paragraph = ("".join(sentences) + "\n\n").encode("utf-8")
+
+    content = paragraph * (size // len(paragraph) + 1)
+    # Couper sur une frontière de caractère UTF-8, puis compléter par des espaces
+    content = content[:size].decode("utf-8", errors="ignore").encode("utf-8")
+    return content + b" " * (size - len(content))
+
+
+def human_size(size: int) -> str:
+    if size >= MB:
+        return f"{size // MB}MB"
+    if size >= KB:
+        return f"{size // KB}KB"
+    return f"{size}B"
+
+
+def parse_size(value: str) -> int:
+    """Taille lisible (512, 1KB, 10MB) en octets."""
+    value = value.strip().upper()
+    for suffix, factor in (("MB", MB), ("KB", KB), ("B", 1)):
+        if value.endswith(suffix):
+            return int(float(value[:-len(suffix)]) * factor)
+    return int(value)
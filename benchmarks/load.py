@@ -0,0 +1,271 @@
+"""
+Test de charge de /api/upload, de l'envoi jusqu'au document transformé.
+
+Démarre le remplaçant de Supabase (benchmarks.standin) puis l'application
+sous uvicorn avec le nombre de workers demandé, envoie des fichiers tous
+différents (pas de déduplication) avec une concurrence fixe, et mesure :
+
+- la latence de l'upload (p50/p95/p99) et le débit par taille de fichier ;
+- avec --transform, le délai entre l'envoi et le statut "processed" ;
+- la mémoire résidente maximale (VmHWM) de chaque worker uvicorn.
+
+La mémoire est lue dans /proc : la mesure n'est disponible que sous Linux.
+
+Usage:
+    python -m benchmarks.load [--workers 2] [--concurrency 16] [--requests 200] [--baseline ...]
+"""
+import argparse
+import asyncio
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import httpx
+
+from .documents import human_size, make_text, parse_size
+from .report import RESULTS_DIR, check_baseline, percentile, save
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@contextmanager
+def serve(module: str, port: int, env: Dict[str, str], workers: int = 1) -> Iterator[subprocess.Popen]:
+    """Lance une application sous uvicorn le temps du bloc."""
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", module, "--host", "127.0.0.1", "--port", str(port),
+         "--workers", str(workers), "--log-level", "warning"],
+        cwd=ROOT,
+        env={**os.environ, **env},
+    )
+    try:
+        yield process
+    finally:
+        process.terminate()
+        try:
+            process.wait(timeout=15)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+
+def wait_ready(url: str, process: subprocess.Popen, timeout: float = 30.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"Le serveur s'est arrêté (code {process.returncode})")
+        try:
+            httpx.get(url, timeout=1.0)
+            return
+        except httpx.TransportError:
+            time.sleep(0.2)
+    raise TimeoutError(f"{url} ne répond pas après {timeout}s")
+
+
+def child_pids(pid: int) -> List[int]:
+    """Processus dont `pid` est le parent direct."""
+    children = []
+    for entry in Path("/proc").iterdir():
+        if not entry.name.isdigit():
+            continue
+        try:
+            # Le nom du processus est entre parenthèses et peut contenir des espaces
+            stat = (entry / "stat").read_text().rsplit(")", 1)[1].split()
+        except OSError:
+            continue
+        if int(stat[1]) == pid:
+            children.append(int(entry.name))
+    return children
+
+
+def peak_rss_mb(pid: int) -> Optional[float]:
+    try:
+        for line in Path(f"/proc/{pid}/status").read_text().splitlines():
+            if line.startswith("VmHWM:"):
+                return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+
+def worker_pids(server: subprocess.Popen, workers: int) -> List[int]:
+    """Workers uvicorn : le processus lui-même s'il est seul, sinon ses enfants lancés par spawn."""
+    if workers == 1:
+        return [server.pid]
+    # Le suivi des ressources de multiprocessing est aussi un enfant, sans spawn_main
+    return [pid for pid in child_pids(server.pid) if b"spawn_main" in Path(f"/proc/{pid}/cmdline").read_bytes()]
+
+
+def unique_content(base: bytes, index: int) -> bytes:
+    # Empreinte différente à chaque envoi, même taille
+    marker = f" {index:015d}".encode()
+    return base[:len(base) - len(marker)] + marker
+
+
+async def wait_processed(standin: httpx.AsyncClient, file_id: str, timeout: float) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        response = await standin.get("/rest/v1/temp_files", params={"id": f"eq.{file_id}", "select": "status"})
+        status = response.json()[0]["status"] if response.json() else None
+        if status == "processed":
+            return True
+        if status == "failed":
+            return False
+        await asyncio.sleep(0.05)
+    return False
+
+
+async def drive(
+    app_url: str,
+    standin_url: str,
+    size: int,
+    requests: int,
+    concurrency: int,
+    transform: bool,
+    timeout: float,
+) -> Tuple[List[float], List[float], Dict[str, int], float]:
+    """
+    Envoie `requests` fichiers de `size` octets avec `concurrency` envois simultanés.
+
+    Returns:
+        Latences d'upload, délais de transformation, nombre de réponses par
+        statut et durée des uploads, en secondes
+    """
+    base = make_text(size, seed=size)
+    slots = asyncio.Semaphore(concurrency)
+    latencies: List[float] = []
+    transforms: List[float] = []
+    statuses: Dict[str, int] = {}
+    finished: List[float] = []
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(base_url=app_url, timeout=timeout, limits=limits) as client, \
+            httpx.AsyncClient(base_url=standin_url, timeout=timeout) as standin:
+
+        async def upload(index: int) -> None:
+            async with slots:
+                files = {"file": (f"cours-{index}.txt", unique_content(base, index), "text/plain")}
+                started = time.perf_counter()
+                try:
+                    response = await client.post("/api/upload", files=files)
+                    status = str(response.status_code)
+                except httpx.HTTPError as error:
+                    response, status = None, type(error).__name__
+                finished.append(time.perf_counter())
+                latencies.append(finished[-1] - started)
+                statuses[status] = statuses.get(status, 0) + 1
+
+            if transform and response is not None and response.status_code == 200:
+                if await wait_processed(standin, response.json()["file_id"], timeout):
+                    transforms.append(time.perf_counter() - started)
+                else:
+                    statuses["transform_failed"] = statuses.get("transform_failed", 0) + 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(upload(index) for index in range(requests)))
+        # Le débit ne compte que les uploads, pas l'attente des transformations
+        elapsed = max(finished, default=started) - started
+
+    return latencies, transforms, statuses, elapsed
+
+
+def latency_case(case: str, size: int, timings: List[float], elapsed: float) -> Dict[str, Any]:
+    return {
+        "case": f"{case}/{human_size(size)}",
+        "size": size,
+        "count": len(timings),
+        "p50_ms": percentile(timings, 50) * 1000,
+        "p95_ms": percentile(timings, 95) * 1000,
+        "p99_ms": percentile(timings, 99) * 1000,
+        "max_ms": max(timings, default=0.0) * 1000,
+        "throughput_rps": len(timings) / elapsed if elapsed else 0.0,
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="1KB,100KB,1MB", help="Tailles de fichier, séparées par des virgules")
+    parser.add_argument("--requests", type=int, default=200, help="Envois par taille")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--workers", type=int, default=2, help="Workers uvicorn de l'application")
+    parser.add_argument("--storage", choices=("supabase", "local"), default="supabase",
+                        help="Stockage de l'application : remplaçant de Supabase ou disque local")
+    parser.add_argument("--transform", action="store_true", help="Attendre aussi la fin des transformations")
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--output", type=Path, default=RESULTS_DIR)
+    parser.add_argument("--baseline", type=Path, help="Résultats de référence à comparer")
+    parser.add_argument("--tolerance", type=float, default=0.10, help="Dégradation admise (0.10 : 10 %%)")
+    args = parser.parse_args()
+
+    sizes = [parse_size(size) for size in args.sizes.split(",")]
+    standin_port, app_port = free_port(), free_port()
+    standin_url, app_url = f"http://127.0.0.1:{standin_port}", f"http://127.0.0.1:{app_port}"
+    app_env = {
+        "SUPABASE_URL": standin_url,
+        "SUPABASE_KEY": "benchmark",
+        "LLM_SERVICE_URL": standin_url,
+        # Le client de charge ne doit mesurer que l'application, pas ses limites
+        "RATE_LIMIT_PER_MINUTE": str(10 ** 9),
+        "RATE_LIMIT_BURST": str(10 ** 9),
+        "MAX_INFLIGHT_UPLOADS": str(max(args.concurrency, 1) * 4),
+        "MAX_PENDING_JOBS": str(10 ** 6),
+        "CLEANUP_INTERVAL": "0",
+        "STORAGE_BACKEND": args.storage,
+    }
+
+    cases = []
+    workers: Dict[str, Optional[float]] = {}
+    with tempfile.TemporaryDirectory(prefix="todys-bench-") as upload_dir, \
+            serve("benchmarks.standin:app", standin_port, {}) as standin:
+        app_env["UPLOAD_DIR"] = upload_dir
+        wait_ready(f"{standin_url}/health", standin)
+        with serve("app.main:app", app_port, app_env, workers=args.workers) as server:
+            wait_ready(f"{app_url}/", server)
+            for size in sizes:
+                latencies, transforms, statuses, elapsed = asyncio.run(drive(
+                    app_url, standin_url, size, args.requests, args.concurrency, args.transform, args.timeout
+                ))
+                case = latency_case("upload", size, latencies, elapsed)
+                case["statuses"] = statuses
+                cases.append(case)
+                print(f"{case['case']:<16} p50 {case['p50_ms']:8.1f} ms  p95 {case['p95_ms']:8.1f} ms  "
+                      f"p99 {case['p99_ms']:8.1f} ms  {case['throughput_rps']:7.1f} req/s  {statuses}")
+                if args.transform:
+                    case = latency_case("transform", size, transforms, elapsed)
+                    cases.append(case)
+                    print(f"{case['case']:<16} p50 {case['p50_ms']:8.1f} ms  p95 {case['p95_ms']:8.1f} ms  "
+                          f"p99 {case['p99_ms']:8.1f} ms")
+
+            # Lue avant l'arrêt : VmHWM est le maximum atteint depuis le démarrage du worker
+            workers = {str(pid): peak_rss_mb(pid) for pid in worker_pids(server, args.workers)}
+
+    known = [rss for rss in workers.values() if rss is not None]
+    cases.append({"case": "workers", "peak_rss_mb": max(known) if known else None, "per_worker_mb": workers})
+    print(f"Mémoire résidente maximale par worker (Mo): {workers}")
+
+    config = {
+        "sizes": sizes,
+        "requests": args.requests,
+        "concurrency": args.concurrency,
+        "workers": args.workers,
+        "storage": args.storage,
+        "transform": args.transform,
+        "cpu_count": os.cpu_count(),
+    }
+    path = save("load", config, cases, args.output)
+    print(f"Résultats enregistrés dans {path}")
+    return check_baseline(path, args.baseline, args.tolerance)
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,207 @@
+"""
+Microbenchmarks de la validation des uploads.
+
+Mesure, pour chaque taille de fichier, FileValidator.validate_file (lecture
+par morceaux, type MIME, signatures) et l'analyse des signatures seule, en
+un bloc et par morceaux. La détection du type MIME sur l'en-tête est
+comparée à libmagic. Le rendu HTML, DOCX et PDF est mesuré sur les blocs
+du texte, police et styles déjà chargés. Le découpage syllabique est mesuré
+en mots par seconde sur des textes de classe, par paragraphe avec mémo
+(froid et chaud) et mot à mot sans mémo. Le client LLM est mesuré contre
+le modèle local.
+
+Usage:
+    python -m benchmarks.micro [--sizes 1KB,1MB] [--baseline results/micro-....json]
+"""
+import argparse
+import asyncio
+import statistics
+import tempfile
+import time
+from io import BytesIO
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+from fastapi import UploadFile
+
+from app.services.file_validator import CHUNK_SIZE, FileValidator
+from app.services.llm_client import LLMClient, LocalBackend
+from pipeline.extractors import extract_txt
+from pipeline.render import render_blocks
+from pipeline.syllables import SYLLABLE, WORD, segment, syllabify
+
+from .documents import SIZES, classroom_text, human_size, make_text, parse_size
+from .report import RESULTS_DIR, check_baseline, percentile, save
+
+
+def measure(run: Callable[[], Any], min_runs: int, min_time: float) -> List[float]:
+    """Exécute `run` au moins `min_runs` fois et pendant au moins `min_time` secondes."""
+    run()  # échauffement : caches, compilation des expressions, threads du pool
+    timings = []
+    started = time.perf_counter()
+    while len(timings) < min_runs or time.perf_counter() - started < min_time:
+        begin = time.perf_counter()
+        run()
+        timings.append(time.perf_counter() - begin)
+    return timings
+
+
+def summarize(case: str, size: int, timings: List[float]) -> Dict[str, Any]:
+    median = statistics.median(timings)
+    return {
+        "case": f"{case}/{human_size(size)}",
+        "size": size,
+        "runs": len(timings),
+        "median_ms": median * 1000,
+        "p95_ms": percentile(timings, 95) * 1000,
+        "mb_per_s": size / 1024 / 1024 / median if median else 0.0,
+    }
+
+
+def bench_validate_file(validator: FileValidator, content: bytes, loop: asyncio.AbstractEventLoop) -> Callable[[], Any]:
+    upload = UploadFile(file=BytesIO(content), filename="cours.txt", size=len(content))
+
+    def run():
+        result = loop.run_until_complete(validator.validate_file(upload))
+        assert result.is_valid, result.error_message
+    return run
+
+
+def bench_scan(validator: FileValidator, content: bytes) -> Callable[[], Any]:
+    def run():
+        assert validator.signatures.scan(content) is None
+    return run
+
+
+def bench_stream_scan(validator: FileValidator, content: bytes) -> Callable[[], Any]:
+    def run():
+        scan = validator.signatures.stream()
+        for start in range(0, len(content), CHUNK_SIZE):
+            scan.feed(content[start:start + CHUNK_SIZE])
+    return run
+
+
+def bench_detect(validator: FileValidator, head: bytes, loop: asyncio.AbstractEventLoop) -> Callable[[], Any]:
+    def run():
+        loop.run_until_complete(validator.detect(head))
+    return run
+
+
+def bench_sniff(validator: FileValidator, head: bytes, loop: asyncio.AbstractEventLoop) -> Callable[[], Any]:
+    def run():
+        loop.run_until_complete(validator.sniff(head))
+    return run
+
+
+def bench_render(content: bytes, output_format: str, directory: Path) -> Callable[[], Any]:
+    blocks = list(extract_txt(BytesIO(content)))
+    destination = directory / f"cours.{output_format}"
+
+    def run():
+        render_blocks(blocks, destination)
+    return run
+
+
+def bench_syllables(paragraphs: List[str], mode: str) -> Callable[[], Any]:
+    def batch():
+        for paragraph in paragraphs:
+            segment(paragraph)
+
+    def cold():
+        syllabify.cache_clear()
+        batch()
+
+    def per_word():
+        for paragraph in paragraphs:
+            for word in WORD.findall(paragraph):
+                tuple(SYLLABLE.findall(word))
+    return {"batch": batch, "cold": cold, "per_word": per_word}[mode]
+
+
+def bench_llm_client(loop: asyncio.AbstractEventLoop, texts: int) -> Callable[[], Any]:
+    paragraphs = [make_text(600, seed=i).decode("utf-8") for i in range(texts)]
+
+    def run():
+        async def simplify():
+            # Un client neuf à chaque exécution : le cache ne doit pas tout servir
+            client = LLMClient(LocalBackend(), max_wait=0.001)
+            try:
+                await client.simplify_many(paragraphs)
+            finally:
+                await client.close()
+        loop.run_until_complete(simplify())
+    return run
+
+
+def run(sizes: List[int], min_runs: int, min_time: float) -> List[Dict[str, Any]]:
+    validator = FileValidator()
+    loop = asyncio.new_event_loop()
+    directory = tempfile.TemporaryDirectory(prefix="todys-bench-")
+    cases = []
+    try:
+        for size in sizes:
+            content = make_text(size, seed=size)
+            for name, bench in (
+                ("validate_file", bench_validate_file(validator, content, loop)),
+                ("signature_scan", bench_scan(validator, content)),
+                ("signature_stream_scan", bench_stream_scan(validator, content)),
+                *((f"render_{output_format}", bench_render(content, output_format, Path(directory.name)))
+                  for output_format in ("html", "docx", "pdf")),
+            ):
+                case = summarize(name, size, measure(bench, min_runs, min_time))
+                cases.append(case)
+                print(f"{case['case']:<32} {case['median_ms']:>10.3f} ms  {case['mb_per_s']:>9.1f} MB/s")
+
+        # Un en-tête de la taille d'un morceau, comme au premier morceau d'un upload
+        head = make_text(CHUNK_SIZE, seed=0)
+        for name, bench in (
+            ("mime_detect", bench_detect(validator, head, loop)),
+            ("libmagic_sniff", bench_sniff(validator, head, loop)),
+        ):
+            case = summarize(name, len(head), measure(bench, min_runs, min_time))
+            cases.append(case)
+            print(f"{case['case']:<32} {case['median_ms']:>10.3f} ms")
+
+        paragraphs = classroom_text(100_000).split("\n\n")
+        words = sum(len(WORD.findall(paragraph)) for paragraph in paragraphs)
+        for mode in ("batch", "cold", "per_word"):
+            case = summarize(f"syllables_{mode}", words, measure(bench_syllables(paragraphs, mode), min_runs, min_time))
+            case["case"] = f"syllables_{mode}/{words}_words"
+            case.pop("mb_per_s")
+            case["words_per_s"] = words / case["median_ms"] * 1000
+            cases.append(case)
+            print(f"{case['case']:<32} {case['median_ms']:>10.3f} ms  {case['words_per_s']:>9.0f} mots/s")
+
+        texts = 256
+        case = summarize("llm_client_local", texts, measure(bench_llm_client(loop, texts), min_runs, min_time))
+        case["case"] = f"llm_client_local/{texts}_texts"
+        case.pop("mb_per_s")
+        cases.append(case)
+        print(f"{case['case']:<32} {case['median_ms']:>10.3f} ms")
+    finally:
+        loop.close()
+        directory.cleanup()
+    return cases
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default=",".join(human_size(size) for size in SIZES),
+                        help="Tailles de fichier, séparées par des virgules")
+    parser.add_argument("--min-runs", type=int, default=5)
+    parser.add_argument("--min-time", type=float, default=0.5, help="Durée minimale par cas, en secondes")
+    parser.add_argument("--output", type=Path, default=RESULTS_DIR)
+    parser.add_argument("--baseline", type=Path, help="Résultats de référence à comparer")
+    parser.add_argument("--tolerance", type=float, default=0.10, help="Dégradation admise (0.10 : 10 %%)")
+    args = parser.parse_args()
+
+    sizes = [parse_size(size) for size in args.sizes.split(",")]
+    cases = run(sizes, args.min_runs, args.min_time)
+    config = {"sizes": sizes, "min_runs": args.min_runs, "min_time": args.min_time, "chunk_size": CHUNK_SIZE}
+    path = save("micro", config, cases, args.output)
+    print(f"Résultats enregistrés dans {path}")
+    return check_baseline(path, args.baseline, args.tolerance)
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,130 @@
+"""
+Enregistrement et comparaison des résultats de benchmarks.
+
+Chaque exécution produit un fichier JSON ; comparé à une exécution de
+référence (celle de la version précédente), il permet de repérer les
+régressions entre deux versions.
+"""
+import json
+import platform
+import subprocess
+import sys
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence
+
+RESULTS_DIR = Path(__file__).parent / "results"
+
+# Indicateurs comparés : True si une valeur plus élevée est meilleure
+COMPARED_METRICS = {
+    "median_ms": False,
+    "p50_ms": False,
+    "p95_ms": False,
+    "p99_ms": False,
+    "throughput_rps": True,
+    "mb_per_s": True,
+    "words_per_s": True,
+    "peak_rss_mb": False,
+}
+
+
+def percentile(values: Sequence[float], q: float) -> float:
+    """
+    Percentile par interpolation linéaire, comme numpy.percentile.
+
+    Args:
+        values: Mesures, dans un ordre quelconque
+        q: Percentile voulu, entre 0 et 100
+    """
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    position = (len(ordered) - 1) * q / 100
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=True, cwd=Path(__file__).parent
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def save(name: str, config: Dict[str, Any], cases: List[Dict[str, Any]], directory: Path = RESULTS_DIR) -> Path:
+    """
+    Écrit les résultats d'une exécution, avec de quoi la reproduire.
+
+    Args:
+        name: Nom du benchmark (micro, load...)
+        config: Paramètres de l'exécution
+        cases: Un résultat par cas mesuré, identifié par sa clé "case"
+
+    Returns:
+        Path: Le fichier JSON écrit
+    """
+    now = datetime.now(timezone.utc)
+    report = {
+        "benchmark": name,
+        "created_at": now.isoformat(),
+        "commit": _git_commit(),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "config": config,
+        "cases": cases,
+    }
+    directory.mkdir(parents=True, exist_ok=True)
+    path = directory / f"{name}-{now.strftime('%Y%m%dT%H%M%S')}.json"
+    path.write_text(json.dumps(report, indent=2, ensure_ascii=False), encoding="utf-8")
+    return path
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], tolerance: float = 0.10) -> List[str]:
+    """
+    Liste les indicateurs dégradés de plus de `tolerance` par rapport à la référence.
+
+    Args:
+        current: Rapport de l'exécution courante
+        baseline: Rapport de référence
+        tolerance: Dégradation relative admise (0.10 : 10 %)
+
+    Returns:
+        List[str]: Une ligne par régression, vide si aucune
+    """
+    reference = {case["case"]: case for case in baseline.get("cases", [])}
+    regressions = []
+    for case in current.get("cases", []):
+        previous = reference.get(case["case"])
+        if previous is None:
+            continue
+        for metric, higher_is_better in COMPARED_METRICS.items():
+            new, old = case.get(metric), previous.get(metric)
+            if not new or not old:
+                continue
+            change = (old - new) / old if higher_is_better else (new - old) / old
+            if change > tolerance:
+                regressions.append(f"{case['case']} {metric}: {old:.3f} -> {new:.3f} ({change:+.0%})")
+    return regressions
+
+
+def check_baseline(report_path: Path, baseline_path: Optional[Path], tolerance: float) -> int:
+    """
+    Compare une exécution à sa référence et affiche le résultat.
+
+    Returns:
+        int: Code de sortie, 1 en cas de régression
+    """
+    if baseline_path is None:
+        return 0
+    current = json.loads(report_path.read_text(encoding="utf-8"))
+    baseline = json.loads(baseline_path.read_text(encoding="utf-8"))
+    regressions = compare(current, baseline, tolerance)
+    for line in regressions:
+        print(f"RÉGRESSION {line}")
+    if not regressions:
+        print(f"Aucune régression au-delà de {tolerance:.0%} par rapport à {baseline_path}")
+    return 1 if regressions else 0
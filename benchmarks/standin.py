@@ -0,0 +1,139 @@
+"""
+Remplaçant local de Supabase (Storage et PostgREST) et du service LLM.
+
+Ne couvre que les appels faits par l'application, en mémoire, sans
+persistance ni authentification : de quoi mesurer l'application elle-même
+sans dépendre du réseau ni d'un projet Supabase.
+
+Usage:
+    uvicorn benchmarks.standin:app --port 54321
+"""
+import asyncio
+import itertools
+import os
+from datetime import datetime
+from typing import Any, Dict, List
+
+from fastapi import FastAPI, Request, Response
+from fastapi.responses import JSONResponse
+
+app = FastAPI(title="toDys stand-in")
+
+objects: Dict[str, bytes] = {}
+rows: Dict[int, Dict[str, Any]] = {}
+ids = itertools.count(1)
+
+# Latences simulées, en millisecondes
+STORAGE_LATENCY = float(os.getenv("STANDIN_STORAGE_LATENCY_MS", "0")) / 1000
+DB_LATENCY = float(os.getenv("STANDIN_DB_LATENCY_MS", "0")) / 1000
+
+
+def _matches(row: Dict[str, Any], column: str, condition: str) -> bool:
+    operator, _, expected = condition.partition(".")
+    value = row.get(column)
+    if operator == "in":
+        return str(value) in expected.strip("()").split(",")
+    if operator == "is":
+        return value is None if expected == "null" else str(value).lower() == expected
+    if value is None:
+        return False
+    value = str(value)
+    return {
+        "eq": value == expected,
+        "neq": value != expected,
+        "gt": value > expected,
+        "gte": value >= expected,
+        "lt": value < expected,
+        "lte": value <= expected,
+    }.get(operator, False)
+
+
+def _select(request: Request) -> List[Dict[str, Any]]:
+    selected = list(rows.values())
+    for column, condition in request.query_params.multi_items():
+        if column not in ("select", "order", "limit", "offset"):
+            selected = [row for row in selected if _matches(row, column, condition)]
+
+    order = request.query_params.get("order")
+    if order:
+        column, _, direction = order.partition(".")
+        selected.sort(key=lambda row: str(row.get(column) or ""), reverse=direction.startswith("desc"))
+
+    limit = request.query_params.get("limit")
+    return selected[:int(limit)] if limit else selected
+
+
+@app.get("/rest/v1/temp_files")
+async def select_rows(request: Request):
+    await asyncio.sleep(DB_LATENCY)
+    return _select(request)
+
+
+@app.post("/rest/v1/temp_files")
+async def insert_rows(request: Request):
+    await asyncio.sleep(DB_LATENCY)
+    payload = await request.json()
+    inserted = []
+    for row in payload if isinstance(payload, list) else [payload]:
+        row = {**row, "id": next(ids), "created_at": datetime.now().isoformat()}
+        rows[row["id"]] = row
+        inserted.append(row)
+    return JSONResponse(inserted, status_code=201)
+
+
+@app.patch("/rest/v1/temp_files")
+async def update_rows(request: Request):
+    await asyncio.sleep(DB_LATENCY)
+    changes = await request.json()
+    updated = []
+    for row in _select(request):
+        row.update(changes)
+        updated.append(row)
+    return updated
+
+
+@app.delete("/rest/v1/temp_files")
+async def delete_rows(request: Request):
+    await asyncio.sleep(DB_LATENCY)
+    deleted = _select(request)
+    for row in deleted:
+        rows.pop(row["id"], None)
+    return deleted
+
+
+@app.post("/storage/v1/object/{bucket}/{path:path}")
+async def put_object(bucket: str, path: str, request: Request):
+    await asyncio.sleep(STORAGE_LATENCY)
+    content = bytearray()
+    async for chunk in request.stream():
+        content.extend(chunk)
+    objects[f"{bucket}/{path}"] = bytes(content)
+    return {"Key": f"{bucket}/{path}"}
+
+
+@app.get("/storage/v1/object/{bucket}/{path:path}")
+async def get_object(bucket: str, path: str):
+    await asyncio.sleep(STORAGE_LATENCY)
+    content = objects.get(f"{bucket}/{path}")
+    if content is None:
+        return JSONResponse({"error": "not_found"}, status_code=404)
+    return Response(content, media_type="application/octet-stream")
+
+
+@app.delete("/storage/v1/object/{bucket}")
+async def remove_objects(bucket: str, request: Request):
+    await asyncio.sleep(STORAGE_LATENCY)
+    payload = await request.json()
+    removed = [{"name": path} for path in payload.get("prefixes", []) if objects.pop(f"{bucket}/{path}", None) is not None]
+    return removed
+
+
+@app.post("/v1/simplify")
+async def simplify(request: Request):
+    payload = await request.json()
+    return {"results": [" ".join(text.split()) for text in payload["texts"]], "model": payload.get("model")}
+
+
+@app.get("/health")
+async def health():
+    return {"objects": len(objects), "rows": len(rows)}
@@ -0,0 +1,127 @@
+"""
+Modèles de simplification servis par llm-service.
+
+Chaque backend simplifie un lot de textes en un seul appel. Le backend
+"rules" est déterministe et sans dépendance : il sert sur CPU, hors ligne
+et de repli quand aucun modèle distant n'est configuré.
+"""
+import asyncio
+import logging
+import os
+import re
+from typing import Dict, List, Protocol
+
+logger = logging.getLogger(__name__)
+
+
+class Backend(Protocol):
+    """Modèle capable de simplifier un lot de textes."""
+    name: str
+    version: str
+
+    async def load(self) -> None:
+        ...
+
+    async def simplify(self, texts: List[str]) -> List[str]:
+        ...
+
+
+# Tournures remplacées par un équivalent plus court ou plus courant
+RULES: Dict[str, str] = {
+    "afin de": "pour",
+    "afin que": "pour que",
+    "ainsi que": "et",
+    "auparavant": "avant",
+    "cependant": "mais",
+    "davantage": "plus",
+    "dorénavant": "désormais",
+    "en dépit de": "malgré",
+    "en outre": "de plus",
+    "lorsque": "quand",
+    "néanmoins": "mais",
+    "par conséquent": "donc",
+    "toutefois": "mais",
+}
+RULE_PATTERN = re.compile(r"\b(" + "|".join(sorted(map(re.escape, RULES), key=len, reverse=True)) + r")\b", re.IGNORECASE)
+
+# Une proposition introduite par ";" devient une phrase à part entière
+CLAUSE_BREAK = re.compile(r"\s*;\s+(\w)")
+
+
+class RuleBasedBackend:
+    """Simplification par règles : vocabulaire courant et phrases plus courtes."""
+    name = "rules"
+    version = "1"
+
+    async def load(self) -> None:
+        return None
+
+    @staticmethod
+    def _replace(match: re.Match) -> str:
+        word = match.group(0)
+        replacement = RULES[word.lower()]
+        return replacement.capitalize() if word[0].isupper() else replacement
+
+    def simplify_one(self, text: str) -> str:
+        text = " ".join(text.split())
+        text = RULE_PATTERN.sub(self._replace, text)
+        return CLAUSE_BREAK.sub(lambda match: ". " + match.group(1).upper(), text)
+
+    async def simplify(self, texts: List[str]) -> List[str]:
+        return [self.simplify_one(text) for text in texts]
+
+
+SYSTEM_PROMPT = (
+    "Tu simplifies des textes en français pour des lecteurs dyslexiques. "
+    "Garde le sens, utilise des mots courants et des phrases courtes. "
+    "Réponds uniquement avec le texte simplifié."
+)
+
+
+class MistralBackend:
+    """Simplification par un modèle Mistral, interrogé via l'API distante."""
+    name = "mistral"
+
+    def __init__(self, api_key: str, model: str, max_parallel: int = 8):
+        self.model = model
+        self.version = model
+        self._api_key = api_key
+        self._slots = asyncio.Semaphore(max_parallel)
+        self._client = None
+
+    async def load(self) -> None:
+        from mistralai import Mistral
+
+        self._client = Mistral(api_key=self._api_key)
+
+    async def _simplify_one(self, text: str) -> str:
+        async with self._slots:
+            response = await self._client.chat.complete_async(
+                model=self.model,
+                messages=[
+                    {"role": "system", "content": SYSTEM_PROMPT},
+                    {"role": "user", "content": text},
+                ],
+                temperature=0,
+            )
+        return response.choices[0].message.content.strip()
+
+    async def simplify(self, texts: List[str]) -> List[str]:
+        # L'API ne traite qu'un message à la fois : le lot est envoyé en parallèle
+        return list(await asyncio.gather(*(self._simplify_one(text) for text in texts)))
+
+
+def create_backend(name: str) -> Backend:
+    """
+    Construit le backend demandé.
+
+    Sans clé d'API, "mistral" se replie sur le backend par règles.
+    """
+    if name == "mistral":
+        api_key = os.getenv("MISTRAL_API_KEY")
+        if api_key:
+            return MistralBackend(api_key, os.getenv("MODEL", "mistral-small-latest"))
+        logger.warning("MISTRAL_API_KEY absente, repli sur le backend par règles")
+    elif name != "rules":
+        raise ValueError(f"Backend inconnu: {name}")
+    return RuleBasedBackend()
@@ -0,0 +1,110 @@
+"""
+File d'attente et regroupement dynamique des demandes d'inférence.
+"""
+import asyncio
+import logging
+from typing import List, Optional, Tuple
+
+from backends import Backend
+
+logger = logging.getLogger(__name__)
+
+
+class QueueFullError(Exception):
+    """Levée lorsque la file d'attente ne peut plus accepter de textes."""
+
+
+class DynamicBatcher:
+    """
+    Regroupe les textes en attente en lots envoyés au backend.
+
+    Un lot part dès qu'il atteint `max_batch_size` textes, ou quand le
+    premier texte du lot a attendu `max_wait` secondes. Au-delà de
+    `max_queue` textes en attente, les nouvelles demandes sont refusées.
+    """
+
+    def __init__(self, backend: Backend, max_batch_size: int = 16, max_wait: float = 0.01,
+                 max_queue: int = 256, workers: int = 1):
+        self.backend = backend
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.max_queue = max_queue
+        self.workers = workers
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+
+    @property
+    def depth(self) -> int:
+        """Nombre de textes en attente d'un lot."""
+        return self._queue.qsize() if self._queue is not None else 0
+
+    @property
+    def running(self) -> bool:
+        return any(not task.done() for task in self._tasks)
+
+    async def start(self) -> None:
+        if self._tasks:
+            return
+        self._queue = asyncio.Queue()
+        self._tasks = [asyncio.create_task(self._worker(), name=f"batcher-{i}") for i in range(self.workers)]
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def submit(self, texts: List[str]) -> List[str]:
+        """
+        Simplifie des textes, éventuellement avec ceux d'autres demandes.
+
+        Args:
+            texts: Textes à simplifier
+
+        Returns:
+            List[str]: Textes simplifiés, dans l'ordre donné
+
+        Raises:
+            QueueFullError: Si la file d'attente est pleine
+        """
+        if self._queue is None:
+            raise RuntimeError("Le batcher n'est pas démarré")
+        if self.depth + len(texts) > self.max_queue:
+            raise QueueFullError(f"File d'attente pleine ({self.depth} textes en attente)")
+
+        loop = asyncio.get_running_loop()
+        futures = [loop.create_future() for _ in texts]
+        for text, future in zip(texts, futures):
+            self._queue.put_nowait((text, future))
+        return list(await asyncio.gather(*futures))
+
+    async def _collect(self) -> List[Tuple[str, asyncio.Future]]:
+        batch = [await self._queue.get()]
+        deadline = asyncio.get_running_loop().time() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - asyncio.get_running_loop().time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        # Les demandes abandonnées entre-temps ne sont pas envoyées au modèle
+        return [(text, future) for text, future in batch if not future.done()]
+
+    async def _worker(self) -> None:
+        while True:
+            batch = await self._collect()
+            if not batch:
+                continue
+            try:
+                results = await self.backend.simplify([text for text, _ in batch])
+            except Exception as e:
+                logger.exception("Échec d'un lot de %d textes", len(batch))
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            for (_, future), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
@@ -1 +1,127 @@
-print("LLM service started ")
+"""
+llm-service : serveur d'inférence pour la simplification de textes.
+
+Les demandes sont placées dans une file commune et regroupées en lots
+dynamiques avant d'être envoyées au modèle. Quand la file est pleine, le
+service répond 429 plutôt que d'accumuler du retard.
+"""
+import logging
+import os
+from contextlib import asynccontextmanager
+from typing import List, Optional
+
+import uvicorn
+from fastapi import FastAPI, HTTPException, Response
+from pydantic import BaseModel, Field
+
+from backends import create_backend
+from batcher import DynamicBatcher, QueueFullError
+
+logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO"))
+
+PORT = int(os.getenv("PORT", "5001"))
+BACKEND = os.getenv("BACKEND", "rules")  # "rules" ou "mistral"
+MAX_BATCH_SIZE = int(os.getenv("MAX_BATCH_SIZE", "16"))
+MAX_WAIT_MS = int(os.getenv("MAX_WAIT_MS", "10"))
+MAX_QUEUE = int(os.getenv("MAX_QUEUE", "256"))
+MAX_TEXTS_PER_REQUEST = int(os.getenv("MAX_TEXTS_PER_REQUEST", "64"))
+
+# Délai suggéré au client quand la file est pleine, en secondes
+RETRY_AFTER = "1"
+
+backend = create_backend(BACKEND)
+batcher = DynamicBatcher(backend, max_batch_size=MAX_BATCH_SIZE, max_wait=MAX_WAIT_MS / 1000, max_queue=MAX_QUEUE)
+state = {"ready": False}
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await backend.load()
+    await batcher.start()
+    state["ready"] = True
+    try:
+        yield
+    finally:
+        state["ready"] = False
+        await batcher.stop()
+
+
+app = FastAPI(title="toDys llm-service", lifespan=lifespan)
+
+
+class SimplifyRequest(BaseModel):
+    texts: List[str] = Field(..., max_length=MAX_TEXTS_PER_REQUEST)
+    model: Optional[str] = None
+
+
+class SimplifyResponse(BaseModel):
+    results: List[str]
+    model: str
+    version: str
+
+
+class TransformRequest(BaseModel):
+    text: str
+
+
+class TransformResponse(BaseModel):
+    result: str
+    model: str
+    version: str
+
+
+async def run_batch(texts: List[str]) -> List[str]:
+    if not state["ready"]:
+        raise HTTPException(status_code=503, detail="Service en cours de démarrage")
+    try:
+        return await batcher.submit(texts)
+    except QueueFullError as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": RETRY_AFTER})
+
+
+@app.post("/v1/simplify", response_model=SimplifyResponse)
+async def simplify(request: SimplifyRequest):
+    """
+    Simplifie un lot de textes ; les résultats suivent l'ordre des textes.
+
+    Un modèle demandé autre que celui du service est refusé (422) : le
+    client ne doit pas attribuer à ce modèle des résultats qu'il n'a pas produits.
+    """
+    if request.model is not None and request.model != backend.name:
+        raise HTTPException(
+            status_code=422, detail=f"Modèle non servi: {request.model} (ce service sert {backend.name})"
+        )
+    results = await run_batch(request.texts)
+    return SimplifyResponse(results=results, model=backend.name, version=backend.version)
+
+
+@app.post("/v1/transform", response_model=TransformResponse)
+async def transform(request: TransformRequest):
+    """Simplifie un seul texte."""
+    results = await run_batch([request.text])
+    return TransformResponse(result=results[0], model=backend.name, version=backend.version)
+
+
+@app.get("/health")
+async def health():
+    """Le processus répond."""
+    return {"status": "ok"}
+
+
+@app.get("/ready")
+async def ready(response: Response):
+    """Le modèle est chargé et la file est traitée."""
+    is_ready = state["ready"] and batcher.running
+    if not is_ready:
+        response.status_code = 503
+    return {
+        "ready": is_ready,
+        "backend": backend.name,
+        "version": backend.version,
+        "queue_depth": batcher.depth,
+        "max_queue": batcher.max_queue,
+    }
+
+
+if __name__ == "__main__":
+    uvicorn.run(app, host="0.0.0.0", port=PORT)
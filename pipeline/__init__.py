@@ -0,0 +1,6 @@
+from .extractors import Block, UnsupportedFormatError, extract_blocks
+from .layout import RenderStyle
+from .render import render_blocks
+from .transform import transform_document
+
+__all__ = ["Block", "RenderStyle", "UnsupportedFormatError", "extract_blocks", "render_blocks", "transform_document"]
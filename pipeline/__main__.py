@@ -0,0 +1,65 @@
+"""
+Conversion par lot d'un dossier de documents, sans passer par l'API.
+
+Les documents déjà convertis, à contenu identique, sont ignorés : une
+conversion interrompue se relance avec la même commande.
+
+Usage:
+    python -m pipeline SOURCE SORTIE [--formats html,pdf] [--workers 4]
+"""
+import argparse
+import asyncio
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import List, Optional
+
+from app.config import get_settings
+from app.services.file_validator import FileValidator
+
+from .batch import convert_directory
+from .extractors import UnsupportedFormatError
+from .layout import RenderStyle
+from .parallel import default_workers
+from .render import get_renderer
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    settings = get_settings()
+    parser = argparse.ArgumentParser(prog="python -m pipeline", description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("source", type=Path, help="Dossier des documents à convertir")
+    parser.add_argument("output", type=Path, help="Dossier où écrire les documents convertis")
+    parser.add_argument("--formats", default=",".join(settings.RENDER_FORMATS),
+                        help="Formats de rendu, séparés par des virgules (vide : texte seul)")
+    parser.add_argument("--workers", type=int, default=default_workers(), help="Processus de conversion")
+    parser.add_argument("--max-size", type=int, default=settings.MAX_UPLOAD_SIZE,
+                        help="Taille maximale d'un document, en octets")
+    parser.add_argument("--font", type=Path, default=settings.RENDER_FONT, help="Police TrueType des rendus")
+    parser.add_argument("--bold-font", type=Path, default=settings.RENDER_BOLD_FONT,
+                        help="Police TrueType des titres")
+    parser.add_argument("--quiet", action="store_true", help="N'affiche que les rejets, les échecs et le bilan")
+    args = parser.parse_args(argv)
+
+    if not args.source.is_dir():
+        parser.error(f"{args.source} n'est pas un dossier")
+    formats = [output_format.strip().lower() for output_format in args.formats.split(",") if output_format.strip()]
+    for output_format in formats:
+        try:
+            get_renderer(output_format)
+        except UnsupportedFormatError as e:
+            parser.error(str(e))
+    logging.basicConfig(level=logging.WARNING if args.quiet else logging.INFO, format="%(message)s")
+
+    style = RenderStyle(font_path=args.font, bold_font_path=args.bold_font)
+    with ProcessPoolExecutor(max_workers=args.workers) as executor:
+        summary = asyncio.run(convert_directory(
+            args.source, args.output, FileValidator(), executor, formats=formats, style=style,
+            concurrency=2 * args.workers, max_size=args.max_size
+        ))
+    print(summary.report())
+    return 1 if summary.failed else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
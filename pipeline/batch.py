@@ -0,0 +1,192 @@
+"""
+Conversion par lot d'un dossier de documents, hors ligne.
+
+Les fichiers sont validés selon les mêmes règles que les uploads
+(FileValidator), puis extraits, transformés et rendus par le même pipeline
+que l'application, un document par worker d'un pool de processus. Les
+résultats sont écrits sur disque en reproduisant l'arborescence du dossier
+d'origine.
+
+Chaque conversion réussie est consignée, avec l'empreinte SHA-256 du
+document et les formats rendus, dans un journal écrit à la racine du
+dossier de sortie, une fois tous ses fichiers écrits : une
+conversion interrompue reprend là où elle s'était arrêtée, et seuls les
+documents nouveaux ou modifiés sont convertis à nouveau.
+"""
+import asyncio
+import functools
+import hashlib
+import json
+import logging
+import time
+from concurrent.futures import Executor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, FrozenSet, Iterable, Iterator, List, Optional, Tuple
+
+from app.services.file_validator import FileValidator
+
+from .layout import RenderStyle
+from .render import rendered_path
+from .transform import output_path, transform_document
+
+logger = logging.getLogger(__name__)
+
+# Journal des documents déjà convertis, une ligne JSON par document
+JOURNAL_NAME = ".todys-batch.jsonl"
+
+
+@dataclass
+class BatchSummary:
+    """Bilan d'une conversion par lot."""
+    converted: int = 0
+    skipped: int = 0
+    rejected: int = 0
+    failed: int = 0
+    converted_bytes: int = 0
+    seconds: float = 0.0
+
+    def report(self) -> str:
+        """Bilan lisible, avec le débit des documents convertis."""
+        files_per_s = self.converted / self.seconds if self.seconds else 0.0
+        mb_per_s = self.converted_bytes / 1024 / 1024 / self.seconds if self.seconds else 0.0
+        return (
+            f"{self.converted} convertis, {self.skipped} déjà à jour, {self.rejected} rejetés, "
+            f"{self.failed} en échec en {self.seconds:.1f} s : "
+            f"{files_per_s:.1f} fichiers/s, {mb_per_s:.2f} Mo/s"
+        )
+
+
+class Journal:
+    """Documents déjà convertis, par chemin relatif, avec leur empreinte et leurs formats de rendu."""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.entries: Dict[str, Tuple[str, FrozenSet[str]]] = {}
+        if path.exists():
+            with path.open(encoding="utf-8") as journal:
+                for line in journal:
+                    if line.strip():
+                        entry = json.loads(line)
+                        self.entries[entry["source"]] = (entry["sha256"], frozenset(entry.get("formats", ())))
+
+    def is_done(self, source: str, digest: str, output: Path, formats: Iterable[str] = ()) -> bool:
+        """
+        Indique si un document a déjà été converti dans cette version et ces formats.
+
+        Le texte et chacun des rendus attendus doivent encore exister.
+        """
+        entry = self.entries.get(source)
+        if entry is None or entry[0] != digest or not entry[1].issuperset(formats):
+            return False
+        return output.exists() and all(rendered_path(output, fmt).exists() for fmt in formats)
+
+    def record(self, source: str, digest: str, formats: Iterable[str] = ()) -> None:
+        """Consigne une conversion réussie, immédiatement sur disque."""
+        formats = frozenset(formats)
+        self.entries[source] = (digest, formats)
+        with self.path.open("a", encoding="utf-8") as journal:
+            entry = {"source": source, "sha256": digest, "formats": sorted(formats)}
+            journal.write(json.dumps(entry, ensure_ascii=False) + "\n")
+
+
+def find_documents(source_dir: Path, exclude: Optional[Path] = None) -> Iterator[Path]:
+    """
+    Fichiers d'un dossier et de ses sous-dossiers, dans l'ordre alphabétique.
+
+    Les fichiers et dossiers cachés sont ignorés, de même que `exclude`
+    (le dossier de sortie, s'il est placé dans le dossier d'origine).
+    """
+    for path in sorted(source_dir.rglob("*")):
+        relative = path.relative_to(source_dir)
+        if any(part.startswith(".") for part in relative.parts):
+            continue
+        if exclude is not None and (path.resolve() == exclude or exclude in path.resolve().parents):
+            continue
+        if path.is_file():
+            yield path
+
+
+def file_digest(path: Path) -> str:
+    """Empreinte SHA-256 du contenu d'un fichier."""
+    with path.open("rb") as source:
+        return hashlib.file_digest(source, "sha256").hexdigest()
+
+
+async def convert_directory(source_dir: Path, output_dir: Path, validator: FileValidator, executor: Executor,
+                            formats: Iterable[str] = (), style: Optional[RenderStyle] = None,
+                            concurrency: int = 4, max_size: Optional[int] = None) -> BatchSummary:
+    """
+    Convertit tous les documents d'un dossier.
+
+    Args:
+        source_dir: Dossier des documents d'origine
+        output_dir: Dossier où écrire les documents transformés et leurs rendus
+        validator: Validateur appliqué à chaque fichier avant sa conversion
+        executor: Pool sur lequel les documents sont convertis
+        formats: Formats de rendu produits à côté du texte
+        style: Mise en forme des rendus
+        concurrency: Documents traités en même temps (empreinte, validation et
+            conversion) ; au moins le nombre de workers, pour qu'ils ne
+            restent pas inoccupés pendant la validation des suivants
+        max_size: Taille maximale d'un document, par défaut MAX_UPLOAD_SIZE
+
+    Returns:
+        BatchSummary: Bilan de la conversion
+    """
+    started = time.perf_counter()
+    output_dir.mkdir(parents=True, exist_ok=True)
+    journal = Journal(output_dir / JOURNAL_NAME)
+    summary = BatchSummary()
+    semaphore = asyncio.Semaphore(concurrency)
+    loop = asyncio.get_running_loop()
+    formats = tuple(formats)
+
+    # Deux documents de même nom dans un même dossier (cours.pdf, cours.docx)
+    # auraient la même sortie : le second est rejeté plutôt que d'écraser le premier
+    planned: Dict[Path, str] = {}
+    documents: List[Tuple[Path, str, Path]] = []
+    for path in find_documents(source_dir, exclude=output_dir.resolve()):
+        relative = path.relative_to(source_dir).as_posix()
+        destination_dir = output_dir / path.relative_to(source_dir).parent
+        documents.append((path, relative, destination_dir))
+
+    async def convert(path: Path, relative: str, destination_dir: Path) -> None:
+        output = output_path(path.name, destination_dir)
+        if output in planned:
+            summary.rejected += 1
+            logger.warning("%s : même document de sortie que %s", relative, planned[output])
+            return
+        planned[output] = relative
+
+        async with semaphore:
+            digest = await asyncio.to_thread(file_digest, path)
+            if journal.is_done(relative, digest, output, formats):
+                summary.skipped += 1
+                return
+
+            result = await validator.validate_path(path, max_size)
+            if not result.is_valid:
+                summary.rejected += 1
+                logger.warning("%s : %s", relative, result.error_message)
+                return
+
+            destination_dir.mkdir(parents=True, exist_ok=True)
+            transform = functools.partial(transform_document, path, path.name, destination_dir,
+                                          formats=formats, style=style)
+            try:
+                await loop.run_in_executor(executor, transform)
+            except Exception as e:
+                summary.failed += 1
+                logger.error("%s : échec de la conversion : %s", relative, e)
+                return
+
+        # Le texte et tous les rendus sont écrits : transform_document ferme les rendus avant de rendre la main
+        journal.record(relative, digest, formats)
+        summary.converted += 1
+        summary.converted_bytes += path.stat().st_size
+        logger.info("%s -> %s", relative, output.relative_to(output_dir).as_posix())
+
+    await asyncio.gather(*(convert(*document) for document in documents))
+    summary.seconds = time.perf_counter() - started
+    return summary
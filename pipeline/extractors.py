@@ -0,0 +1,282 @@
+"""
+Extraction du texte des documents, format par format.
+
+Chaque extracteur est un générateur : il produit les blocs (pages ou
+paragraphes) au fur et à mesure de la lecture du document, sans jamais le
+matérialiser entièrement. Les premiers blocs peuvent ainsi être transformés
+pendant que les suivants sont encore en cours d'analyse.
+"""
+import codecs
+import io
+import re
+import shutil
+import subprocess
+import zipfile
+from dataclasses import dataclass
+from pathlib import Path
+from typing import BinaryIO, Callable, Dict, Iterator, List, Optional
+from xml.etree import ElementTree
+
+# Taille des morceaux lus pour les formats texte
+READ_SIZE = 64 * 1024
+
+
+class UnsupportedFormatError(Exception):
+    """Levée lorsqu'aucun extracteur ne sait lire un format."""
+
+
+@dataclass(frozen=True)
+class Block:
+    """Unité de texte extraite d'un document."""
+    index: int
+    text: str
+    page: Optional[int] = None
+    kind: str = "paragraph"
+    fingerprint: Optional[str] = None
+
+
+Extractor = Callable[[BinaryIO], Iterator[Block]]
+
+
+def _paragraphs(lines: Iterator[str]) -> Iterator[str]:
+    """Regroupe des lignes en paragraphes séparés par des lignes vides."""
+    current: List[str] = []
+    for line in lines:
+        line = line.strip()
+        if line:
+            current.append(line)
+        elif current:
+            yield " ".join(current)
+            current = []
+    if current:
+        yield " ".join(current)
+
+
+def extract_txt(source: BinaryIO) -> Iterator[Block]:
+    """Texte brut : un bloc par paragraphe. UTF-8, avec repli sur cp1252."""
+    head = source.read(READ_SIZE)
+    try:
+        head.decode("utf-8")
+        encoding = "utf-8-sig"
+    except UnicodeDecodeError as e:
+        # Un caractère multi-octets coupé en fin de morceau n'est pas une erreur
+        encoding = "utf-8-sig" if e.reason == "unexpected end of data" else "cp1252"
+    source.seek(0)
+
+    text = io.TextIOWrapper(source, encoding=encoding, errors="replace", newline=None)
+    try:
+        for index, paragraph in enumerate(_paragraphs(text)):
+            yield Block(index=index, text=paragraph)
+    finally:
+        text.detach()
+
+
+def extract_pdf(source: BinaryIO) -> Iterator[Block]:
+    """PDF : un bloc par page, chaque page n'étant analysée qu'à sa lecture."""
+    from pypdf import PdfReader
+
+    reader = PdfReader(source)
+    for page_number, page in enumerate(reader.pages, start=1):
+        text = (page.extract_text() or "").strip()
+        if text:
+            yield Block(index=page_number - 1, text=text, page=page_number, kind="page")
+
+
+WORD_NS = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+
+
+def extract_docx(source: BinaryIO) -> Iterator[Block]:
+    """DOCX : un bloc par paragraphe de word/document.xml, lu en flux."""
+    index = 0
+    with zipfile.ZipFile(source) as archive, archive.open("word/document.xml") as document:
+        for _, element in ElementTree.iterparse(document, events=("end",)):
+            if element.tag != f"{WORD_NS}p":
+                continue
+            text = "".join(
+                (node.text or "") if node.tag == f"{WORD_NS}t" else "\t"
+                for node in element.iter()
+                if node.tag in (f"{WORD_NS}t", f"{WORD_NS}tab")
+            ).strip()
+            # Libère le paragraphe déjà traité pour borner la mémoire
+            element.clear()
+            if text:
+                yield Block(index=index, text=text)
+                index += 1
+
+
+TEXT_NS = "{urn:oasis:names:tc:opendocument:xmlns:text:1.0}"
+
+
+def extract_odt(source: BinaryIO) -> Iterator[Block]:
+    """ODT : un bloc par paragraphe ou titre de content.xml, lu en flux."""
+    index = 0
+    depth = 0
+    with zipfile.ZipFile(source) as archive, archive.open("content.xml") as content:
+        for event, element in ElementTree.iterparse(content, events=("start", "end")):
+            if element.tag not in (f"{TEXT_NS}p", f"{TEXT_NS}h"):
+                continue
+            # Un paragraphe imbriqué (note, cadre) est rendu avec son parent
+            if event == "start":
+                depth += 1
+                continue
+            depth -= 1
+            if depth:
+                continue
+            text = "".join(element.itertext()).strip()
+            kind = "heading" if element.tag == f"{TEXT_NS}h" else "paragraph"
+            element.clear()
+            if text:
+                yield Block(index=index, text=text, kind=kind)
+                index += 1
+
+
+# Groupes RTF sans contenu textuel
+RTF_SKIPPED_DESTINATIONS = {
+    "fonttbl", "colortbl", "stylesheet", "info", "pict", "header", "footer",
+    "headerl", "headerr", "footerl", "footerr", "listtable", "listoverridetable",
+    "rsidtbl", "generator", "xmlnstbl", "themedata", "colorschememapping",
+    "latentstyles", "datastore", "object", "fldinst",
+}
+RTF_TOKEN = re.compile(rb"\\([a-zA-Z]+)(-?\d+)? ?|\\'([0-9a-fA-F]{2})|\\(.)|([{}])|([^\\{}\r\n]+)|[\r\n]+", re.DOTALL)
+RTF_SPECIALS = {"par": "\n", "line": "\n", "tab": "\t", "emdash": "\u2014", "endash": "\u2013",
+                "lquote": "\u2018", "rquote": "\u2019", "ldblquote": "\u201c", "rdblquote": "\u201d",
+                "bullet": "\u2022"}
+
+
+def _rtf_text(source: BinaryIO) -> Iterator[str]:
+    """Produit le texte d'un flux RTF, morceau par morceau."""
+    stack: List[bool] = []
+    skipping = False
+    pending = b""
+    codepage = "cp1252"
+    unicode_skip = 0
+
+    while True:
+        chunk = source.read(READ_SIZE)
+        data = pending + chunk
+        if chunk:
+            # On ne traite que jusqu'au dernier saut de ligne ou accolade : aucun mot
+            # de contrôle ne les contient, le reste attend le morceau suivant
+            cut = max(data.rfind(b"\n"), data.rfind(b"}"))
+            if cut < 0:
+                pending = data
+                continue
+            data, pending = data[:cut + 1], data[cut + 1:]
+
+        out: List[str] = []
+        for match in RTF_TOKEN.finditer(data):
+            word, argument, hex_code, symbol, brace, text = match.groups()
+            if brace == b"{":
+                stack.append(skipping)
+            elif brace == b"}":
+                skipping = stack.pop() if stack else False
+            elif word is not None:
+                name = word.decode("ascii")
+                if name in RTF_SKIPPED_DESTINATIONS:
+                    skipping = True
+                elif name == "ansicpg" and argument:
+                    codepage = f"cp{int(argument)}"
+                elif name == "u" and argument and not skipping:
+                    out.append(chr(int(argument) % 65536))
+                    unicode_skip = 1
+                elif name in RTF_SPECIALS and not skipping:
+                    out.append(RTF_SPECIALS[name])
+            elif hex_code is not None:
+                if unicode_skip:
+                    unicode_skip -= 1
+                elif not skipping:
+                    out.append(bytes([int(hex_code, 16)]).decode(codepage, errors="replace"))
+            elif symbol is not None:
+                if symbol == b"*":
+                    skipping = True
+                elif symbol in (b"\n", b"\r") and not skipping:
+                    out.append("\n")
+                elif symbol == b"~":
+                    out.append("\u00a0")
+                elif symbol in (b"\\", b"{", b"}") and not skipping:
+                    out.append(symbol.decode("ascii"))
+            elif text is not None and not skipping:
+                if unicode_skip:
+                    text = text[1:]
+                    unicode_skip = 0
+                out.append(text.decode(codepage, errors="replace"))
+        if out:
+            yield "".join(out)
+        if not chunk:
+            return
+
+
+def extract_rtf(source: BinaryIO) -> Iterator[Block]:
+    """RTF : un bloc par paragraphe (\\par), décodé en flux."""
+    def lines() -> Iterator[str]:
+        remainder = ""
+        for text in _rtf_text(source):
+            *complete, remainder = (remainder + text).split("\n")
+            for line in complete:
+                yield line
+                yield ""
+        yield remainder
+
+    for index, paragraph in enumerate(_paragraphs(lines())):
+        yield Block(index=index, text=paragraph)
+
+
+def extract_doc(source: BinaryIO) -> Iterator[Block]:
+    """
+    DOC (Word 97-2003) : délégué à antiword, dont la sortie est lue en flux.
+
+    Raises:
+        UnsupportedFormatError: Si antiword n'est pas installé
+    """
+    antiword = shutil.which("antiword")
+    if antiword is None:
+        raise UnsupportedFormatError("La lecture des fichiers .doc nécessite antiword")
+
+    process = subprocess.Popen([antiword, "-w", "0", "-"], stdin=subprocess.PIPE, stdout=subprocess.PIPE)
+    try:
+        shutil.copyfileobj(source, process.stdin, READ_SIZE)
+        process.stdin.close()
+        output = codecs.getreader("utf-8")(process.stdout, errors="replace")
+        for index, paragraph in enumerate(_paragraphs(output)):
+            yield Block(index=index, text=paragraph)
+    finally:
+        process.stdout.close()
+        process.wait()
+
+
+EXTRACTORS: Dict[str, Extractor] = {
+    "pdf": extract_pdf,
+    "docx": extract_docx,
+    "doc": extract_doc,
+    "odt": extract_odt,
+    "txt": extract_txt,
+    "rtf": extract_rtf,
+}
+
+
+def get_extractor(filename: str) -> Extractor:
+    """
+    Retourne l'extracteur adapté à l'extension d'un fichier.
+
+    Raises:
+        UnsupportedFormatError: Si l'extension n'est pas prise en charge
+    """
+    extension = Path(filename).suffix[1:].lower()
+    try:
+        return EXTRACTORS[extension]
+    except KeyError:
+        raise UnsupportedFormatError(f"Format .{extension} non pris en charge")
+
+
+def extract_blocks(source: BinaryIO, filename: str) -> Iterator[Block]:
+    """
+    Extrait les blocs de texte d'un document.
+
+    Args:
+        source: Contenu du document, ouvert en binaire et positionnable
+        filename: Nom du fichier, dont l'extension désigne le format
+
+    Returns:
+        Iterator[Block]: Les blocs, dans l'ordre du document
+    """
+    return get_extractor(filename)(source)
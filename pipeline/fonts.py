@@ -0,0 +1,263 @@
+"""
+Polices du rendu : métriques lues une fois, partagées entre les documents.
+
+Les polices TrueType sont analysées directement (tables head, hhea, hmtx,
+cmap, name...) : la largeur de chaque glyphe sert à couper les lignes et le
+programme de la police, compressé une seule fois, est incorporé tel quel
+dans les PDF. Sans police installée, le rendu se replie sur Courier, dont
+les métriques sont connues sans fichier.
+
+Seules les tables utiles à la mise en page et à l'incorporation sont lues,
+sans sous-ensemble ni transformation des glyphes : fontTools ou reportlab
+apporteraient beaucoup plus que ces quelques tables, pour une dépendance
+de plus dans chaque processus de transformation.
+"""
+import re
+import struct
+import zlib
+from array import array
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Iterable, Optional, Tuple
+
+# Polices recherchées, par ordre de préférence : les polices conçues pour la
+# dyslexie d'abord, puis une police sans empattement courante
+REGULAR_FONTS = ("OpenDyslexic-Regular.ttf", "Lexend-Regular.ttf", "AtkinsonHyperlegible-Regular.ttf",
+                 "Verdana.ttf", "DejaVuSans.ttf")
+BOLD_FONTS = ("OpenDyslexic-Bold.ttf", "Lexend-Bold.ttf", "AtkinsonHyperlegible-Bold.ttf",
+              "Verdana_Bold.ttf", "DejaVuSans-Bold.ttf")
+FONT_DIRS = (Path("/usr/share/fonts"), Path("/usr/local/share/fonts"), Path.home() / ".fonts")
+
+# Formes de mots dont la largeur est gardée en mémoire, par police
+WIDTH_MEMO_SIZE = 65536
+
+
+class FontError(Exception):
+    """Levée lorsqu'un fichier de police ne peut pas être utilisé."""
+
+
+class Font:
+    """
+    Police utilisable par le rendu.
+
+    Les largeurs sont exprimées en unités de la police (`units_per_em` par
+    cadratin) ; les dimensions du descripteur PDF en millièmes de cadratin.
+    """
+    embedded = True
+
+    def __init__(self, name: str, family: str, units_per_em: int, ascent: int, descent: int,
+                 cap_height: int, bbox: Tuple[int, int, int, int], advances: array, cmap: Dict[int, int],
+                 path: Optional[Path] = None, bold: bool = False):
+        self.name = name
+        self.family = family
+        self.units_per_em = units_per_em
+        self.ascent = ascent
+        self.descent = descent
+        self.cap_height = cap_height
+        self.bbox = bbox
+        self.advances = advances
+        self.cmap = cmap
+        self.path = path
+        self.bold = bold
+        self.advance = lru_cache(maxsize=WIDTH_MEMO_SIZE)(self._advance)
+
+    def glyph(self, char: str) -> int:
+        """Glyphe d'un caractère, 0 (.notdef) s'il manque à la police."""
+        return self.cmap.get(ord(char), 0)
+
+    def _advance(self, text: str) -> int:
+        advances = self.advances
+        last = len(advances) - 1
+        return sum(advances[min(self.glyph(char), last)] for char in text)
+
+    def width(self, text: str, size: float, letter_spacing: float = 0.0) -> float:
+        """
+        Largeur d'un texte en points.
+
+        Args:
+            text: Texte d'une seule ligne
+            size: Corps, en points
+            letter_spacing: Espace ajouté après chaque caractère, en points
+        """
+        return self.advance(text) * size / self.units_per_em + letter_spacing * len(text)
+
+    def scaled(self, value: int) -> int:
+        """Dimension en millièmes de cadratin, l'unité des descripteurs PDF."""
+        return round(value * 1000 / self.units_per_em)
+
+
+class BuiltinFont(Font):
+    """Police standard des lecteurs PDF, non incorporée, codée en WinAnsi."""
+    embedded = False
+
+    def __init__(self, name: str, advance: int = 600, bold: bool = False):
+        # Courier : chasse fixe, 600 millièmes de cadratin pour chaque caractère
+        super().__init__(
+            name=name, family="Courier New", units_per_em=1000, ascent=629, descent=-157, cap_height=562,
+            bbox=(-23, -250, 715, 805), advances=array("H", [advance]), cmap={}, bold=bold
+        )
+
+    def glyph(self, char: str) -> int:
+        return 0
+
+    def encode(self, text: str) -> bytes:
+        return text.encode("cp1252", errors="replace")
+
+
+def _tables(data: bytes) -> Dict[str, Tuple[int, int]]:
+    """Position et longueur de chaque table d'un fichier TrueType."""
+    version, count = struct.unpack_from(">IH", data, 0)
+    if version not in (0x00010000, 0x74727565):
+        raise FontError("Police TrueType attendue (les polices CFF/OpenType ne sont pas prises en charge)")
+    tables = {}
+    for index in range(count):
+        tag, _, offset, length = struct.unpack_from(">4sIII", data, 12 + 16 * index)
+        tables[tag.decode("latin-1")] = (offset, length)
+    return tables
+
+
+def _cmap(data: bytes, offset: int) -> Dict[int, int]:
+    """Correspondance caractère -> glyphe, depuis la sous-table Unicode la plus complète."""
+    _, count = struct.unpack_from(">HH", data, offset)
+    subtables = {}
+    for index in range(count):
+        platform, encoding, sub_offset = struct.unpack_from(">HHI", data, offset + 4 + 8 * index)
+        subtables[(platform, encoding)] = offset + sub_offset
+
+    for key in ((3, 10), (0, 4), (3, 1), (0, 3), (0, 1), (0, 0)):
+        if key not in subtables:
+            continue
+        start = subtables[key]
+        table_format = struct.unpack_from(">H", data, start)[0]
+        if table_format == 12:
+            return _cmap_format12(data, start)
+        if table_format == 4:
+            return _cmap_format4(data, start)
+    raise FontError("Aucune table cmap Unicode exploitable")
+
+
+def _cmap_format4(data: bytes, start: int) -> Dict[int, int]:
+    segments = struct.unpack_from(">H", data, start + 6)[0] // 2
+    ends = struct.unpack_from(f">{segments}H", data, start + 14)
+    starts = struct.unpack_from(f">{segments}H", data, start + 16 + 2 * segments)
+    deltas = struct.unpack_from(f">{segments}h", data, start + 16 + 4 * segments)
+    ranges_at = start + 16 + 6 * segments
+    range_offsets = struct.unpack_from(f">{segments}H", data, ranges_at)
+
+    cmap = {}
+    for index in range(segments):
+        for code in range(starts[index], ends[index] + 1):
+            if code == 0xFFFF:
+                continue
+            if range_offsets[index] == 0:
+                glyph = (code + deltas[index]) & 0xFFFF
+            else:
+                position = ranges_at + 2 * index + range_offsets[index] + 2 * (code - starts[index])
+                glyph = struct.unpack_from(">H", data, position)[0]
+                if glyph:
+                    glyph = (glyph + deltas[index]) & 0xFFFF
+            if glyph:
+                cmap[code] = glyph
+    return cmap
+
+
+def _cmap_format12(data: bytes, start: int) -> Dict[int, int]:
+    groups = struct.unpack_from(">I", data, start + 12)[0]
+    cmap = {}
+    for index in range(groups):
+        first, last, glyph = struct.unpack_from(">III", data, start + 16 + 12 * index)
+        for code in range(first, last + 1):
+            cmap[code] = glyph + code - first
+    return cmap
+
+
+def _names(data: bytes, offset: int) -> Dict[int, str]:
+    """Noms de la police (famille, nom PostScript...), par identifiant."""
+    _, count, strings = struct.unpack_from(">HHH", data, offset)
+    names: Dict[int, str] = {}
+    for index in range(count):
+        platform, _, _, name_id, length, position = struct.unpack_from(">HHHHHH", data, offset + 6 + 12 * index)
+        raw = data[offset + strings + position:offset + strings + position + length]
+        if platform in (0, 3):
+            names[name_id] = raw.decode("utf-16-be", errors="replace")
+        elif platform == 1:
+            names.setdefault(name_id, raw.decode("latin-1"))
+    return names
+
+
+@lru_cache()
+def load_font(path: Path, bold: bool = False) -> Font:
+    """
+    Analyse une police TrueType, une seule fois par fichier.
+
+    Raises:
+        FontError: Si le fichier n'est pas une police TrueType exploitable
+    """
+    data = Path(path).read_bytes()
+    try:
+        tables = _tables(data)
+        head, hhea, hmtx = tables["head"][0], tables["hhea"][0], tables["hmtx"][0]
+        if "glyf" not in tables:
+            raise FontError("Police TrueType attendue (les polices CFF/OpenType ne sont pas prises en charge)")
+        units_per_em = struct.unpack_from(">H", data, head + 18)[0]
+        bbox = struct.unpack_from(">4h", data, head + 36)
+        ascent, descent = struct.unpack_from(">hh", data, hhea + 4)
+        metrics_count = struct.unpack_from(">H", data, hhea + 34)[0]
+        advances = array("H", struct.unpack_from(f">{2 * metrics_count}H", data, hmtx)[::2])
+        cmap = _cmap(data, tables["cmap"][0])
+        names = _names(data, tables["name"][0]) if "name" in tables else {}
+        cap_height = ascent
+        if "OS/2" in tables:
+            os2 = tables["OS/2"][0]
+            if struct.unpack_from(">H", data, os2)[0] >= 2:
+                cap_height = struct.unpack_from(">h", data, os2 + 88)[0]
+    except (KeyError, struct.error) as e:
+        raise FontError(f"Police illisible {path}: {e}") from e
+
+    # Nom PostScript : sans espace ni caractère réservé de la syntaxe PDF
+    name = re.sub(r"[^A-Za-z0-9_.+-]", "", names.get(6) or Path(path).stem) or "Font"
+    return Font(
+        name=name, family=names.get(1) or name, units_per_em=units_per_em, ascent=ascent, descent=descent,
+        cap_height=cap_height, bbox=bbox, advances=advances, cmap=cmap, path=Path(path), bold=bold
+    )
+
+
+@lru_cache()
+def font_program(path: Path) -> Tuple[bytes, int]:
+    """
+    Programme d'une police compressé pour son incorporation, calculé une seule fois.
+
+    Returns:
+        Tuple[bytes, int]: Le programme compressé et sa taille d'origine
+    """
+    data = Path(path).read_bytes()
+    return zlib.compress(data, 6), len(data)
+
+
+def _find(names: Iterable[str], directories: Iterable[Path]) -> Optional[Path]:
+    found: Dict[str, Path] = {}
+    for directory in directories:
+        if not directory.is_dir():
+            continue
+        for candidate in directory.rglob("*.ttf"):
+            found.setdefault(candidate.name.lower(), candidate)
+    for name in names:
+        if name.lower() in found:
+            return found[name.lower()]
+    return None
+
+
+@lru_cache()
+def get_font(path: Optional[Path] = None, bold: bool = False) -> Font:
+    """
+    Police du rendu : celle demandée, sinon la première police installée de la
+    liste de préférence, sinon Courier.
+
+    Raises:
+        FontError: Si la police demandée ne peut pas être utilisée
+    """
+    if path is None:
+        path = _find(BOLD_FONTS if bold else REGULAR_FONTS, FONT_DIRS)
+        if path is None:
+            return BuiltinFont("Courier-Bold" if bold else "Courier", bold=bold)
+    return load_font(Path(path), bold)
@@ -0,0 +1,78 @@
+"""
+Empreintes de blocs, pour ne retransformer que ce qui a changé.
+
+Chaque bloc extrait est identifié par l'empreinte de son texte normalisé
+et de la version de l'adaptation qui lui est appliquée. Une transformation
+produit, à côté du document, un manifeste associant chaque empreinte au
+texte transformé ; lors de la transformation d'une nouvelle version du
+document, les blocs déjà connus sont repris tels quels depuis ce manifeste.
+Un résultat produit par une autre adaptation, ou un autre modèle, n'a pas
+la même empreinte et n'est donc jamais repris.
+"""
+import hashlib
+import json
+import unicodedata
+from dataclasses import replace
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List
+
+from .extractors import Block
+from .parallel import BlockTransform
+
+# Résultats déjà connus : empreinte -> texte transformé
+BlockCache = Dict[str, str]
+
+MANIFEST_SUFFIX = ".jsonl"
+
+
+def transform_version(transform_block: BlockTransform) -> str:
+    """
+    Version d'une adaptation de bloc, intégrée aux empreintes.
+
+    Une adaptation dont le résultat dépend d'un modèle expose une méthode
+    `version()` ; à défaut, son nom qualifié en tient lieu.
+    """
+    version = getattr(transform_block, "version", None)
+    if callable(version):
+        return version()
+    name = getattr(transform_block, "__qualname__", type(transform_block).__qualname__)
+    return f"{transform_block.__module__}.{name}"
+
+
+def fingerprint(block: Block, version: str = "") -> str:
+    """Empreinte d'un bloc pour une version d'adaptation, insensible aux différences d'espacement."""
+    text = " ".join(unicodedata.normalize("NFC", block.text).split())
+    return hashlib.sha256(f"{version}\0{block.kind}\0{text}".encode("utf-8")).hexdigest()
+
+
+def with_fingerprints(blocks: Iterable[Block], version: str = "") -> Iterator[Block]:
+    """Attache à chaque bloc extrait l'empreinte de son texte d'origine et de la version d'adaptation."""
+    for block in blocks:
+        yield replace(block, fingerprint=fingerprint(block, version))
+
+
+def manifest_path(output: Path) -> Path:
+    """Chemin du manifeste écrit à côté d'un document transformé."""
+    return output.with_name(f"{output.stem}.blocks{MANIFEST_SUFFIX}")
+
+
+def manifest_entry(block: Block) -> str:
+    """Ligne du manifeste pour un bloc transformé."""
+    return json.dumps({"fingerprint": block.fingerprint, "text": block.text}, ensure_ascii=False) + "\n"
+
+
+def read_manifest(source: Path) -> BlockCache:
+    """Relit un manifeste sous forme de cache empreinte -> texte transformé."""
+    cache: BlockCache = {}
+    with source.open(encoding="utf-8") as manifest:
+        for line in manifest:
+            if line.strip():
+                entry = json.loads(line)
+                cache[entry["fingerprint"]] = entry["text"]
+    return cache
+
+
+def read_fingerprints(source: Path) -> List[str]:
+    """Empreintes d'un manifeste, dans l'ordre du document."""
+    with source.open(encoding="utf-8") as manifest:
+        return [json.loads(line)["fingerprint"] for line in manifest if line.strip()]
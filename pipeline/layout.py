@@ -0,0 +1,139 @@
+"""
+Mise en forme adaptée à la dyslexie, commune à tous les formats de sortie.
+
+Les recommandations suivies sont celles de la British Dyslexia Association :
+police sans empattement, corps de 12 à 14 points, interlignage de 1,5,
+espacement des lettres et des mots élargi, lignes de 60 à 70 caractères
+alignées à gauche, texte gris foncé sur fond crème plutôt que noir sur
+blanc, alternance de couleurs d'une syllabe à l'autre.
+"""
+import re
+from dataclasses import dataclass
+from functools import lru_cache
+from pathlib import Path
+from typing import Iterator, List, Optional, Tuple
+
+from .extractors import Block
+from .fonts import Font, get_font
+from .syllables import segment
+
+# Texte d'une ligne : suite de segments (texte, indice de couleur), -1 pour la couleur du texte
+Run = Tuple[str, int]
+
+# A4, en points
+A4 = (595.28, 841.89)
+
+
+@dataclass(frozen=True)
+class RenderStyle:
+    """Paramètres de mise en forme ; les espacements sont en cadratins."""
+    font_size: float = 14.0
+    heading_scale: float = 1.3
+    line_height: float = 1.5
+    paragraph_spacing: float = 1.0
+    letter_spacing: float = 0.12
+    word_spacing: float = 0.16
+    max_line_chars: int = 65
+    page_size: Tuple[float, float] = A4
+    margin: float = 56.0
+    text_color: str = "#222222"
+    background: str = "#FFF8E7"
+    syllable_colors: Tuple[str, ...] = ("#1F4E9C", "#B3261E")
+    color_syllables: bool = True
+    font_path: Optional[Path] = None
+    bold_font_path: Optional[Path] = None
+
+    @property
+    def font(self) -> Font:
+        return get_font(self.font_path)
+
+    @property
+    def bold_font(self) -> Font:
+        return get_font(self.bold_font_path, bold=True)
+
+    def size_of(self, kind: str) -> float:
+        """Corps d'un bloc selon sa nature."""
+        return self.font_size * self.heading_scale if kind == "heading" else self.font_size
+
+
+def rgb(color: str) -> Tuple[float, float, float]:
+    """Composantes d'une couleur #RRGGBB, entre 0 et 1."""
+    value = color.lstrip("#")
+    return tuple(int(value[index:index + 2], 16) / 255 for index in (0, 2, 4))
+
+
+@lru_cache()
+def line_width(style: RenderStyle) -> float:
+    """
+    Longueur de ligne en points : `max_line_chars` caractères moyens, dans la
+    limite de la page.
+    """
+    font = style.font
+    alphabet = "abcdefghijklmnopqrstuvwxyz"
+    letter_spacing = style.letter_spacing * style.font_size
+    average = font.width(alphabet, style.font_size, letter_spacing) / len(alphabet)
+    page = style.page_size[0] - 2 * style.margin
+    return min(page, average * style.max_line_chars)
+
+
+def paragraphs(block: Block) -> Iterator[str]:
+    """Paragraphes d'un bloc, séparés par des lignes vides, aux espaces normalisés."""
+    for paragraph in re.split(r"\n\s*\n", block.text):
+        text = " ".join(paragraph.split())
+        if text:
+            yield text
+
+
+def color_runs(text: str, style: RenderStyle, first: int = 0) -> Tuple[List[Run], int]:
+    """
+    Découpe un texte en segments colorés, une couleur par syllabe.
+
+    L'alternance se poursuit d'un mot à l'autre : deux syllabes voisines
+    n'ont jamais la même couleur.
+
+    Args:
+        text: Texte à colorer
+        style: Mise en forme, dont les couleurs des syllabes
+        first: Indice de couleur de la première syllabe
+
+    Returns:
+        Tuple[List[Run], int]: Les segments et l'indice de la syllabe suivante
+    """
+    if not style.color_syllables or not style.syllable_colors:
+        return [(text, -1)], first
+    runs: List[Run] = []
+    append = runs.append
+    count = len(style.syllable_colors)
+    separators, words = segment(text)
+    for separator, syllables in zip(separators, words):
+        if separator:
+            append((separator, -1))
+        for syllable in syllables:
+            append((syllable, first % count))
+            first += 1
+    if separators[-1]:
+        append((separators[-1], -1))
+    return runs, first
+
+
+def wrap(text: str, font: Font, size: float, style: RenderStyle, width: float) -> List[str]:
+    """
+    Coupe un paragraphe en lignes d'au plus `width` points, aux espaces.
+
+    Un mot plus long qu'une ligne occupe seul sa ligne.
+    """
+    letter_spacing = style.letter_spacing * size
+    space = font.width(" ", size, letter_spacing) + style.word_spacing * size
+    lines: List[str] = []
+    current: List[str] = []
+    used = 0.0
+    for word in text.split(" "):
+        advance = font.width(word, size, letter_spacing)
+        if current and used + space + advance > width:
+            lines.append(" ".join(current))
+            current, used = [], 0.0
+        used += (space if current else 0.0) + advance
+        current.append(word)
+    if current:
+        lines.append(" ".join(current))
+    return lines
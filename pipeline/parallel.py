@@ -0,0 +1,159 @@
+"""
+Transformation parallèle des documents, unité par unité.
+
+Un document extrait est découpé en unités indépendantes (une page, ou une
+section de paragraphes consécutifs) transformées en parallèle sur un pool
+d'exécution, puis réassemblées dans l'ordre d'origine. Le nombre d'unités
+en vol est borné : l'extraction ne prend jamais plus d'avance que
+nécessaire et la mémoire reste bornée quelle que soit la taille du document.
+"""
+import os
+from collections import deque
+from concurrent.futures import Executor, Future
+from dataclasses import replace
+from typing import Callable, Deque, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from .extractors import Block
+
+# Taille cible d'une section de paragraphes, en caractères
+SECTION_SIZE = 4000
+
+# Nouvelles tentatives accordées à une unité en échec
+UNIT_MAX_RETRIES = 2
+
+BlockTransform = Callable[[Block], str]
+# Avancement : (unités terminées, nombre total d'unités, connu une fois l'extraction finie)
+Progress = Callable[[int, Optional[int]], None]
+
+
+class UnitTransformError(Exception):
+    """Levée lorsqu'une unité échoue après toutes ses tentatives."""
+
+    def __init__(self, unit: List[Block], cause: Exception):
+        first = unit[0]
+        where = f"page {first.page}" if first.page is not None else f"bloc {first.index}"
+        super().__init__(f"Échec de la transformation ({where}): {cause}")
+        self.unit = unit
+        self.cause = cause
+
+
+def default_workers() -> int:
+    """Nombre de workers par défaut : un par cœur disponible."""
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def split_units(blocks: Iterable[Block], section_size: int = SECTION_SIZE) -> Iterator[List[Block]]:
+    """
+    Découpe une suite de blocs en unités de transformation.
+
+    Chaque page forme une unité ; les paragraphes consécutifs sont regroupés
+    en sections d'environ `section_size` caractères, pour amortir le coût
+    d'envoi d'une unité à un autre processus.
+    """
+    section: List[Block] = []
+    size = 0
+    for block in blocks:
+        if block.kind == "page":
+            if section:
+                yield section
+                section, size = [], 0
+            yield [block]
+            continue
+
+        section.append(block)
+        size += len(block.text)
+        if size >= section_size:
+            yield section
+            section, size = [], 0
+    if section:
+        yield section
+
+
+def transform_unit(unit: List[Block], transform_block: BlockTransform) -> List[str]:
+    """Transforme les blocs d'une unité ; exécutée dans un worker du pool."""
+    return [transform_block(block) for block in unit]
+
+
+def transform_in_parallel(
+    blocks: Iterable[Block],
+    transform_block: BlockTransform,
+    executor: Executor,
+    max_in_flight: Optional[int] = None,
+    max_retries: int = UNIT_MAX_RETRIES,
+    progress: Optional[Progress] = None,
+    cache: Optional[Dict[str, str]] = None,
+) -> Iterator[Block]:
+    """
+    Transforme des blocs en parallèle et les restitue dans leur ordre d'origine.
+
+    Une unité en échec est relancée seule, jusqu'à `max_retries` fois, sans
+    recommencer le reste du document. Les blocs dont l'empreinte figure dans
+    `cache` reprennent le résultat connu sans être soumis au pool.
+
+    Args:
+        blocks: Blocs extraits, consommés au fil de l'eau
+        transform_block: Adaptation d'un bloc ; doit être picklable pour un pool de processus
+        executor: Pool sur lequel les unités sont transformées
+        max_in_flight: Nombre maximal d'unités soumises et non restituées
+        max_retries: Nouvelles tentatives accordées à chaque unité
+        progress: Appelée à chaque unité terminée, dans l'ordre, avec le nombre
+            d'unités terminées et, dès qu'il est connu, leur nombre total
+        cache: Résultats déjà connus, par empreinte de bloc
+
+    Returns:
+        Iterator[Block]: Les blocs transformés, dans l'ordre du document
+
+    Raises:
+        UnitTransformError: Si une unité échoue après toutes ses tentatives
+    """
+    max_in_flight = max_in_flight or 2 * default_workers()
+    cache = cache or {}
+    pending: Deque[Tuple[List[Block], List[Block], Optional[Future]]] = deque()
+    done = 0
+    submitted = 0
+    total: Optional[int] = None
+
+    def submit(unit: List[Block]) -> Tuple[List[Block], List[Block], Optional[Future]]:
+        missing = [block for block in unit if block.fingerprint not in cache]
+        future = executor.submit(transform_unit, missing, transform_block) if missing else None
+        return unit, missing, future
+
+    def collect(unit: List[Block], missing: List[Block], future: Optional[Future]) -> Iterator[Block]:
+        nonlocal done
+        texts: List[str] = []
+        attempts = 1
+        while future is not None:
+            try:
+                texts = future.result()
+                break
+            except Exception as e:
+                if attempts > max_retries:
+                    raise UnitTransformError(missing, e) from e
+                attempts += 1
+                future = executor.submit(transform_unit, missing, transform_block)
+
+        transformed = iter(texts)
+        for block in unit:
+            text = cache[block.fingerprint] if block.fingerprint in cache else next(transformed)
+            yield replace(block, text=text)
+        done += 1
+        if progress is not None:
+            progress(done, total)
+
+    try:
+        for unit in split_units(blocks):
+            pending.append(submit(unit))
+            submitted += 1
+            while len(pending) >= max_in_flight:
+                yield from collect(*pending.popleft())
+
+        total = submitted
+        while pending:
+            yield from collect(*pending.popleft())
+    finally:
+        for _, _, future in pending:
+            if future is not None:
+                future.cancel()
@@ -0,0 +1,563 @@
+"""
+Rendu des documents transformés en HTML, DOCX et PDF adaptés à la dyslexie.
+
+Chaque format a son moteur de rendu, alimenté bloc par bloc au fil de la
+transformation : le document n'est jamais entièrement en mémoire et chaque
+page est écrite dès qu'elle est complète. Ce qui ne dépend que de la mise
+en forme (feuille de style, styles DOCX, police et son programme compressé,
+découpage syllabique, largeurs des mots) est calculé une fois par processus
+et partagé par tous les documents.
+
+Les formats DOCX et PDF sont écrits directement, sans python-docx ni
+reportlab : python-docx construit tout le document en mémoire avant de
+l'enregistrer et le canevas de reportlab garde le PDF entier jusqu'à sa
+sauvegarde, là où ces moteurs écrivent chaque bloc au fil de la transformation.
+Ils n'utilisent que les éléments nécessaires des deux formats (paragraphes,
+titres, couleurs, une police incorporée).
+"""
+import html
+import re
+from abc import ABC, abstractmethod
+import zipfile
+import zlib
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple, Type
+from xml.sax.saxutils import escape
+
+from .extractors import Block, UnsupportedFormatError
+from .fonts import Font, font_program
+from .layout import RenderStyle, Run, color_runs, line_width, paragraphs, rgb, wrap
+
+# Caractères interdits en XML 1.0, parfois produits par l'extraction (sauts de page...)
+XML_INVALID = re.compile(r"[\x00-\x08\x0b\x0c\x0e-\x1f\ufffe\uffff]")
+
+# Segments déjà balisés, partagés entre les documents : le vocabulaire se répète
+RUN_MEMO_SIZE = 65536
+
+
+class Renderer(ABC):
+    """Rendu d'un document dans un fichier, alimenté bloc par bloc."""
+    suffix = ""
+
+    def __init__(self, destination: Path, style: Optional[RenderStyle] = None):
+        self.destination = destination
+        self.style = style or RenderStyle()
+
+    @abstractmethod
+    def add(self, block: Block) -> None:
+        """Ajoute un bloc à la suite du document."""
+
+    @abstractmethod
+    def close(self) -> None:
+        """Termine le document et ferme son fichier."""
+
+    def __enter__(self) -> "Renderer":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+# --- HTML ---
+
+
+@lru_cache()
+def html_head(style: RenderStyle) -> str:
+    """En-tête et feuille de style HTML d'une mise en forme."""
+    colors = "".join(
+        f"  .s{index} {{ color: {color}; }}\n" for index, color in enumerate(style.syllable_colors)
+    )
+    return (
+        "<!DOCTYPE html>\n"
+        '<html lang="fr">\n<head>\n<meta charset="utf-8">\n'
+        '<meta name="viewport" content="width=device-width, initial-scale=1">\n'
+        "<style>\n"
+        f'  body {{ margin: 0; background: {style.background}; color: {style.text_color}; '
+        f'font-family: "{style.font.family}", "OpenDyslexic", "Lexend", Verdana, sans-serif; '
+        f"font-size: {style.font_size}pt; line-height: {style.line_height}; "
+        f"letter-spacing: {style.letter_spacing}em; word-spacing: {style.word_spacing}em; }}\n"
+        f"  main {{ max-width: {style.max_line_chars}ch; margin: 0 auto; padding: 2em 1em; }}\n"
+        f"  p, h2 {{ margin: 0 0 {style.paragraph_spacing * style.line_height}em; text-align: left; }}\n"
+        f"  h2 {{ font-size: {style.heading_scale}em; }}\n"
+        "  .page + .page { border-top: 1px solid currentColor; padding-top: 1em; }\n"
+        f"{colors}"
+        "</style>\n</head>\n<body>\n<main>\n"
+    )
+
+
+@lru_cache(maxsize=RUN_MEMO_SIZE)
+def html_run(text: str, color: int) -> str:
+    text = html.escape(text, quote=False)
+    return text if color < 0 else f'<span class="s{color}">{text}</span>'
+
+
+def html_runs(runs: List[Run]) -> str:
+    return "".join(html_run(text, color) for text, color in runs)
+
+
+class HtmlRenderer(Renderer):
+    """Page HTML autonome, lisible dans tout navigateur."""
+    suffix = ".html"
+
+    def __init__(self, destination: Path, style: Optional[RenderStyle] = None):
+        super().__init__(destination, style)
+        self._output = destination.open("w", encoding="utf-8")
+        self._output.write(html_head(self.style))
+
+    def add(self, block: Block) -> None:
+        tag = "h2" if block.kind == "heading" else "p"
+        content = "".join(
+            f"<{tag}>{html_runs(color_runs(text, self.style)[0])}</{tag}>\n" for text in paragraphs(block)
+        )
+        if block.kind == "page":
+            content = f'<section class="page" id="page-{block.page}">\n{content}</section>\n'
+        self._output.write(content)
+        self._output.flush()
+
+    def close(self) -> None:
+        if not self._output.closed:
+            self._output.write("</main>\n</body>\n</html>\n")
+            self._output.close()
+
+
+# --- DOCX ---
+
+WORD_NAMESPACE = "http://schemas.openxmlformats.org/wordprocessingml/2006/main"
+XML_DECLARATION = '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+
+DOCX_PARTS = {
+    "[Content_Types].xml": (
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/word/document.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.wordprocessingml.document.main+xml"/>'
+        '<Override PartName="/word/styles.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.wordprocessingml.styles+xml"/>'
+        '<Override PartName="/word/settings.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.wordprocessingml.settings+xml"/>'
+        '</Types>'
+    ),
+    "_rels/.rels": (
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" Target="word/document.xml" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument"/>'
+        '</Relationships>'
+    ),
+    "word/_rels/document.xml.rels": (
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" Target="styles.xml" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/styles"/>'
+        '<Relationship Id="rId2" Target="settings.xml" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/settings"/>'
+        '</Relationships>'
+    ),
+    # Sans ce réglage, Word n'affiche pas la couleur de fond de la page
+    "word/settings.xml": f'<w:settings xmlns:w="{WORD_NAMESPACE}"><w:displayBackgroundShape/></w:settings>',
+}
+
+
+def twips(points: float) -> int:
+    """Vingtièmes de point, l'unité des longueurs WordprocessingML."""
+    return round(points * 20)
+
+
+def hex_color(color: str) -> str:
+    return color.lstrip("#").upper()
+
+
+@lru_cache()
+def docx_styles(style: RenderStyle) -> str:
+    """Styles DOCX d'une mise en forme : police, corps, espacements, titre."""
+    size = style.font_size
+    family = escape(style.font.family)
+    heading = size * style.heading_scale
+    return (
+        f'<w:styles xmlns:w="{WORD_NAMESPACE}">'
+        "<w:docDefaults><w:rPrDefault><w:rPr>"
+        f'<w:rFonts w:ascii="{family}" w:hAnsi="{family}" w:cs="{family}"/>'
+        f'<w:color w:val="{hex_color(style.text_color)}"/>'
+        f'<w:spacing w:val="{twips(style.letter_spacing * size)}"/>'
+        f'<w:sz w:val="{round(size * 2)}"/><w:szCs w:val="{round(size * 2)}"/><w:lang w:val="fr-FR"/>'
+        "</w:rPr></w:rPrDefault><w:pPrDefault><w:pPr>"
+        f'<w:spacing w:after="{twips(style.paragraph_spacing * style.line_height * size)}" '
+        f'w:line="{round(240 * style.line_height)}" w:lineRule="auto"/><w:jc w:val="left"/>'
+        "</w:pPr></w:pPrDefault></w:docDefaults>"
+        '<w:style w:type="paragraph" w:default="1" w:styleId="Normal"><w:name w:val="Normal"/></w:style>'
+        '<w:style w:type="paragraph" w:styleId="Heading1"><w:name w:val="heading 1"/>'
+        '<w:basedOn w:val="Normal"/><w:next w:val="Normal"/>'
+        '<w:pPr><w:keepNext/><w:outlineLvl w:val="0"/></w:pPr>'
+        f'<w:rPr><w:b/><w:sz w:val="{round(heading * 2)}"/><w:szCs w:val="{round(heading * 2)}"/></w:rPr>'
+        "</w:style></w:styles>"
+    )
+
+
+@lru_cache()
+def docx_run_properties(style: RenderStyle) -> Dict[int, str]:
+    """Propriétés de segment par indice de couleur ; -1 pour les séparateurs, élargis."""
+    properties = {
+        index: f'<w:rPr><w:color w:val="{hex_color(color)}"/></w:rPr>'
+        for index, color in enumerate(style.syllable_colors)
+    }
+    # L'espacement des lettres d'un séparateur élargit l'espace entre les mots
+    spacing = (style.letter_spacing + style.word_spacing) * style.font_size
+    properties[-1] = f'<w:rPr><w:spacing w:val="{twips(spacing)}"/></w:rPr>'
+    return properties
+
+
+@lru_cache()
+def docx_section(style: RenderStyle) -> str:
+    """Format de page : les marges ramènent la largeur du texte à la longueur de ligne."""
+    width, height = style.page_size
+    right = width - style.margin - line_width(style)
+    return (
+        f'<w:sectPr><w:pgSz w:w="{twips(width)}" w:h="{twips(height)}"/>'
+        f'<w:pgMar w:top="{twips(style.margin)}" w:right="{twips(right)}" w:bottom="{twips(style.margin)}" '
+        f'w:left="{twips(style.margin)}" w:header="708" w:footer="708" w:gutter="0"/></w:sectPr>'
+    )
+
+
+@lru_cache(maxsize=RUN_MEMO_SIZE)
+def docx_run(properties: str, text: str) -> str:
+    return f'<w:r>{properties}<w:t xml:space="preserve">{escape(XML_INVALID.sub("", text))}</w:t></w:r>'
+
+
+class DocxRenderer(Renderer):
+    """Document Word (WordprocessingML), dont le corps est compressé au fil de l'écriture."""
+    suffix = ".docx"
+
+    def __init__(self, destination: Path, style: Optional[RenderStyle] = None):
+        super().__init__(destination, style)
+        self._properties = docx_run_properties(self.style)
+        self._archive = zipfile.ZipFile(destination, "w", compression=zipfile.ZIP_DEFLATED)
+        for name, content in DOCX_PARTS.items():
+            self._archive.writestr(name, XML_DECLARATION + content)
+        self._archive.writestr("word/styles.xml", XML_DECLARATION + docx_styles(self.style))
+        self._document = self._archive.open("word/document.xml", "w")
+        self._write(
+            XML_DECLARATION + f'<w:document xmlns:w="{WORD_NAMESPACE}">'
+            f'<w:background w:color="{hex_color(self.style.background)}"/><w:body>'
+        )
+        self._pages = 0
+
+    def _write(self, text: str) -> None:
+        self._document.write(text.encode("utf-8"))
+
+    def _runs(self, runs: List[Run]) -> str:
+        return "".join(docx_run(self._properties[color], text) for text, color in runs)
+
+    def add(self, block: Block) -> None:
+        content = []
+        if block.kind == "page":
+            if self._pages:
+                content.append('<w:p><w:r><w:br w:type="page"/></w:r></w:p>')
+            self._pages += 1
+        properties = '<w:pPr><w:pStyle w:val="Heading1"/></w:pPr>' if block.kind == "heading" else ""
+        for text in paragraphs(block):
+            content.append(f"<w:p>{properties}{self._runs(color_runs(text, self.style)[0])}</w:p>")
+        self._write("".join(content))
+
+    def close(self) -> None:
+        if self._archive.fp is None:
+            return
+        self._write(f"{docx_section(self.style)}</w:body></w:document>")
+        self._document.close()
+        self._archive.close()
+
+
+# --- PDF ---
+
+
+def pdf_string(text: str) -> str:
+    """Chaîne littérale PDF."""
+    return "(" + text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)") + ")"
+
+
+class GlyphCodes(dict):
+    """
+    Table de `str.translate` : caractère -> identifiant de glyphe en hexadécimal.
+
+    Remplie à la première rencontre de chaque caractère, elle consigne au
+    passage les glyphes utilisés par le document.
+    """
+
+    def __init__(self, font: Font):
+        super().__init__()
+        self.font = font
+        self.used: Dict[int, str] = {}
+
+    def __missing__(self, code: int) -> str:
+        char = chr(code)
+        glyph = self.font.glyph(char)
+        self.used.setdefault(glyph, char)
+        self[code] = "%04X" % glyph
+        return self[code]
+
+
+class PdfFont:
+    """Police d'un document PDF : ses objets et les glyphes utilisés."""
+
+    def __init__(self, font: Font, resource: str, number: int):
+        self.font = font
+        self.resource = resource
+        self.number = number
+        self._codes = GlyphCodes(font)
+
+    @property
+    def used(self) -> Dict[int, str]:
+        return self._codes.used
+
+    def encode(self, text: str) -> str:
+        """Chaîne hexadécimale d'un texte, en identifiants de glyphes pour une police incorporée."""
+        if not self.font.embedded:
+            return "<" + self.font.encode(text).hex().upper() + ">"
+        return "<" + text.translate(self._codes) + ">"
+
+
+class PdfRenderer(Renderer):
+    """
+    Document PDF écrit page par page, avec la police de rendu incorporée.
+
+    Chaque page est écrite dès qu'elle est pleine ; seuls les objets qui
+    dépendent du document entier (arbre des pages, largeurs et table
+    ToUnicode des glyphes utilisés) sont écrits à la fin.
+    """
+    suffix = ".pdf"
+
+    # Objets réservés : le catalogue et l'arbre des pages, écrits à la fin
+    CATALOG, PAGES = 1, 2
+
+    def __init__(self, destination: Path, style: Optional[RenderStyle] = None):
+        super().__init__(destination, style)
+        self._output = destination.open("wb")
+        self._offsets: Dict[int, int] = {}
+        self._count = self.PAGES
+        self._kids: List[int] = []
+        self._content: List[str] = []
+        self._write(b"%PDF-1.7\n%\xe2\xe3\xcf\xd3\n")
+
+        self._fonts = {
+            "regular": PdfFont(self.style.font, "F1", self._reserve()),
+            "bold": PdfFont(self.style.bold_font, "F2", self._reserve()),
+        }
+        self._descendants: Dict[str, int] = {}
+        for key, pdf_font in self._fonts.items():
+            if pdf_font.font.embedded:
+                self._descendants[key] = self._write_font_program(pdf_font.font)
+
+        # Opérateurs d'affichage déjà produits, par police et segment : le vocabulaire se répète
+        self._shown: Dict[Tuple[str, str], str] = {}
+        self._width, self._height = self.style.page_size
+        self._line_width = line_width(self.style)
+        self._y = 0.0
+
+    # Objets
+
+    def _write(self, data: bytes) -> None:
+        self._output.write(data)
+
+    def _reserve(self) -> int:
+        self._count += 1
+        return self._count
+
+    def _object(self, number: int, body: str) -> None:
+        self._offsets[number] = self._output.tell()
+        self._write(b"%d 0 obj\n%s\nendobj\n" % (number, body.encode("latin-1")))
+
+    def _stream(self, number: int, data: bytes, entries: str = "", compress: bool = True) -> None:
+        if compress:
+            data = zlib.compress(data, 6)
+            entries += " /Filter /FlateDecode"
+        self._offsets[number] = self._output.tell()
+        self._write(b"%d 0 obj\n<< /Length %d%s >>\nstream\n" % (number, len(data), entries.encode("latin-1")))
+        self._write(data)
+        self._write(b"\nendstream\nendobj\n")
+
+    def _write_font_program(self, font: Font) -> int:
+        """Incorpore le programme de la police et son descripteur ; retourne le numéro du descripteur."""
+        program, length = font_program(font.path)
+        program_number, descriptor = self._reserve(), self._reserve()
+        self._stream(program_number, program, f" /Length1 {length} /Filter /FlateDecode", compress=False)
+        bbox = " ".join(str(font.scaled(value)) for value in font.bbox)
+        self._object(descriptor, (
+            f"<< /Type /FontDescriptor /FontName /{font.name} /Flags 32 /FontBBox [{bbox}] "
+            f"/ItalicAngle 0 /Ascent {font.scaled(font.ascent)} /Descent {font.scaled(font.descent)} "
+            f"/CapHeight {font.scaled(font.cap_height)} /StemV {120 if font.bold else 80} "
+            f"/FontFile2 {program_number} 0 R >>"
+        ))
+        return descriptor
+
+    def _write_font(self, key: str) -> None:
+        """Objets de police qui dépendent des glyphes utilisés dans le document."""
+        pdf_font = self._fonts[key]
+        font = pdf_font.font
+        if not font.embedded:
+            self._object(pdf_font.number, (
+                f"<< /Type /Font /Subtype /Type1 /BaseFont /{font.name} /Encoding /WinAnsiEncoding >>"
+            ))
+            return
+
+        glyphs = sorted(pdf_font.used.items())
+        last = len(font.advances) - 1
+        widths = " ".join(f"{glyph} [{font.scaled(font.advances[min(glyph, last)])}]" for glyph, _ in glyphs)
+        cid_font, to_unicode = self._reserve(), self._reserve()
+        self._object(cid_font, (
+            f"<< /Type /Font /Subtype /CIDFontType2 /BaseFont /{font.name} "
+            "/CIDSystemInfo << /Registry (Adobe) /Ordering (Identity) /Supplement 0 >> "
+            f"/FontDescriptor {self._descendants[key]} 0 R /W [{widths}] /CIDToGIDMap /Identity >>"
+        ))
+
+        mapped = [(glyph, char) for glyph, char in glyphs if glyph]
+        chunks = [mapped[start:start + 100] for start in range(0, len(mapped), 100)]
+        cmap = "".join(
+            f"{len(chunk)} beginbfchar\n"
+            + "".join(f"<{glyph:04X}> <{char.encode('utf-16-be').hex().upper()}>\n" for glyph, char in chunk)
+            + "endbfchar\n"
+            for chunk in chunks
+        )
+        self._stream(to_unicode, (
+            "/CIDInit /ProcSet findresource begin\n12 dict begin\nbegincmap\n"
+            "/CIDSystemInfo << /Registry (Adobe) /Ordering (UCS) /Supplement 0 >> def\n"
+            "/CMapName /Adobe-Identity-UCS def\n/CMapType 2 def\n"
+            "1 begincodespacerange\n<0000> <FFFF>\nendcodespacerange\n"
+            f"{cmap}endcmap\nCMapName currentdict /CMap defineresource pop\nend\nend\n"
+        ).encode("ascii"))
+        self._object(pdf_font.number, (
+            f"<< /Type /Font /Subtype /Type0 /BaseFont /{font.name} /Encoding /Identity-H "
+            f"/DescendantFonts [{cid_font} 0 R] /ToUnicode {to_unicode} 0 R >>"
+        ))
+
+    # Pages
+
+    def _new_page(self) -> None:
+        if self._content:
+            self._finish_page()
+        red, green, blue = rgb(self.style.background)
+        self._content = [f"q {red:.3f} {green:.3f} {blue:.3f} rg 0 0 {self._width:.2f} {self._height:.2f} re f Q"]
+        self._y = self._height - self.style.margin
+
+    def _finish_page(self) -> None:
+        content, page = self._reserve(), self._reserve()
+        self._stream(content, "\n".join(self._content).encode("latin-1"))
+        fonts = " ".join(f"/{pdf_font.resource} {pdf_font.number} 0 R" for pdf_font in self._fonts.values())
+        self._object(page, (
+            f"<< /Type /Page /Parent {self.PAGES} 0 R /MediaBox [0 0 {self._width:.2f} {self._height:.2f}] "
+            f"/Resources << /Font << {fonts} >> >> /Contents {content} 0 R >>"
+        ))
+        self._kids.append(page)
+        self._content = []
+        # Page écrite : elle est lisible sur disque avant la fin du document
+        self._output.flush()
+
+    def _show(self, pdf_font: PdfFont, text: str) -> str:
+        """Opérateur d'affichage d'un segment ; les espaces sont élargis de l'espacement des mots."""
+        key = (pdf_font.resource, text)
+        if key in self._shown:
+            return self._shown[key]
+        items = []
+        for index, part in enumerate(text.split(" ")):
+            if index:
+                # Décalage négatif : vers la droite, en millièmes de cadratin
+                items.append(f"{pdf_font.encode(' ')} {-round(self.style.word_spacing * 1000)}")
+            if part:
+                items.append(pdf_font.encode(part))
+        shown = self._shown[key] = f"[{' '.join(items)}] TJ"
+        return shown
+
+    def _colors(self) -> List[str]:
+        return [f"{red:.3f} {green:.3f} {blue:.3f} rg"
+                for red, green, blue in (rgb(color) for color in self.style.syllable_colors)]
+
+    def add(self, block: Block) -> None:
+        style = self.style
+        if not self._content or (block.kind == "page" and len(self._content) > 1):
+            self._new_page()
+
+        pdf_font = self._fonts["bold" if block.kind == "heading" else "regular"]
+        font = pdf_font.font
+        size = style.size_of(block.kind)
+        leading = size * style.line_height
+        ascent = font.ascent * size / font.units_per_em
+        text_color = "{:.3f} {:.3f} {:.3f} rg".format(*rgb(style.text_color))
+        colors = self._colors()
+
+        for text in paragraphs(block):
+            syllable = 0
+            for line in wrap(text, font, size, style, self._line_width):
+                if self._y - leading < style.margin:
+                    self._new_page()
+                baseline = self._y - ascent
+                runs, syllable = color_runs(line, style, syllable)
+                shown = " ".join(
+                    f"{text_color if color < 0 else colors[color]} {self._show(pdf_font, run)}"
+                    for run, color in runs
+                )
+                self._content.append(
+                    f"BT /{pdf_font.resource} {size:.2f} Tf {style.letter_spacing * size:.3f} Tc "
+                    f"1 0 0 1 {style.margin:.2f} {baseline:.2f} Tm {shown} ET"
+                )
+                self._y -= leading
+            self._y -= leading * style.paragraph_spacing
+
+    def close(self) -> None:
+        if self._output.closed:
+            return
+        if not self._kids or self._content:
+            if not self._content:
+                self._new_page()
+            self._finish_page()
+        for key in self._fonts:
+            self._write_font(key)
+        kids = " ".join(f"{kid} 0 R" for kid in self._kids)
+        self._object(self.PAGES, f"<< /Type /Pages /Kids [{kids}] /Count {len(self._kids)} >>")
+        self._object(self.CATALOG, (
+            f"<< /Type /Catalog /Pages {self.PAGES} 0 R /Lang {pdf_string('fr-FR')} "
+            "/ViewerPreferences << /DisplayDocTitle true >> >>"
+        ))
+
+        xref = self._output.tell()
+        self._write(b"xref\n0 %d\n0000000000 65535 f \n" % (self._count + 1))
+        for number in range(1, self._count + 1):
+            self._write(b"%010d 00000 n \n" % self._offsets[number])
+        self._write(b"trailer\n<< /Size %d /Root %d 0 R >>\nstartxref\n%d\n%%%%EOF\n"
+                    % (self._count + 1, self.CATALOG, xref))
+        self._output.close()
+
+
+RENDERERS: Dict[str, Type[Renderer]] = {
+    "html": HtmlRenderer,
+    "docx": DocxRenderer,
+    "pdf": PdfRenderer,
+}
+
+
+def get_renderer(output_format: str) -> Type[Renderer]:
+    """
+    Retourne le moteur de rendu d'un format.
+
+    Raises:
+        UnsupportedFormatError: Si le format n'est pas pris en charge
+    """
+    try:
+        return RENDERERS[output_format.lower()]
+    except KeyError:
+        raise UnsupportedFormatError(f"Rendu .{output_format} non pris en charge")
+
+
+def rendered_path(output: Path, output_format: str) -> Path:
+    """Chemin du rendu d'un document transformé, à côté de sa version texte."""
+    return output.with_suffix(f".{output_format.lower()}")
+
+
+def render_blocks(blocks: Iterable[Block], destination: Path, style: Optional[RenderStyle] = None) -> Path:
+    """
+    Rend des blocs dans le format désigné par l'extension de `destination`.
+
+    Returns:
+        Path: Chemin du document rendu
+    """
+    with get_renderer(destination.suffix[1:])(destination, style) as renderer:
+        for block in blocks:
+            renderer.add(block)
+    return destination
@@ -0,0 +1,84 @@
+"""
+Découpage des mots français en syllabes écrites, pour la coloration syllabique.
+
+Le découpage suit les règles de l'écrit : une consonne seule entre deux
+voyelles commence la syllabe suivante (ta-ble, ca-ba-ne), deux consonnes se
+séparent (par-tir) sauf les groupes inséparables (ta-bleau, é-cran,
+mon-ta-gne). Ces règles sont compilées une fois en une seule expression
+régulière. Un paragraphe est traité d'un bloc : séparé en mots en un seul
+passage, chaque forme de mot n'est découpée qu'une fois, les suivantes
+étant lues dans un mémo borné.
+"""
+import re
+from functools import lru_cache
+from typing import List, Tuple
+
+VOWELS = "aeiouyàâäéèêëîïôöùûüÿœæ"
+
+# Consonnes qui ne se séparent jamais : elles commencent ensemble la syllabe
+INSEPARABLE = {
+    "bl", "br", "cl", "cr", "dr", "fl", "fr", "gl", "gr", "pl", "pr", "tr", "vr",
+    "ch", "ph", "gn", "th",
+}
+
+# Mots, y compris composés et élidés ; le reste (espaces, ponctuation) est conservé tel quel
+WORD = re.compile(r"[^\W\d_]+")
+
+# Formes de mots déjà découpées
+MEMO_SIZE = 65536
+
+
+def compile_rules(vowels: str = VOWELS, inseparable=INSEPARABLE) -> re.Pattern:
+    """
+    Compile les règles de découpage en une expression qui trouve les syllabes
+    d'un mot les unes après les autres.
+
+    Une syllabe est faite de consonnes d'attaque, d'un groupe de voyelles et
+    des consonnes qui ne commencent pas la syllabe suivante : la dernière
+    consonne, ou le dernier groupe inséparable, devant une voyelle. Le u de
+    "qu" et "gu" devant voyelle fait partie de la consonne (quil-le, ba-guet-te).
+    """
+    vowel = f"(?:[{vowels.replace('u', '')}]|(?<![qg])u|u(?![{vowels}]))"
+    consonant = f"(?:[qg]u(?=[{vowels}])|[^\\W\\d_{vowels}])"
+    group = "|".join(sorted(inseparable))
+    return re.compile(
+        f"{consonant}*{vowel}+(?:{consonant}*?(?=(?:{group}|{consonant}){vowel})|{consonant}*)|{consonant}+",
+        re.IGNORECASE
+    )
+
+
+SYLLABLE = compile_rules()
+
+# Le groupe capturant conserve les mots dans le résultat de split : séparateurs
+# aux indices pairs, mots aux indices impairs
+_WORDS = re.compile(f"({WORD.pattern})")
+
+
+@lru_cache(maxsize=MEMO_SIZE)
+def syllabify(word: str) -> Tuple[str, ...]:
+    """
+    Découpe un mot en syllabes écrites.
+
+    Args:
+        word: Mot, sans espace ni ponctuation
+
+    Returns:
+        Tuple[str, ...]: Les syllabes, dont la concaténation redonne le mot
+    """
+    return tuple(SYLLABLE.findall(word))
+
+
+def segment(text: str) -> Tuple[List[str], List[Tuple[str, ...]]]:
+    """
+    Découpe tout un paragraphe en séparateurs et en mots syllabés.
+
+    Args:
+        text: Texte d'un paragraphe
+
+    Returns:
+        Tuple[List[str], List[Tuple[str, ...]]]: Les séparateurs, un de plus
+        que les mots (éventuellement vides), et les syllabes de chaque mot ;
+        le texte est la suite séparateur, mot, séparateur, ..., séparateur
+    """
+    parts = _WORDS.split(text)
+    return parts[0::2], list(map(syllabify, parts[1::2]))
@@ -0,0 +1,114 @@
+"""
+Transformation des documents, bloc par bloc.
+"""
+from concurrent.futures import Executor
+from contextlib import ExitStack
+from dataclasses import replace
+from pathlib import Path
+from typing import Iterable, Iterator, Optional, Sequence
+
+from .extractors import Block, extract_blocks
+from .incremental import BlockCache, manifest_entry, manifest_path, transform_version, with_fingerprints
+from .layout import RenderStyle
+from .parallel import BlockTransform, Progress, split_units, transform_in_parallel
+from .render import Renderer, get_renderer, rendered_path
+
+
+def keep_text(block: Block) -> str:
+    """Adaptation identité, utilisée tant qu'aucune autre n'est branchée."""
+    return block.text
+
+
+def transform_blocks(blocks: Iterable[Block], transform_block: BlockTransform = keep_text,
+                     cache: Optional[BlockCache] = None, progress: Optional[Progress] = None) -> Iterator[Block]:
+    """
+    Applique une adaptation à chaque bloc, au fil de l'extraction, sauf aux blocs déjà connus.
+
+    L'avancement est compté en pages et sections, comme pour `transform_in_parallel`.
+    """
+    cache = cache or {}
+    done = 0
+    for unit in split_units(blocks):
+        for block in unit:
+            text = cache.get(block.fingerprint) if block.fingerprint is not None else None
+            yield replace(block, text=transform_block(block) if text is None else text)
+        done += 1
+        if progress is not None:
+            progress(done, None)
+    if progress is not None:
+        progress(done, done)
+
+
+def write_text(blocks: Iterable[Block], destination: Path, renderers: Sequence[Renderer] = ()) -> Path:
+    """
+    Écrit les blocs dans un fichier texte, au fur et à mesure de leur production.
+
+    Les blocs portant une empreinte sont aussi consignés dans le manifeste
+    écrit à côté du document. Chaque bloc est rendu visible sur disque dès son
+    écriture, pour qu'un lecteur puisse suivre le document en cours, puis
+    transmis aux moteurs de rendu.
+    """
+    with destination.open("w", encoding="utf-8") as output, \
+            manifest_path(destination).open("w", encoding="utf-8") as manifest:
+        for block in blocks:
+            output.write(block.text)
+            output.write("\n\n")
+            output.flush()
+            if block.fingerprint is not None:
+                manifest.write(manifest_entry(block))
+            for renderer in renderers:
+                renderer.add(block)
+    return destination
+
+
+def output_path(filename: str, destination_dir: Path) -> Path:
+    """Chemin du document transformé à partir de son nom d'origine."""
+    return destination_dir / f"{Path(filename).stem}.txt"
+
+
+def transform_document(source: Path, filename: str, destination_dir: Path,
+                       transform_block: Optional[BlockTransform] = None,
+                       executor: Optional[Executor] = None,
+                       progress: Optional[Progress] = None,
+                       cache: Optional[BlockCache] = None,
+                       formats: Iterable[str] = (),
+                       style: Optional[RenderStyle] = None) -> Path:
+    """
+    Extrait, adapte et écrit un document sans le charger entièrement en mémoire.
+
+    Args:
+        source: Chemin du document d'origine
+        filename: Nom d'origine du document, dont l'extension désigne le format
+        destination_dir: Dossier où écrire le document transformé
+        transform_block: Adaptation appliquée à chaque bloc
+        executor: Pool sur lequel transformer les pages et sections en parallèle ;
+            sans pool, les blocs sont transformés un à un
+        progress: Appelée avec le nombre de pages ou sections déjà écrites et,
+            une fois l'extraction terminée, leur nombre total
+        cache: Résultats d'une version précédente du document, par empreinte de
+            bloc ; seuls les blocs absents sont transformés, et seuls les résultats
+            de la même adaptation (voir `transform_version`) sont repris
+        formats: Formats de rendu ("html", "docx", "pdf") produits en même temps
+            que le texte, à côté de lui (voir `rendered_path`)
+        style: Mise en forme des rendus
+
+    Returns:
+        Path: Chemin du document transformé, accompagné de son manifeste et de ses rendus
+
+    Raises:
+        UnsupportedFormatError: Si un format de rendu n'est pas pris en charge
+    """
+    destination = output_path(filename, destination_dir)
+    transform_block = transform_block or keep_text
+    renderer_types = [(get_renderer(output_format), output_format) for output_format in formats]
+    with source.open("rb") as document, ExitStack() as stack:
+        renderers = [
+            stack.enter_context(renderer(rendered_path(destination, output_format), style))
+            for renderer, output_format in renderer_types
+        ]
+        blocks = with_fingerprints(extract_blocks(document, filename), transform_version(transform_block))
+        if executor is not None:
+            blocks = transform_in_parallel(blocks, transform_block, executor, progress=progress, cache=cache)
+        else:
+            blocks = transform_blocks(blocks, transform_block, cache, progress)
+        return write_text(blocks, destination, renderers)
@@ -0,0 +1,7 @@
+-- Déduplication des uploads par empreinte de contenu (SupabaseService.find_by_hash)
+alter table public.temp_files
+    add column if not exists content_hash text;
+
+-- Recherche d'un fichier non expiré de même contenu : content_hash = ... and expires_at > now()
+create index if not exists temp_files_content_hash_expires_at_idx
+    on public.temp_files (content_hash, expires_at);
@@ -0,0 +1,8 @@
+-- Empreintes des blocs du document transformé, pour la re-transformation incrémentale
+alter table public.temp_files
+    add column if not exists block_fingerprints jsonb;
+
+-- Dernière version transformée d'un document du même nom (SupabaseService.find_previous_version)
+create index if not exists temp_files_file_name_processed_at_idx
+    on public.temp_files (file_name, processed_at desc)
+    where status = 'processed';
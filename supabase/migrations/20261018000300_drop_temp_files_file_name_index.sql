@@ -0,0 +1,3 @@
+-- La version précédente d'un document est désignée par son identifiant à l'upload
+-- (SupabaseService.find_previous_version) : la recherche par nom n'est plus utilisée
+drop index if exists public.temp_files_file_name_processed_at_idx;
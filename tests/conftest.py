@@ -1,4 +1,5 @@
-from unittest.mock import Mock, patch
+from io import BytesIO
+from unittest.mock import AsyncMock, Mock, patch
 import asyncio
 
 import pytest
@@ -11,12 +12,14 @@ def mock_file():
     file = Mock(spec=UploadFile)
     file.filename = "test.pdf"
     file.content_type = "application/pdf"
+    file.file = BytesIO(b"%PDF-1.4 test content")
+    file.size = len(b"%PDF-1.4 test content")
     
-    async def async_read():
-        return b"test content"
+    async def async_read(size=-1):
+        return file.file.read(size)
     
     async def async_seek(position):
-        pass
+        file.file.seek(position)
     
     file.read = async_read
     file.seek = async_seek
@@ -25,7 +28,14 @@ def mock_file():
 @pytest.fixture
 def mock_supabase():
     """Fixture pour simuler le client Supabase."""
-    with patch('app.services.supabase_service.create_client') as mock_create:
+    with patch('app.services.supabase_service.AsyncPostgrestClient') as mock_postgrest, \
+        patch('app.services.supabase_service.AsyncStorageClient') as mock_storage:
         mock_client = Mock()
-        mock_create.return_value = mock_client
+        mock_client.storage.session.post = AsyncMock()
+        mock_client.storage.from_().get_public_url = AsyncMock()
+        mock_client.table().select().eq().gt().limit().execute = AsyncMock()
+        mock_client.table().insert().execute = AsyncMock()
+        mock_client.table().update().eq().execute = AsyncMock()
+        mock_postgrest.return_value.from_ = mock_client.table
+        mock_storage.return_value = mock_client.storage
         yield mock_client
@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# llm-service est un service autonome, lancé depuis son propre dossier
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "llm-service"))
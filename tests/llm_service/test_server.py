@@ -0,0 +1,90 @@
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+
+from backends import RuleBasedBackend
+from batcher import DynamicBatcher, QueueFullError
+
+
+class RecordingBackend(RuleBasedBackend):
+    def __init__(self):
+        self.batches = []
+
+    async def simplify(self, texts):
+        self.batches.append(list(texts))
+        return await super().simplify(texts)
+
+
+def test_rule_based_backend_is_deterministic():
+    backend = RuleBasedBackend()
+
+    text = "Lorsque  la pluie tombe ; on reste afin de lire."
+
+    assert backend.simplify_one(text) == "Quand la pluie tombe. On reste pour lire."
+    assert backend.simplify_one(text) == backend.simplify_one(text)
+
+
+async def test_concurrent_requests_are_batched():
+    backend = RecordingBackend()
+    batcher = DynamicBatcher(backend, max_batch_size=4, max_wait=0.05)
+    await batcher.start()
+    try:
+        results = await asyncio.gather(batcher.submit(["a", "b"]), batcher.submit(["c"]), batcher.submit(["d", "e"]))
+    finally:
+        await batcher.stop()
+
+    assert results == [["a", "b"], ["c"], ["d", "e"]]
+    assert backend.batches == [["a", "b", "c", "d"], ["e"]]
+
+
+async def test_full_queue_is_refused():
+    batcher = DynamicBatcher(RuleBasedBackend(), max_queue=2)
+    await batcher.start()
+    await batcher.stop()
+
+    with pytest.raises(QueueFullError):
+        await batcher.submit(["a", "b", "c"])
+
+
+def test_simplify_endpoint():
+    import main
+
+    with TestClient(main.app) as client:
+        assert client.get("/ready").json()["ready"] is True
+
+        response = client.post("/v1/simplify", json={"texts": ["Néanmoins il vient.", "Toutefois non."]})
+
+        assert response.status_code == 200
+        assert response.json() == {"results": ["Mais il vient.", "Mais non."], "model": "rules", "version": "1"}
+
+
+def test_unserved_model_is_refused():
+    import main
+
+    with TestClient(main.app) as client:
+        served = client.post("/v1/simplify", json={"texts": ["Néanmoins."], "model": "rules"})
+        other = client.post("/v1/simplify", json={"texts": ["Néanmoins."], "model": "mistral-small-latest"})
+
+    assert served.status_code == 200
+    assert other.status_code == 422
+
+
+def test_queue_full_returns_429(monkeypatch):
+    import main
+
+    with TestClient(main.app) as client:
+        monkeypatch.setattr(main.batcher, "max_queue", 0)
+        response = client.post("/v1/transform", json={"text": "Bonjour"})
+
+    assert response.status_code == 429
+    assert response.headers["Retry-After"] == "1"
+
+
+def test_not_ready_before_startup():
+    import main
+
+    client = TestClient(main.app)
+
+    assert client.get("/health").status_code == 200
+    assert client.get("/ready").status_code == 503
@@ -0,0 +1,66 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from app.services.file_validator import FileValidator
+from pipeline.batch import JOURNAL_NAME, convert_directory
+
+
+@pytest.fixture
+def executor():
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        yield executor
+
+
+async def test_convert_directory_skips_unchanged_documents(tmp_path, executor, pdf_bytes):
+    source = tmp_path / "cours"
+    (source / "sciences").mkdir(parents=True)
+    (source / "lecture.txt").write_text("Bonjour.\n\nAu revoir.\n", encoding="utf-8")
+    (source / "sciences" / "eau.pdf").write_bytes(pdf_bytes)
+    output = tmp_path / "adapte"
+
+    first = await convert_directory(source, output, FileValidator(), executor, formats=["html"])
+
+    assert (first.converted, first.skipped, first.rejected, first.failed) == (2, 0, 0, 0)
+    assert (output / "lecture.txt").read_text(encoding="utf-8") == "Bonjour.\n\nAu revoir.\n\n"
+    assert (output / "sciences" / "eau.html").exists()
+    assert (output / JOURNAL_NAME).exists()
+
+    (source / "lecture.txt").write_text("Bonjour.\n\nA bientot.\n", encoding="utf-8")
+    second = await convert_directory(source, output, FileValidator(), executor, formats=["html"])
+
+    assert (second.converted, second.skipped) == (1, 1)
+    assert "A bientot." in (output / "lecture.txt").read_text(encoding="utf-8")
+    assert "2 convertis" in first.report()
+
+
+async def test_convert_directory_rejects_invalid_documents(tmp_path, executor):
+    source = tmp_path / "cours"
+    source.mkdir()
+    (source / "fiche.txt").write_text("Une fiche.", encoding="utf-8")
+    (source / "fiche.rtf").write_bytes(b"{\\rtf1 Une fiche.}")
+    (source / "image.png").write_bytes(b"\x89PNG\r\n")
+    (source / "faux.pdf").write_text("Pas un PDF.", encoding="utf-8")
+    # Le dossier de sortie, placé dans le dossier d'origine, n'est pas converti
+    output = source / "adapte"
+
+    summary = await convert_directory(source, output, FileValidator(), executor)
+
+    assert (summary.converted, summary.rejected, summary.failed) == (1, 3, 0)
+    assert [path.name for path in output.iterdir() if path.suffix == ".txt"] == ["fiche.txt"]
+
+
+async def test_convert_directory_renders_newly_requested_formats(tmp_path, executor):
+    source = tmp_path / "cours"
+    source.mkdir()
+    (source / "lecture.txt").write_text("Bonjour.", encoding="utf-8")
+    output = tmp_path / "adapte"
+
+    await convert_directory(source, output, FileValidator(), executor)
+    with_html = await convert_directory(source, output, FileValidator(), executor, formats=["html"])
+    (output / "lecture.html").unlink()
+    after_loss = await convert_directory(source, output, FileValidator(), executor, formats=["html"])
+    unchanged = await convert_directory(source, output, FileValidator(), executor, formats=["html"])
+
+    assert (with_html.converted, after_loss.converted, unchanged.skipped) == (1, 1, 1)
+    assert (output / "lecture.html").exists()
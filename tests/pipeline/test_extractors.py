@@ -0,0 +1,67 @@
+import io
+
+import pytest
+
+from pipeline.extractors import READ_SIZE, UnsupportedFormatError, extract_blocks
+
+from .conftest import make_docx, make_odt
+
+
+def test_extract_txt_paragraphs():
+    source = io.BytesIO("Le chat dort.\nIl rêve.\n\n\nLa souris danse.\n".encode("utf-8"))
+
+    blocks = list(extract_blocks(source, "fiche.txt"))
+
+    assert [b.text for b in blocks] == ["Le chat dort. Il rêve.", "La souris danse."]
+    assert [b.index for b in blocks] == [0, 1]
+
+def test_extract_txt_cp1252_fallback():
+    source = io.BytesIO("Élève appliqué.".encode("cp1252"))
+
+    assert [b.text for b in extract_blocks(source, "fiche.txt")] == ["Élève appliqué."]
+
+def test_extract_pdf_yields_pages_lazily(pdf_bytes):
+    blocks = extract_blocks(io.BytesIO(pdf_bytes), "cours.pdf")
+
+    first = next(blocks)
+    assert first.page == 1 and first.kind == "page"
+    assert "Premiere page" in first.text
+    assert [b.page for b in blocks] == [2, 3]
+
+def test_extract_docx_paragraphs():
+    source = io.BytesIO(make_docx(["Consigne", "", "Réponds aux questions."]))
+
+    assert [b.text for b in extract_blocks(source, "fiche.docx")] == ["Consigne", "Réponds aux questions."]
+
+def test_extract_odt_headings_and_paragraphs():
+    source = io.BytesIO(make_odt(["Un paragraphe."], heading="Titre"))
+
+    blocks = list(extract_blocks(source, "fiche.odt"))
+
+    assert [(b.kind, b.text) for b in blocks] == [("heading", "Titre"), ("paragraph", "Un paragraphe.")]
+
+def test_extract_rtf_skips_tables_and_decodes():
+    rtf = (
+        rb"{\rtf1\ansi\ansicpg1252{\fonttbl{\f0 Arial;}}{\colortbl;\red0\green0\blue0;}"
+        rb"{\*\generator Test;}\f0 L'\'e9l\'e8ve lit.\par"
+        b"\n"
+        rb"Caf\u233\'e9 cr\u232?me\par}"
+    )
+
+    blocks = list(extract_blocks(io.BytesIO(rtf), "fiche.rtf"))
+
+    assert [b.text for b in blocks] == ["L'élève lit.", "Café crème"]
+
+def test_extract_rtf_across_read_boundaries():
+    paragraph = rb"Une phrase assez longue pour remplir les morceaux.\par" + b"\n"
+    count = READ_SIZE // len(paragraph) * 3
+    rtf = rb"{\rtf1\ansi " + paragraph * count + b"}"
+
+    blocks = list(extract_blocks(io.BytesIO(rtf), "long.rtf"))
+
+    assert len(blocks) == count
+    assert all(b.text == "Une phrase assez longue pour remplir les morceaux." for b in blocks)
+
+def test_unsupported_extension():
+    with pytest.raises(UnsupportedFormatError):
+        extract_blocks(io.BytesIO(b""), "image.png")
@@ -0,0 +1,89 @@
+import random
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import pytest
+
+from pipeline.extractors import Block
+from pipeline.parallel import UnitTransformError, split_units, transform_in_parallel
+from pipeline.transform import transform_document
+
+
+def shout(block):
+    return block.text.upper()
+
+
+def pages(count):
+    return [Block(index=i, text=f"page {i}", page=i + 1, kind="page") for i in range(count)]
+
+
+def test_split_units_keeps_pages_and_groups_paragraphs():
+    blocks = [
+        Block(index=0, text="a" * 6),
+        Block(index=1, text="b" * 6),
+        Block(index=2, text="c" * 6),
+        Block(index=3, text="page", page=1, kind="page"),
+    ]
+
+    units = list(split_units(blocks, section_size=10))
+
+    assert [[block.index for block in unit] for unit in units] == [[0, 1], [2], [3]]
+
+
+def test_units_are_reassembled_in_order():
+    def slow_shout(block):
+        time.sleep(random.uniform(0, 0.01))
+        return shout(block)
+
+    done = []
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        result = list(transform_in_parallel(pages(30), slow_shout, executor, max_in_flight=8,
+                                           progress=lambda count, total: done.append((count, total))))
+
+    assert [block.text for block in result] == [f"PAGE {i}" for i in range(30)]
+    assert [block.page for block in result] == list(range(1, 31))
+    assert [count for count, _ in done] == list(range(1, 31))
+    # Le total est connu une fois toutes les pages extraites
+    assert done[-1] == (30, 30) and done[0] == (1, None)
+
+
+def test_failed_unit_is_retried_alone():
+    calls = {}
+    lock = threading.Lock()
+
+    def flaky(block):
+        with lock:
+            calls[block.index] = calls.get(block.index, 0) + 1
+        if block.index == 2 and calls[block.index] == 1:
+            raise RuntimeError("panne passagère")
+        return shout(block)
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        result = list(transform_in_parallel(pages(4), flaky, executor))
+
+    assert [block.text for block in result] == ["PAGE 0", "PAGE 1", "PAGE 2", "PAGE 3"]
+    assert calls == {0: 1, 1: 1, 2: 2, 3: 1}
+
+
+def test_unit_failing_every_attempt_raises():
+    def broken(block):
+        if block.index == 1:
+            raise RuntimeError("illisible")
+        return block.text
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        with pytest.raises(UnitTransformError, match="page 2"):
+            list(transform_in_parallel(pages(3), broken, executor, max_retries=1))
+
+
+def test_transform_document_on_process_pool(tmp_path, pdf_bytes):
+    source = tmp_path / "source.pdf"
+    source.write_bytes(pdf_bytes)
+    output_dir = tmp_path / "output"
+    output_dir.mkdir()
+
+    with ProcessPoolExecutor(max_workers=2) as executor:
+        output = transform_document(source, "cours.pdf", output_dir, shout, executor=executor)
+
+    assert output.read_text(encoding="utf-8").split("\n\n")[:3] == ["PREMIERE PAGE", "DEUXIEME PAGE", "TROISIEME PAGE"]
@@ -0,0 +1,111 @@
+import zipfile
+from unittest.mock import patch
+
+import pytest
+
+from pipeline.extractors import Block, extract_docx, extract_pdf
+from pipeline.fonts import BuiltinFont, get_font
+from pipeline.layout import RenderStyle, color_runs, wrap
+from pipeline.render import PdfRenderer, Renderer, render_blocks
+from pipeline.transform import transform_document
+
+TEXT = "Le petit chat dort sur la table de la cuisine. Il rêve d'une souris très rapide."
+
+BLOCKS = [Block(index=0, text="Chapitre un", kind="heading")] + [
+    Block(index=i, text=f"{TEXT} {TEXT}\n\n{TEXT}") for i in range(1, 40)
+]
+
+
+def normalized(text):
+    return " ".join(text.split())
+
+
+def test_color_runs_alternate_syllables():
+    runs, following = color_runs("la table", RenderStyle())
+
+    assert runs == [("la", 0), (" ", -1), ("ta", 1), ("ble", 0)]
+    assert following == 3
+    assert color_runs("la table", RenderStyle(color_syllables=False))[0] == [("la table", -1)]
+
+
+def test_wrap_respects_line_width():
+    style = RenderStyle()
+    font = style.font
+    lines = wrap(TEXT * 3, font, style.font_size, style, 300)
+
+    assert len(lines) > 1
+    assert " ".join(lines) == TEXT * 3
+    assert all(font.width(line, style.font_size, style.letter_spacing * style.font_size) <= 300 + style.font_size
+               for line in lines if " " in line)
+
+
+def test_docx_round_trip(tmp_path):
+    output = render_blocks(BLOCKS, tmp_path / "cours.docx")
+
+    with zipfile.ZipFile(output) as archive:
+        assert "word/styles.xml" in archive.namelist()
+        assert 'w:color w:val="1F4E9C"' in archive.read("word/document.xml").decode()
+    with output.open("rb") as source:
+        paragraphs = [block.text for block in extract_docx(source)]
+    assert paragraphs[:3] == ["Chapitre un", f"{TEXT} {TEXT}", TEXT]
+
+
+def test_html_is_escaped_and_colored(tmp_path):
+    output = render_blocks([Block(index=0, text="1 < 2 & la table")], tmp_path / "cours.html")
+
+    content = output.read_text(encoding="utf-8")
+    assert "1 &lt; 2 &amp; " in content
+    assert '<span class="s1">ta</span>' in content
+    assert content.rstrip().endswith("</html>")
+
+
+@pytest.mark.parametrize("builtin", [False, True])
+def test_pdf_round_trip(tmp_path, builtin):
+    style = RenderStyle()
+    if builtin:
+        with patch("pipeline.layout.get_font", lambda path=None, bold=False: BuiltinFont("Courier", bold=bold)):
+            output = render_blocks(BLOCKS, tmp_path / "cours.pdf", style)
+    elif not get_font().embedded:
+        pytest.skip("Aucune police TrueType installée")
+    else:
+        output = render_blocks(BLOCKS, tmp_path / "cours.pdf", style)
+
+    with output.open("rb") as source:
+        pages = [block.text for block in extract_pdf(source)]
+    assert len(pages) > 1
+    assert normalized(" ".join(pages)).startswith(f"Chapitre un {TEXT} {TEXT} {TEXT}")
+
+
+def test_pdf_pages_are_written_as_they_fill(tmp_path):
+    destination = tmp_path / "cours.pdf"
+    renderer = PdfRenderer(destination)
+    try:
+        for block in BLOCKS:
+            renderer.add(block)
+        assert b"/Type /Page " in destination.read_bytes()
+    finally:
+        renderer.close()
+    assert destination.read_bytes().endswith(b"%%EOF\n")
+
+
+def test_transform_document_renders_formats(tmp_path):
+    source = tmp_path / "source.txt"
+    source.write_text(f"{TEXT}\n\nAu revoir.\n", encoding="utf-8")
+    output_dir = tmp_path / "output"
+    output_dir.mkdir()
+
+    output = transform_document(source, "fiche.txt", output_dir, formats=["html", "docx"])
+
+    assert output.name == "fiche.txt"
+    assert '<span class="s1">re</span>' in (output_dir / "fiche.html").read_text(encoding="utf-8")
+    with (output_dir / "fiche.docx").open("rb") as docx:
+        assert [block.text for block in extract_docx(docx)] == [TEXT, "Au revoir."]
+
+
+def test_renderer_requires_add_and_close(tmp_path):
+    class Incomplete(Renderer):
+        def add(self, block):
+            pass
+
+    with pytest.raises(TypeError):
+        Incomplete(tmp_path / "document.txt")
@@ -0,0 +1,34 @@
+import pytest
+
+from pipeline.syllables import segment, syllabify
+
+
+@pytest.mark.parametrize("word, syllables", [
+    ("table", ("ta", "ble")),
+    ("partir", ("par", "tir")),
+    ("montagne", ("mon", "ta", "gne")),
+    ("écran", ("é", "cran")),
+    ("chocolat", ("cho", "co", "lat")),
+    ("quille", ("quil", "le")),
+    ("Lapin", ("La", "pin")),
+    ("baguette", ("ba", "guet", "te")),
+    ("ÉCOLE", ("É", "CO", "LE")),
+])
+def test_syllabify(word, syllables):
+    assert syllabify(word) == syllables
+
+
+def test_segment_keeps_separators():
+    separators, words = segment("L'école, 2 fois.")
+
+    assert separators == ["", "'", ", 2 ", "."]
+    assert words == [("L",), ("é", "co", "le"), ("fois",)]
+
+
+def test_segment_memoizes_word_forms():
+    syllabify.cache_clear()
+
+    segment("le chat et le chien et le chat")
+
+    info = syllabify.cache_info()
+    assert (info.misses, info.hits) == (4, 4)
@@ -0,0 +1,65 @@
+from pipeline.incremental import manifest_path, read_fingerprints, read_manifest, transform_version
+from pipeline.transform import transform_document
+
+
+def shout(block):
+    return block.text.upper()
+
+
+def test_transform_document_writes_blocks(tmp_path, pdf_bytes):
+    source = tmp_path / "source.pdf"
+    source.write_bytes(pdf_bytes)
+    output_dir = tmp_path / "output"
+    output_dir.mkdir()
+
+    output = transform_document(source, "cours.pdf", output_dir, lambda block: block.text.upper())
+
+    assert output.name == "cours.txt"
+    assert output.read_text(encoding="utf-8").split("\n\n")[:3] == ["PREMIERE PAGE", "DEUXIEME PAGE", "TROISIEME PAGE"]
+
+
+class Recording:
+    """Adaptation identité qui consigne les blocs reçus."""
+
+    def __init__(self, version="identite-1"):
+        self.seen = []
+        self._version = version
+
+    def __call__(self, block):
+        self.seen.append(block.text)
+        return block.text.upper()
+
+    def version(self):
+        return self._version
+
+
+def test_unchanged_blocks_reuse_previous_results(tmp_path):
+    output_dir = tmp_path / "output"
+    output_dir.mkdir()
+    first = tmp_path / "v1.txt"
+    first.write_text("Bonjour.\n\nAu revoir.\n", encoding="utf-8")
+    previous = read_manifest(manifest_path(transform_document(first, "fiche.txt", output_dir, Recording())))
+
+    second = tmp_path / "v2.txt"
+    second.write_text("Bonjour.\n\nA bientot.\n", encoding="utf-8")
+    transform_block = Recording()
+    output = transform_document(second, "fiche.txt", output_dir, transform_block, cache=previous)
+
+    assert transform_block.seen == ["A bientot."]
+    assert output.read_text(encoding="utf-8") == "BONJOUR.\n\nA BIENTOT.\n\n"
+    assert len(read_fingerprints(manifest_path(output))) == 2
+
+
+def test_results_of_another_transform_version_are_not_reused(tmp_path):
+    output_dir = tmp_path / "output"
+    output_dir.mkdir()
+    source = tmp_path / "v1.txt"
+    source.write_text("Bonjour.\n", encoding="utf-8")
+    previous = read_manifest(manifest_path(transform_document(source, "fiche.txt", output_dir, Recording())))
+
+    transform_block = Recording(version="identite-2")
+    transform_document(source, "fiche.txt", output_dir, transform_block, cache=previous)
+
+    assert transform_block.seen == ["Bonjour."]
+    # Sans méthode version(), le nom qualifié de l'adaptation en tient lieu
+    assert transform_version(shout) == f"{__name__}.shout"
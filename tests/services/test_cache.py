@@ -0,0 +1,39 @@
+from app.services.cache import TTLCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+def test_lru_eviction():
+    cache = TTLCache(maxsize=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+
+    assert cache.get("a") == 1
+    assert cache.get("b") is None
+    assert len(cache) == 2
+
+def test_entry_ttl_is_capped():
+    clock = FakeClock()
+    cache = TTLCache(maxsize=10, ttl=60, clock=clock)
+    cache.set("short", 1, ttl=5)
+    cache.set("long", 2, ttl=3600)
+
+    clock.now = 10
+    assert cache.get("short") is None
+    assert cache.get("long") == 2
+
+    clock.now = 61
+    assert cache.get("long") is None
+
+def test_non_positive_ttl_is_not_stored():
+    cache = TTLCache()
+    cache.set("expired", 1, ttl=-1)
+
+    assert cache.get("expired") is None
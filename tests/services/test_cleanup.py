@@ -0,0 +1,73 @@
+from unittest.mock import AsyncMock
+
+from app.services.cleanup import ExpiredFileSweeper
+from app.services.metrics import SWEEPER_ERRORS, SWEEPER_ROWS_DELETED
+from app.services.supabase_service import SupabaseService
+
+
+def expired(i, transformed=True):
+    return {
+        "id": i,
+        "content_hash": f"hash{i}",
+        "original_file_path": f"hash{i}.pdf",
+        "transformed_file_path": f"transformed/{i}.txt" if transformed else None,
+    }
+
+
+def counted(counter):
+    return sum(float(sample.split()[-1]) for sample in counter.samples())
+
+
+def make_service(rows):
+    service = AsyncMock(spec=SupabaseService)
+
+    async def list_expired(limit, after=None):
+        remaining = [row for row in rows if after is None or row["id"] > after]
+        return remaining[:limit]
+
+    service.list_expired.side_effect = list_expired
+    service.referenced_paths.return_value = set()
+    service.remove_objects.side_effect = lambda paths: len(paths)
+    service.delete_records.side_effect = lambda ids: len(ids)
+    return service
+
+
+async def test_sweep_deletes_in_pages_and_batches():
+    service = make_service([expired(i) for i in range(1, 8)])
+    sweeper = ExpiredFileSweeper(service, page_size=4, batch_size=2, pause=0)
+
+    stats = await sweeper.sweep()
+
+    assert [call.args for call in service.list_expired.await_args_list] == [(4, None), (4, 4)]
+    assert [call.args[0] for call in service.delete_records.await_args_list] == [[1, 2], [3, 4], [5, 6], [7]]
+    assert service.remove_objects.await_args_list[0].args[0] == [
+        "hash1.pdf", "hash2.pdf", "transformed/1.txt", "transformed/1.jsonl", "transformed/2.txt", "transformed/2.jsonl"
+    ]
+    assert stats.runs == 1
+    assert stats.rows_deleted == 7
+    assert stats.objects_deleted == 21
+
+
+async def test_objects_shared_with_live_files_are_kept():
+    service = make_service([expired(1, transformed=False), expired(2, transformed=False)])
+    service.referenced_paths.return_value = {"hash1.pdf"}
+    sweeper = ExpiredFileSweeper(service, pause=0)
+
+    await sweeper.sweep()
+
+    service.remove_objects.assert_awaited_once_with(["hash2.pdf"])
+    service.delete_records.assert_awaited_once_with([1, 2])
+
+
+async def test_failed_batch_does_not_stop_the_sweep():
+    service = make_service([expired(i, transformed=False) for i in range(1, 5)])
+    service.delete_records.side_effect = [RuntimeError("indisponible"), 2]
+    sweeper = ExpiredFileSweeper(service, batch_size=2, concurrency=1, pause=0)
+    errors, rows = counted(SWEEPER_ERRORS), counted(SWEEPER_ROWS_DELETED)
+
+    stats = await sweeper.sweep()
+
+    assert stats.errors == 1
+    assert stats.rows_deleted == 2
+    assert counted(SWEEPER_ERRORS) - errors == 1
+    assert counted(SWEEPER_ROWS_DELETED) - rows == 2
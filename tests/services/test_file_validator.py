@@ -0,0 +1,97 @@
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+from app.services.file_validator import CHUNK_SIZE, FileRejectedError, FileValidator
+
+
+@pytest.fixture
+def file_validator():
+    return FileValidator()
+
+def test_open_stream_rejects_extension(file_validator):
+    with pytest.raises(FileRejectedError) as exc_info:
+        file_validator.open_stream("test.exe")
+
+    assert exc_info.value.status_code == 400
+
+async def test_stream_rejects_oversize_early(file_validator):
+    stream = file_validator.open_stream("test.txt", max_size=CHUNK_SIZE)
+    await stream.feed(b"a" * CHUNK_SIZE)
+
+    with pytest.raises(FileRejectedError) as exc_info:
+        await stream.feed(b"a")
+
+    assert exc_info.value.status_code == 413
+
+async def test_stream_detects_signature_across_chunks(file_validator):
+    stream = file_validator.open_stream("test.txt")
+    await stream.feed(b"hello <?p")
+
+    with pytest.raises(FileRejectedError) as exc_info:
+        await stream.feed(b"hp echo 1;")
+
+    assert exc_info.value.result.error_message == "Le fichier semble malveillant"
+    assert exc_info.value.result.matched_signature == "php_code"
+
+async def test_stream_sniffs_mime_on_first_chunk(file_validator):
+    stream = file_validator.open_stream("test.pdf")
+    await stream.feed(b"%PDF-1.4\n")
+    await stream.feed(b"rest of the document")
+
+    result = await stream.result()
+    assert result.is_valid
+    assert result.mime_type == "application/pdf"
+
+async def test_validate_file_reads_in_chunks(file_validator, mock_file):
+    result = await file_validator.validate_file(mock_file)
+
+    assert result.is_valid
+    assert mock_file.file.tell() == 0
+
+async def test_sniff_runs_in_executor(file_validator):
+    mime_type = await file_validator.sniff(b"%PDF-1.4\n")
+
+    assert mime_type == "application/pdf"
+    assert "magic" not in vars(file_validator._local)
+
+async def test_stream_rejects_content_not_matching_extension(file_validator):
+    stream = file_validator.open_stream("test.pdf")
+
+    with pytest.raises(FileRejectedError) as exc_info:
+        await stream.feed(b"un simple texte")
+
+    assert exc_info.value.result.error_message == "L'extension du fichier ne correspond pas à son contenu"
+    assert exc_info.value.result.mime_type == "text/plain"
+
+@pytest.mark.parametrize("head, mime_type", [
+    (b"%PDF-1.7\n", "application/pdf"),
+    (b"{\\rtf1\\ansi", "text/rtf"),
+    (b"PK\x03\x04" + bytes(26) + b"mimetypeapplication/vnd.oasis.opendocument.text", "application/vnd.oasis.opendocument.text"),
+    ("Été".encode("utf-8")[:2], "text/plain"),
+    (b"PK\x03\x04" + bytes(26) + b"[Content_Types].xml", None),
+    (b"\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1", None),
+])
+def test_detect_head_uses_rule_table(file_validator, head, mime_type):
+    assert file_validator.detect_head(head) == mime_type
+
+async def test_detect_falls_back_to_libmagic(file_validator):
+    with patch.object(file_validator, "sniff", AsyncMock(return_value="application/msword")) as sniff:
+        assert await file_validator.detect(b"%PDF-1.4\n") == "application/pdf"
+        sniff.assert_not_called()
+
+        assert await file_validator.detect(b"\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1") == "application/msword"
+        sniff.assert_awaited_once()
+
+async def test_validate_path(file_validator, tmp_path):
+    document = tmp_path / "cours.txt"
+    document.write_bytes(b"Le chat dort.\n" * 10000)
+    malicious = tmp_path / "page.txt"
+    malicious.write_bytes(b"a" * CHUNK_SIZE + b"<?php echo 1;")
+
+    result = await file_validator.validate_path(document)
+    assert result.is_valid
+    assert result.mime_type == "text/plain"
+    assert result.file_path == document
+
+    assert (await file_validator.validate_path(malicious)).matched_signature == "php_code"
@@ -0,0 +1,153 @@
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import pytest
+
+from app.services.job_queue import JobQueue, JobStatus
+
+
+async def wait_finished(queue, job, timeout=2.0):
+    async def poll():
+        while not queue.get(job.id).is_finished:
+            await asyncio.sleep(0.01)
+    await asyncio.wait_for(poll(), timeout)
+    return queue.get(job.id)
+
+@pytest.fixture
+async def make_queue():
+    queues = []
+
+    async def factory(handler, **kwargs):
+        queue = JobQueue(handler, backoff=0.01, **kwargs)
+        await queue.start()
+        queues.append(queue)
+        return queue
+
+    yield factory
+    for queue in queues:
+        await queue.stop()
+
+async def test_job_succeeds(make_queue):
+    async def handler(job):
+        return f"transformed/{job.file_id}.pdf"
+
+    queue = await make_queue(handler)
+    job = await wait_finished(queue, queue.submit("123"))
+
+    assert job.status == JobStatus.SUCCEEDED
+    assert job.result == "transformed/123.pdf"
+    assert job.attempts == 1
+
+async def test_job_retried_then_succeeds(make_queue):
+    calls = []
+
+    async def handler(job):
+        calls.append(job.attempts)
+        if len(calls) < 3:
+            raise RuntimeError("storage indisponible")
+        return "ok"
+
+    queue = await make_queue(handler, max_retries=3)
+    job = await wait_finished(queue, queue.submit("123"))
+
+    assert job.status == JobStatus.SUCCEEDED
+    assert calls == [1, 2, 3]
+
+async def test_job_fails_after_timeouts(make_queue):
+    failed = []
+
+    async def handler(job):
+        await asyncio.sleep(1)
+
+    async def on_failure(job):
+        failed.append(job.id)
+
+    queue = await make_queue(handler, max_retries=1, timeout=0.05, on_failure=on_failure)
+    job = await wait_finished(queue, queue.submit("123"))
+
+    assert job.status == JobStatus.FAILED
+    assert job.attempts == 2
+    assert job.error == "Délai dépassé"
+    assert failed == [job.id]
+
+def slow_in_pool(file_id, payload):
+    with payload["lock"]:
+        payload["running"].append(file_id)
+        payload["peak"] = max(payload["peak"], len(payload["running"]))
+    time.sleep(0.2)
+    with payload["lock"]:
+        payload["running"].remove(file_id)
+
+async def test_timed_out_pool_call_ends_before_retry(make_queue):
+    payload = {"lock": threading.Lock(), "running": [], "peak": 0}
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        queue = await make_queue(slow_in_pool, executor=executor, max_retries=1, timeout=0.05)
+        job = await wait_finished(queue, queue.submit("123", payload))
+
+    # Chaque tentative a attendu la fin de la précédente, encore en cours dans le pool
+    assert job.status == JobStatus.FAILED
+    assert job.attempts == 2
+    assert payload["peak"] == 1
+
+async def test_concurrency_is_bounded(make_queue):
+    running = 0
+    peak = 0
+
+    async def handler(job):
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.02)
+        running -= 1
+
+    queue = await make_queue(handler, concurrency=2)
+    jobs = [queue.submit(str(i)) for i in range(6)]
+    for job in jobs:
+        await wait_finished(queue, job)
+
+    assert peak == 2
+
+async def test_submit_reuses_active_job_for_same_file():
+    queue = JobQueue(lambda job: None)
+
+    first = queue.submit("123")
+    second = queue.submit("123")
+
+    assert first is second
+    assert queue.depth == 1
+
+async def test_active_counts_running_jobs(make_queue):
+    release = asyncio.Event()
+    started = asyncio.Event()
+
+    async def handler(job):
+        started.set()
+        await release.wait()
+
+    queue = await make_queue(handler, concurrency=1)
+    first = queue.submit("1")
+    queue.submit("2")
+    await asyncio.wait_for(started.wait(), 2)
+
+    # Une tâche en cours, une en attente
+    assert queue.depth == 1
+    assert queue.active == 2
+
+    release.set()
+    await wait_finished(queue, first)
+
+def transform_in_worker(file_id, payload):
+    return file_id, payload["file_name"], os.getpid()
+
+async def test_handler_runs_in_process_pool(make_queue):
+    with ProcessPoolExecutor(max_workers=1) as executor:
+        queue = await make_queue(transform_in_worker, executor=executor)
+        job = await wait_finished(queue, queue.submit("123", {"file_name": "fiche.pdf"}), timeout=30)
+
+    assert job.status == JobStatus.SUCCEEDED
+    file_id, file_name, pid = job.result
+    assert (file_id, file_name) == ("123", "fiche.pdf")
+    assert pid != os.getpid()
@@ -0,0 +1,142 @@
+import asyncio
+import json
+import pickle
+from concurrent.futures import ThreadPoolExecutor
+
+import httpx
+import pytest
+
+from app.services.llm_client import HTTPBackend, LLMClient, LLMTransform, LocalBackend, PromptCache
+from pipeline.parallel import SECTION_SIZE
+from pipeline.transform import transform_document
+
+
+@pytest.fixture
+def backend():
+    return LocalBackend()
+
+
+async def test_concurrent_requests_share_one_batch(backend):
+    client = LLMClient(backend, max_batch_size=16, max_wait=0.01)
+
+    results = await client.simplify_many(["Un  texte.", "Un autre texte.", "Un dernier."])
+
+    assert results == ["Un texte.", "Un autre texte.", "Un dernier."]
+    assert backend.calls == [["Un texte.", "Un autre texte.", "Un dernier."]]
+
+
+async def test_batch_is_sent_when_full(backend):
+    client = LLMClient(backend, max_batch_size=2, max_wait=10)
+
+    await asyncio.wait_for(client.simplify_many(["a", "b", "c", "d"]), timeout=1)
+
+    assert backend.calls == [["a", "b"], ["c", "d"]]
+
+
+async def test_identical_prompts_are_coalesced(backend):
+    client = LLMClient(backend, max_wait=0.01)
+
+    results = await client.simplify_many(["Même texte", "Même  texte ", "Même texte"])
+
+    assert results == ["Même texte"] * 3
+    assert backend.calls == [["Même texte"]]
+
+
+async def test_results_are_cached_across_clients(tmp_path, backend):
+    path = tmp_path / "llm.sqlite3"
+    first = LLMClient(backend, PromptCache(path), max_wait=0.001)
+    await first.simplify("Phrase à simplifier.")
+    await first.close()
+
+    second = LLMClient(backend, PromptCache(path), max_wait=0.001)
+    assert await second.simplify("Phrase  à simplifier.") == "Phrase à simplifier."
+    assert len(backend.calls) == 1
+
+    # Une autre version du modèle ne réutilise pas les résultats
+    backend.version = "2"
+    await second.simplify("Phrase à simplifier.")
+    assert len(backend.calls) == 2
+
+
+async def test_cache_is_keyed_on_the_model_the_service_reports():
+    served = {"model": "rules", "version": "1"}
+    calls = []
+
+    def handle(request):
+        if request.url.path == "/ready":
+            return httpx.Response(200, json={"ready": True, "backend": served["model"], "version": served["version"]})
+        texts = json.loads(request.content)["texts"]
+        calls.append(texts)
+        return httpx.Response(200, json={"results": [text.upper() for text in texts], **served})
+
+    # Le modèle configuré côté client n'entre pas dans la clé
+    backend = HTTPBackend("http://llm-service")
+    backend._client = httpx.AsyncClient(base_url="http://llm-service", transport=httpx.MockTransport(handle))
+    cache = PromptCache()
+    client = LLMClient(backend, cache, max_wait=0.001)
+
+    assert await client.simplify("texte") == "TEXTE"
+    assert await cache.get_many([PromptCache.key("texte", "rules", "1")]) != {}
+
+    # Service redéployé avec un autre modèle : les résultats suivent le modèle annoncé
+    served.update(model="mistral", version="mistral-small-latest")
+    await client.simplify("autre")
+    assert await cache.get_many([PromptCache.key("autre", "mistral", "mistral-small-latest")]) != {}
+    await client.simplify("texte")
+    assert calls == [["texte"], ["autre"], ["texte"]]
+    await client.close()
+
+
+async def test_backend_error_fails_the_whole_batch(backend):
+    async def broken(texts):
+        raise RuntimeError("modèle indisponible")
+
+    backend.simplify = broken
+    client = LLMClient(backend, max_wait=0.001)
+
+    results = await asyncio.gather(client.simplify("a"), client.simplify("b"), return_exceptions=True)
+
+    assert all(isinstance(result, RuntimeError) for result in results)
+    assert client._inflight == {}
+
+
+async def test_cancelled_batch_cancels_its_requests(backend):
+    started = asyncio.Event()
+
+    async def stalled(texts):
+        started.set()
+        await asyncio.sleep(60)
+
+    backend.simplify = stalled
+    client = LLMClient(backend, max_wait=0.001)
+    requests = [asyncio.create_task(client.simplify(text)) for text in ("a", "b")]
+    await started.wait()
+
+    for batch in list(client._batches):
+        batch.cancel()
+    results = await asyncio.gather(*requests, return_exceptions=True)
+
+    assert all(isinstance(result, asyncio.CancelledError) for result in results)
+    assert client._inflight == {}
+
+
+LOCAL = LocalBackend()
+
+
+def local_client():
+    return LLMClient(LOCAL, max_wait=0.05)
+
+
+def test_llm_transform_batches_the_units_of_a_document(tmp_path):
+    # Un paragraphe plus long qu'une section : chaque paragraphe forme une unité
+    paragraphs = [f"Paragraphe {i} :  " + "mot " * (SECTION_SIZE // 4) for i in range(4)]
+    source = tmp_path / "source.txt"
+    source.write_text("\n\n".join(paragraphs), encoding="utf-8")
+    transform_block = pickle.loads(pickle.dumps(LLMTransform(local_client)))
+
+    with ThreadPoolExecutor(max_workers=4) as units:
+        output = transform_document(source, "cours.txt", tmp_path, transform_block, executor=units)
+
+    assert output.read_text(encoding="utf-8").split("\n\n")[:4] == [" ".join(text.split()) for text in paragraphs]
+    assert sum(len(batch) for batch in LOCAL.calls) == 4
+    assert len(LOCAL.calls) < 4
@@ -0,0 +1,84 @@
+import asyncio
+from datetime import datetime
+from unittest.mock import AsyncMock, Mock
+
+import pytest
+
+from app.services.metadata import MetadataRepository
+
+
+@pytest.fixture
+def postgrest():
+    client = Mock()
+    client.from_().update().in_().execute = AsyncMock()
+    client.from_().update().in_().execute.return_value.data = []
+    client.from_().update().eq().execute = AsyncMock()
+    client.from_().update().eq().execute.return_value.data = []
+    client.from_.reset_mock()
+    return client
+
+
+def updates(postgrest):
+    """(valeurs, identifiants) de chaque requête envoyée."""
+    query = postgrest.from_.return_value.update
+    return [
+        (values.args[0], ids.args[1])
+        for values, ids in zip(query.call_args_list, query.return_value.in_.call_args_list)
+    ]
+
+
+async def test_status_writes_are_coalesced_by_file_and_by_status(postgrest):
+    repository = MetadataRepository(postgrest, asyncio.Semaphore(4), flush_interval=60)
+
+    await repository.update("1", {"status": "uploaded"})
+    await repository.update("1", {"status": "processing"})
+    await repository.update("2", {"status": "processing"})
+    await repository.update("3", {"status": "failed"})
+
+    assert repository.pending("1") == {"status": "processing"}
+    assert await repository.flush() == 3
+
+    assert updates(postgrest) == [({"status": "processing"}, ["1", "2"]), ({"status": "failed"}, ["3"])]
+    assert repository.pending("1") is None
+
+
+async def test_processed_file_is_written_at_once_with_its_own_columns(postgrest):
+    repository = MetadataRepository(postgrest, asyncio.Semaphore(4), flush_interval=60)
+
+    await repository.update("3", {"status": "processing"})
+    await repository.update("3", {"status": "processed", "transformed_file_path": "transformed/3.txt"})
+
+    query = postgrest.from_.return_value.update
+    values = query.call_args.args[0]
+    assert values["transformed_file_path"] == "transformed/3.txt"
+    assert datetime.fromisoformat(values["processed_at"]) <= datetime.now()
+    query.return_value.eq.assert_called_with("id", "3")
+    assert repository.pending("3") is None
+    assert await repository.flush() == 0
+
+
+async def test_flush_interval_bounds_the_delay(postgrest):
+    repository = MetadataRepository(postgrest, asyncio.Semaphore(4), flush_interval=0.01)
+
+    await repository.update("1", {"status": "processing"})
+    await asyncio.sleep(0.05)
+
+    assert len(updates(postgrest)) == 1
+    await repository.close()
+
+
+async def test_failed_writes_are_retried_and_flushed_on_close(postgrest):
+    execute = postgrest.from_().update().in_().execute
+    execute.side_effect = [Exception("Supabase indisponible"), Mock(data=[{"id": "1", "status": "failed"}])]
+    postgrest.from_.reset_mock()
+    written = []
+    repository = MetadataRepository(postgrest, asyncio.Semaphore(4), flush_interval=60, on_written=written.append)
+
+    await repository.update("1", {"status": "failed"})
+    assert await repository.flush() == 0
+    assert repository.pending("1") == {"status": "failed"}
+
+    await repository.close()
+
+    assert written == [{"id": "1", "status": "failed"}]
+    assert repository.pending("1") is None
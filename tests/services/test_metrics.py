@@ -0,0 +1,59 @@
+from app.services.metrics import Registry
+
+
+def test_histogram_renders_cumulative_buckets():
+    registry = Registry()
+    histogram = registry.histogram("todys_test_seconds", "Test", ("kind",), buckets=(0.1, 1.0))
+
+    for value in (0.05, 0.5, 2.0):
+        histogram.observe(value, kind="a")
+
+    lines = registry.render().splitlines()
+    assert lines[:2] == ["# HELP todys_test_seconds Test", "# TYPE todys_test_seconds histogram"]
+    assert 'todys_test_seconds_bucket{kind="a",le="0.1"} 1' in lines
+    assert 'todys_test_seconds_bucket{kind="a",le="1"} 2' in lines
+    assert 'todys_test_seconds_bucket{kind="a",le="+Inf"} 3' in lines
+    assert 'todys_test_seconds_sum{kind="a"} 2.55' in lines
+    assert 'todys_test_seconds_count{kind="a"} 3' in lines
+
+
+async def test_timer_works_as_context_manager_and_decorator():
+    registry = Registry()
+    histogram = registry.histogram("todys_test_seconds", "Test")
+
+    @histogram.time()
+    def compute():
+        return 1
+
+    @histogram.time()
+    async def fetch():
+        return 2
+
+    with histogram.time():
+        pass
+
+    assert compute() == 1
+    assert await fetch() == 2
+    assert "todys_test_seconds_count 3" in registry.render()
+
+
+def test_disabled_registry_records_nothing():
+    registry = Registry(enabled=False)
+    histogram = registry.histogram("todys_test_seconds", "Test")
+    counter = registry.counter("todys_test_total", "Test")
+
+    with histogram.time():
+        counter.inc()
+
+    samples = [line for line in registry.render().splitlines() if not line.startswith("#")]
+    assert samples == []
+
+
+def test_gauge_reads_callback_at_render():
+    registry = Registry()
+    depth = [3]
+    registry.gauge("todys_test_depth", "Test", function=lambda: depth[0])
+
+    depth[0] = 7
+
+    assert "todys_test_depth 7" in registry.render()
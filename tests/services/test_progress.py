@@ -0,0 +1,59 @@
+import asyncio
+
+from app.services.progress import ProgressBroker, ProgressEvent, Stage
+
+
+async def collect(broker, file_id, into):
+    async for event in broker.subscribe(file_id):
+        into.append(event)
+
+
+async def test_events_are_fanned_out_until_final():
+    broker = ProgressBroker()
+    first, second = [], []
+    listeners = [asyncio.create_task(collect(broker, "1", first)), asyncio.create_task(collect(broker, "1", second))]
+    await asyncio.sleep(0)
+    assert broker.subscriber_count("1") == 2
+
+    broker.publish(ProgressEvent("1", Stage.TRANSFORMING, done=1))
+    broker.publish(ProgressEvent("2", Stage.TRANSFORMING, done=5))
+    broker.publish(ProgressEvent("1", Stage.READY))
+    await asyncio.wait_for(asyncio.gather(*listeners), timeout=1)
+
+    assert [event.stage for event in first] == [Stage.TRANSFORMING, Stage.READY]
+    assert first == second
+    assert broker.subscriber_count("1") == 0
+
+
+async def test_late_subscriber_gets_last_event_first():
+    broker = ProgressBroker()
+    broker.publish(ProgressEvent("1", Stage.UPLOADED))
+    broker.publish(ProgressEvent("1", Stage.READY))
+
+    events = []
+    await asyncio.wait_for(collect(broker, "1", events), timeout=1)
+
+    assert [event.stage for event in events] == [Stage.READY]
+
+
+async def test_slow_subscriber_keeps_latest_events():
+    broker = ProgressBroker(subscriber_buffer=2)
+    events = []
+    listener = asyncio.create_task(collect(broker, "1", events))
+    await asyncio.sleep(0)
+
+    for done in range(1, 6):
+        broker.publish(ProgressEvent("1", Stage.TRANSFORMING, done=done))
+    broker.publish(ProgressEvent("1", Stage.READY))
+    await asyncio.wait_for(listener, timeout=1)
+
+    assert [(event.stage, event.done) for event in events] == [(Stage.TRANSFORMING, 5), (Stage.READY, None)]
+
+
+async def test_heartbeat_yields_none():
+    broker = ProgressBroker()
+    events = broker.subscribe("1", heartbeat=0.01)
+
+    assert await events.__anext__() is None
+    await events.aclose()
+    assert broker.subscriber_count("1") == 0
@@ -0,0 +1,66 @@
+import pytest
+
+from app.services.signatures import Signature, SignatureScanner, get_scanner, load_signatures
+
+
+@pytest.fixture
+def scanner():
+    return SignatureScanner([
+        Signature("php_code", b"<?php"),
+        Signature("php_short", b"<?="),
+        Signature("shell_script", b"#!/"),
+        Signature("eicar_test", b"X5O!P%@AP[4\\PZX54(P^)7CC)7}$"),
+    ])
+
+def test_scan_reports_matching_rule(scanner):
+    match = scanner.scan(b"du texte <?= $x ?> et plus")
+
+    assert match.signature.name == "php_short"
+    assert match.offset == 9
+
+def test_scan_clean_content(scanner):
+    assert scanner.scan(b"Le petit chat dort. <?xml version='1.0'?>") is None
+
+def test_stream_detects_match_straddling_chunks(scanner):
+    scan = scanner.stream()
+
+    assert scan.feed(b"a" * 100 + b"X5O!P%@AP") is None
+    match = scan.feed(b"[4\\PZX54(P^)7CC)7}$ fin")
+
+    assert match.signature.name == "eicar_test"
+    assert match.offset == 100
+
+def test_stream_offsets_are_absolute(scanner):
+    scan = scanner.stream()
+    scan.feed(b"x" * 50)
+    match = scan.feed(b"yy#!/bin/sh")
+
+    assert match.offset == 52
+
+def test_scan_handles_many_rules():
+    rules = [Signature(f"rule_{i}", f"MOTIF-{i:04d}".encode()) for i in range(500)]
+    scanner = SignatureScanner(rules)
+
+    match = scanner.scan(b"." * 10000 + b"MOTIF-0421" + b"." * 10)
+
+    assert match.signature.name == "rule_421"
+
+def test_load_signatures_file(tmp_path):
+    path = tmp_path / "rules.txt"
+    path.write_text("# commentaire\n\nnul = \\x00\\x01\nphp = <?php\n", encoding="utf-8")
+
+    signatures = load_signatures(path)
+
+    assert signatures == [Signature("nul", b"\x00\x01"), Signature("php", b"<?php")]
+
+def test_load_signatures_rejects_malformed_line(tmp_path):
+    path = tmp_path / "rules.txt"
+    path.write_text("sans motif\n", encoding="utf-8")
+
+    with pytest.raises(ValueError):
+        load_signatures(path)
+
+def test_default_signatures_include_eicar():
+    match = get_scanner().scan(b"X5O!P%@AP[4\\PZX54(P^)7CC)7}$EICAR")
+
+    assert match.signature.name == "eicar_test"
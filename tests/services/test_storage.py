@@ -0,0 +1,90 @@
+import pytest
+
+from app.services.storage import LocalStorage, parse_range
+from app.services.supabase_service import SupabaseService
+
+
+async def chunks(*parts):
+    for part in parts:
+        yield part
+
+
+async def read(response):
+    try:
+        return b"".join([chunk async for chunk in response.aiter_raw()])
+    finally:
+        await response.aclose()
+
+
+async def test_local_put_is_atomic_and_replaces(tmp_path):
+    storage = LocalStorage(tmp_path)
+
+    await storage.put("transformed/1.txt", chunks(b"premiere ", b"version"), "text/plain")
+    await storage.put("transformed/1.txt", chunks(b"seconde"), "text/plain")
+
+    assert (tmp_path / "transformed" / "1.txt").read_bytes() == b"seconde"
+    # Aucun fichier temporaire ne reste après l'écriture
+    assert [path.name for path in (tmp_path / "transformed").iterdir()] == ["1.txt"]
+
+
+async def test_failed_put_leaves_previous_object(tmp_path):
+    storage = LocalStorage(tmp_path)
+    await storage.put("a.txt", chunks(b"intact"), "text/plain")
+
+    async def broken():
+        yield b"partiel"
+        raise ConnectionError("client parti")
+
+    with pytest.raises(ConnectionError):
+        await storage.put("a.txt", broken(), "text/plain")
+
+    assert (tmp_path / "a.txt").read_bytes() == b"intact"
+    assert [path.name for path in tmp_path.iterdir()] == ["a.txt"]
+
+
+async def test_local_open_serves_full_and_partial_content(tmp_path):
+    storage = LocalStorage(tmp_path)
+    await storage.put("doc.txt", chunks(b"0123456789"), "text/plain")
+
+    full = await storage.open("doc.txt")
+    assert full.status_code == 200 and full.headers["content-length"] == "10"
+    assert await read(full) == b"0123456789"
+
+    partial = await storage.open("doc.txt", "bytes=2-4")
+    assert partial.status_code == 206 and partial.headers["content-range"] == "bytes 2-4/10"
+    assert await read(partial) == b"234"
+
+    assert (await storage.open("doc.txt", "bytes=20-")).status_code == 416
+    assert (await storage.open("absent.txt")).status_code == 404
+
+
+def test_parse_range_forms():
+    assert parse_range("bytes=0-", 10) == (0, 10)
+    assert parse_range("bytes=-3", 10) == (7, 10)
+    assert parse_range("bytes=5-100", 10) == (5, 10)
+    assert parse_range("bytes=10-", 10) is None
+    assert parse_range("bytes=-", 10) is None
+
+
+async def test_local_remove_download_and_path_checks(tmp_path):
+    storage = LocalStorage(tmp_path / "bucket")
+    await storage.put("a.pdf", chunks(b"a"), "application/pdf")
+
+    copy = await storage.download_to("a.pdf", tmp_path / "copy.pdf")
+    assert copy.read_bytes() == b"a"
+    assert await storage.remove(["a.pdf", "absent.pdf"]) == 1
+
+    with pytest.raises(ValueError):
+        storage.path_of("../copy.pdf")
+
+
+async def test_supabase_service_uploads_to_local_storage(mock_supabase, mock_file, tmp_path):
+    service = SupabaseService(objects=LocalStorage(tmp_path))
+    mock_supabase.table().select().eq().gt().limit().execute.return_value.data = []
+    mock_supabase.table().insert().execute.return_value.data = [{"id": "123"}]
+
+    result = await service.upload_file(mock_file)
+
+    assert (tmp_path / result["file_path"]).read_bytes() == b"%PDF-1.4 test content"
+    assert result["file_url"] == "/api/download/123"
+    mock_supabase.storage.session.post.assert_not_called()
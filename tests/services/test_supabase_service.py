@@ -1,4 +1,10 @@
+import hashlib
+from datetime import datetime, timedelta
+from io import BytesIO
+from unittest.mock import AsyncMock, Mock
+
 import pytest
+from fastapi import UploadFile
 
 from app.services.supabase_service import SupabaseService
 
@@ -9,8 +15,9 @@ def supabase_service(mock_supabase):
 
 async def test_upload_file_success(supabase_service, mock_supabase, mock_file):
     # Configure mock
-    mock_supabase.storage.from_().upload.return_value = {"Key": "test.pdf"}
+    mock_supabase.storage.session.post.return_value.status_code = 200
     mock_supabase.storage.from_().get_public_url.return_value = "http://test.url/test.pdf"
+    mock_supabase.table().select().eq().gt().limit().execute.return_value.data = []
     mock_supabase.table().insert().execute.return_value.data = [{"id": "123"}]
 
     # Test
@@ -23,10 +30,170 @@ async def test_upload_file_success(supabase_service, mock_supabase, mock_file):
 
 async def test_upload_file_failure(supabase_service, mock_supabase, mock_file):
     # Simuler une erreur
-    mock_supabase.storage.from_().upload.side_effect = Exception("Upload failed")
+    mock_supabase.table().select().eq().gt().limit().execute.return_value.data = []
+    mock_supabase.storage.session.post.side_effect = Exception("Upload failed")
 
     # Test
     with pytest.raises(Exception) as exc_info:
         await supabase_service.upload_file(mock_file)
 
     assert "Upload failed" in str(exc_info.value)
+
+async def test_upload_file_streams_chunks(supabase_service, mock_supabase, mock_file):
+    sent = []
+
+    async def fake_post(url, content, headers):
+        sent.extend([chunk async for chunk in content])
+        return Mock(status_code=200)
+
+    mock_supabase.storage.session.post.side_effect = fake_post
+    mock_supabase.table().select().eq().gt().limit().execute.return_value.data = []
+    mock_supabase.table().insert().execute.return_value.data = [{"id": "123"}]
+
+    await supabase_service.upload_file(mock_file)
+
+    assert b"".join(sent) == b"%PDF-1.4 test content"
+    url = mock_supabase.storage.session.post.call_args.args[0]
+    assert url == f"/object/temp_files/{hashlib.sha256(b'%PDF-1.4 test content').hexdigest()}.pdf"
+
+async def test_update_file_status(supabase_service, mock_supabase):
+    mock_supabase.table().update().in_().execute = AsyncMock()
+    mock_supabase.table().update().eq().execute = AsyncMock()
+    mock_supabase.table().update().eq().execute.return_value.data = [{"id": "123", "status": "processed"}]
+    mock_supabase.table().select().eq().limit().execute = AsyncMock()
+    mock_supabase.table().select().eq().limit().execute.return_value.data = [{"id": "123", "status": "uploaded"}]
+
+    await supabase_service.update_file_status("123", "processing")
+
+    # Visible avant d'être écrit, avec le lot suivant
+    assert (await supabase_service.get_file("123"))["status"] == "processing"
+    mock_supabase.table().update().in_().execute.assert_not_awaited()
+
+    await supabase_service.update_file_status("123", "processed", "out/test.pdf")
+
+    update_data = mock_supabase.table().update.call_args.args[0]
+    mock_supabase.table().update().eq().execute.assert_awaited_once()
+    assert update_data["status"] == "processed"
+    assert update_data["transformed_file_path"] == "out/test.pdf"
+    assert "processed_at" in update_data
+
+async def test_upload_file_reuses_identical_content(supabase_service, mock_supabase, mock_file):
+    content_hash = hashlib.sha256(b"%PDF-1.4 test content").hexdigest()
+    expires_at = (datetime.now() + timedelta(hours=12)).isoformat()
+    mock_supabase.table().select().eq().gt().limit().execute.return_value.data = [{
+        "id": "42",
+        "content_hash": content_hash,
+        "original_file_path": f"{content_hash}.pdf",
+        "status": "processed",
+        "transformed_file_path": "out/42.pdf",
+        "expires_at": expires_at
+    }]
+
+    first = await supabase_service.upload_file(mock_file)
+    second = await supabase_service.upload_file(mock_file)
+
+    # Ni upload ni insertion, et une seule requête grâce au cache local
+    assert first["id"] == second["id"] == "42"
+    assert second["deduplicated"] is True
+    assert second["transformed_file_path"] == "out/42.pdf"
+    mock_supabase.storage.session.post.assert_not_called()
+    mock_supabase.table().insert().execute.assert_not_called()
+    assert mock_supabase.table().select().eq().gt().limit().execute.await_count == 1
+
+async def test_reused_file_close_to_expiry_is_extended(supabase_service, mock_supabase, mock_file):
+    content_hash = hashlib.sha256(b"%PDF-1.4 test content").hexdigest()
+    row = {
+        "id": "42",
+        "content_hash": content_hash,
+        "original_file_path": f"{content_hash}.pdf",
+        "status": "uploaded",
+        "expires_at": (datetime.now() + timedelta(minutes=5)).isoformat()
+    }
+    extended = (datetime.now() + timedelta(days=1)).isoformat()
+    mock_supabase.table().select().eq().gt().limit().execute.return_value.data = [row]
+    mock_supabase.table().update().eq().gt().execute = AsyncMock()
+    mock_supabase.table().update().eq().gt().execute.return_value.data = [{**row, "expires_at": extended}]
+
+    result = await supabase_service.upload_file(mock_file)
+
+    assert result["id"] == "42"
+    update_data = mock_supabase.table().update.call_args[0][0]
+    assert datetime.fromisoformat(update_data["expires_at"]) > datetime.now() + timedelta(hours=23)
+    mock_supabase.storage.session.post.assert_not_called()
+
+async def test_reused_file_expired_meanwhile_is_uploaded_again(supabase_service, mock_supabase, mock_file):
+    content_hash = hashlib.sha256(b"%PDF-1.4 test content").hexdigest()
+    mock_supabase.table().select().eq().gt().limit().execute.return_value.data = [{
+        "id": "42",
+        "content_hash": content_hash,
+        "original_file_path": f"{content_hash}.pdf",
+        "status": "uploaded",
+        "expires_at": (datetime.now() + timedelta(minutes=5)).isoformat()
+    }]
+    mock_supabase.table().update().eq().gt().execute = AsyncMock()
+    mock_supabase.table().update().eq().gt().execute.return_value.data = []
+    mock_supabase.storage.session.post.return_value.status_code = 200
+    mock_supabase.table().insert().execute.return_value.data = [{"id": "43"}]
+
+    result = await supabase_service.upload_file(mock_file)
+
+    # La ligne a expiré entre-temps : nouvel enregistrement plutôt que réutilisation
+    assert result["id"] == "43"
+    assert result["deduplicated"] is False
+    mock_supabase.table().insert().execute.assert_awaited_once()
+
+async def test_cache_honours_expiry(supabase_service):
+    expired = (datetime.now() - timedelta(seconds=1)).isoformat()
+    supabase_service._remember({"id": "1", "content_hash": "abc", "expires_at": expired})
+
+    assert supabase_service._hash_cache.get("abc") is None
+
+def make_upload(filename, content):
+    file = Mock(spec=UploadFile)
+    file.filename = filename
+    file.content_type = "text/plain"
+    file.file = BytesIO(content)
+
+    async def read(size=-1):
+        return file.file.read(size)
+
+    async def seek(position):
+        file.file.seek(position)
+
+    file.read = read
+    file.seek = seek
+    return file
+
+async def test_upload_files_bulk_inserts_and_dedupes_within_batch(supabase_service, mock_supabase):
+    mock_supabase.storage.session.post.return_value.status_code = 200
+    mock_supabase.table().select().in_().gt().execute = AsyncMock()
+    mock_supabase.table().select().in_().gt().execute.return_value.data = []
+    mock_supabase.table().insert().execute.return_value.data = [{"id": "1"}, {"id": "2"}]
+
+    files = [make_upload("a.txt", b"aaa"), make_upload("b.txt", b"bbb"), make_upload("copie.txt", b"aaa")]
+    results = await supabase_service.upload_files([(f, None) for f in files])
+
+    assert [r["id"] for r in results] == ["1", "2", "1"]
+    assert [r["deduplicated"] for r in results] == [False, False, True]
+    assert mock_supabase.storage.session.post.await_count == 2
+    inserted = mock_supabase.table().insert.call_args.args[0]
+    assert len(inserted) == 2
+    assert mock_supabase.table().insert().execute.await_count == 1
+
+async def test_upload_files_isolates_failures(supabase_service, mock_supabase):
+    async def post(url, content, headers):
+        if url.endswith(".pdf"):
+            raise Exception("storage indisponible")
+        return Mock(status_code=200)
+
+    mock_supabase.storage.session.post.side_effect = post
+    mock_supabase.table().select().in_().gt().execute = AsyncMock()
+    mock_supabase.table().select().in_().gt().execute.return_value.data = []
+    mock_supabase.table().insert().execute.return_value.data = [{"id": "1"}]
+
+    files = [make_upload("a.txt", b"aaa"), make_upload("b.pdf", b"bbb")]
+    results = await supabase_service.upload_files([(f, None) for f in files])
+
+    assert results[0]["id"] == "1"
+    assert isinstance(results[1], Exception)
+    assert "storage indisponible" in str(results[1])
@@ -0,0 +1,119 @@
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import AsyncMock
+
+import pytest
+
+from app.services.job_queue import Job
+from app.services.progress import ProgressBroker, Stage
+from app.services.supabase_service import SupabaseService
+from app.services.transformation import LiveOutput, TransformCancelled, TransformationService, run_in_worker
+
+
+@pytest.fixture
+def bucket():
+    return {"abc.txt": b"Premier paragraphe.\n\nSecond paragraphe.\n"}
+
+
+@pytest.fixture
+def supabase_service(bucket):
+    service = AsyncMock(spec=SupabaseService)
+
+    async def download_to(file_path, destination):
+        destination.write_bytes(bucket[file_path])
+        return destination
+
+    async def upload_transformed(file_id, source):
+        file_path = f"transformed/{file_id}{source.suffix}"
+        bucket[file_path] = source.read_bytes()
+        return file_path
+
+    service.download_to.side_effect = download_to
+    service.upload_transformed.side_effect = upload_transformed
+    service.find_previous_version.return_value = None
+    return service
+
+
+async def test_run_drives_status_to_processed(supabase_service, bucket):
+    events = []
+    broker = ProgressBroker()
+    broker.publish = events.append
+    # Pool de processus par défaut : l'avancement revient du processus qui transforme
+    service = TransformationService(supabase_service, broker=broker)
+    job = Job(file_id="123", payload={"file_path": "abc.txt", "file_name": "fiche.txt"})
+
+    try:
+        result = await service.run(job)
+    finally:
+        service.shutdown()
+
+    assert result == "transformed/123.txt"
+    assert job.progress == 1
+    assert bucket[result] == "Premier paragraphe.\n\nSecond paragraphe.\n\n".encode()
+    statuses = [call.args[1] for call in supabase_service.update_file_status.await_args_list]
+    assert statuses == ["processing", "processed"]
+    # Sans version précédente désignée, aucun autre document n'est consulté
+    supabase_service.find_previous_version.assert_not_awaited()
+    fingerprints = supabase_service.update_file_status.await_args.kwargs["block_fingerprints"]
+    assert len(fingerprints) == 2
+    assert [(event.stage, event.done, event.total) for event in events] == [
+        (Stage.EXTRACTING, None, None),
+        (Stage.TRANSFORMING, 1, None),
+        (Stage.TRANSFORMING, 1, 1),
+        (Stage.READY, 1, 1),
+    ]
+
+
+async def test_new_version_only_transforms_changed_blocks(supabase_service, bucket):
+    transformed = []
+
+    def shout(block):
+        transformed.append(block.text)
+        return block.text.upper()
+
+    executor = ThreadPoolExecutor(max_workers=2)
+    service = TransformationService(supabase_service, executor=executor, transform_block=shout, unit_threads=2)
+    await service.run(Job(file_id="1", payload={"file_path": "abc.txt", "file_name": "fiche.txt"}))
+    supabase_service.find_previous_version.return_value = {"id": "1", "block_fingerprints": ["..."]}
+
+    bucket["def.txt"] = b"Premier paragraphe.\n\nSecond paragraphe corrige.\n"
+    transformed.clear()
+    try:
+        result = await service.run(Job(
+            file_id="2", payload={"file_path": "def.txt", "file_name": "fiche.txt", "previous_id": "1"}
+        ))
+    finally:
+        service.shutdown()
+
+    assert transformed == ["Second paragraphe corrige."]
+    assert bucket[result] == "PREMIER PARAGRAPHE.\n\nSECOND PARAGRAPHE CORRIGE.\n\n".encode()
+    supabase_service.find_previous_version.assert_awaited_with("1", "2")
+
+
+async def test_follow_stops_when_transformation_ends_without_document(tmp_path):
+    finished = LiveOutput(tmp_path / "vide.txt")
+    finished.finish()
+    failed = LiveOutput(tmp_path / "echec.txt")
+    failed.finish(failed=True)
+
+    assert [chunk async for chunk in finished.follow()] == []
+    with pytest.raises(RuntimeError):
+        [chunk async for chunk in failed.follow()]
+
+
+def test_worker_stops_at_next_unit_once_cancelled(tmp_path):
+    cancel_flag = tmp_path / "cancelled"
+    reported = []
+
+    def transform(progress):
+        progress(1, 3)
+        cancel_flag.touch()
+        progress(2, 3)
+        progress(3, 3)
+
+    with pytest.raises(TransformCancelled):
+        run_in_worker(transform, progress=lambda done, total: reported.append(done), cancel_flag=cancel_flag)
+    # Une transformation abandonnée avant son démarrage ne commence pas
+    with pytest.raises(TransformCancelled):
+        run_in_worker(lambda progress: pytest.fail("démarrée"), progress=reported.append, cancel_flag=cancel_flag)
+
+    assert reported == [1]
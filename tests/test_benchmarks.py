@@ -0,0 +1,35 @@
+from benchmarks.documents import KB, MB, make_text, parse_size
+from benchmarks.report import compare, percentile
+
+
+def test_percentile_interpolates_like_numpy():
+    values = [4.0, 1.0, 3.0, 2.0]
+
+    assert percentile(values, 50) == 2.5
+    assert percentile(values, 100) == 4.0
+    assert percentile([], 95) == 0.0
+
+
+def test_documents_have_exact_size_and_are_reproducible():
+    for size in (KB, 100 * KB + 1, MB):
+        assert len(make_text(size)) == size
+    assert make_text(KB, seed=1) == make_text(KB, seed=1)
+    assert parse_size("10MB") == 10 * MB
+
+
+def test_compare_reports_only_regressions_beyond_tolerance():
+    baseline = {"cases": [
+        {"case": "upload/1KB", "p95_ms": 100.0, "throughput_rps": 50.0},
+        {"case": "upload/1MB", "p95_ms": 100.0},
+    ]}
+    current = {"cases": [
+        {"case": "upload/1KB", "p95_ms": 105.0, "throughput_rps": 40.0},
+        {"case": "upload/1MB", "p95_ms": 130.0},
+        {"case": "upload/10MB", "p95_ms": 900.0},
+    ]}
+
+    regressions = compare(current, baseline, tolerance=0.10)
+
+    assert len(regressions) == 2
+    assert regressions[0].startswith("upload/1KB throughput_rps")
+    assert regressions[1].startswith("upload/1MB p95_ms")
@@ -0,0 +1,176 @@
+from unittest.mock import AsyncMock, Mock, patch
+
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+
+from app.dependencies import get_supabase_service, get_transformation_service
+from app.main import app
+from app.routes.download import LocalFileResponse, transformed_etag
+from app.services.supabase_service import SupabaseService
+from app.services.transformation import LiveOutput, TransformationService
+
+client = TestClient(app)
+
+RECORD = {
+    "id": "123",
+    "file_name": "fiche.docx",
+    "status": "processed",
+    "content_hash": "ab" * 32,
+    "processed_at": "2025-01-01T10:00:00",
+    "transformed_file_path": "transformed/123.txt",
+}
+
+
+@pytest.fixture
+def supabase_service():
+    service = AsyncMock(spec=SupabaseService)
+    service.get_file.return_value = RECORD
+    # Stockage distant par défaut : le document est relayé depuis open_object
+    service.local_path = Mock(return_value=None)
+    return service
+
+
+@pytest.fixture
+def transformation_service():
+    service = Mock(spec=TransformationService)
+    service.live_output.return_value = None
+    return service
+
+
+@pytest.fixture(autouse=True)
+def services(supabase_service, transformation_service):
+    with patch.dict(app.dependency_overrides, {
+        get_supabase_service: lambda: supabase_service,
+        get_transformation_service: lambda: transformation_service,
+    }):
+        yield
+
+
+def storage_response(status_code=200, content=b"Texte transforme", headers=None):
+    return httpx.Response(status_code, stream=httpx.ByteStream(content), headers=headers)
+
+
+def test_download_streams_transformed_file(supabase_service):
+    supabase_service.open_object.return_value = storage_response()
+
+    response = client.get("/api/download/123")
+
+    assert response.status_code == 200
+    assert response.content == b"Texte transforme"
+    assert response.headers["etag"] == transformed_etag(RECORD)
+    assert response.headers["content-type"] == "text/plain; charset=utf-8"
+    assert "fiche.txt" in response.headers["content-disposition"]
+    supabase_service.open_object.assert_awaited_once_with("transformed/123.txt", None)
+
+
+def test_matching_etag_returns_304_without_storage_call(supabase_service):
+    response = client.get("/api/download/123", headers={"If-None-Match": transformed_etag(RECORD)})
+
+    assert response.status_code == 304
+    assert response.content == b""
+    supabase_service.open_object.assert_not_awaited()
+
+
+def test_range_request_is_forwarded_to_storage(supabase_service):
+    supabase_service.open_object.side_effect = lambda path, byte_range: storage_response(
+        206, b"Texte", {"content-range": "bytes 0-4/16", "content-length": "5"}
+    )
+
+    response = client.get("/api/download/123", headers={"Range": "bytes=0-4"})
+    # Une plage demandée pour une autre version du document est ignorée
+    client.get("/api/download/123", headers={"Range": "bytes=0-4", "If-Range": '"autre"'})
+
+    assert response.status_code == 206
+    assert response.content == b"Texte"
+    assert response.headers["content-range"] == "bytes 0-4/16"
+    assert [call.args[1] for call in supabase_service.open_object.await_args_list] == ["bytes=0-4", None]
+
+
+def test_pending_transformation_returns_202(supabase_service):
+    supabase_service.get_file.return_value = {**RECORD, "status": "uploaded", "transformed_file_path": None}
+
+    response = client.get("/api/download/123")
+
+    assert response.status_code == 202
+    assert response.headers["retry-after"] == "2"
+
+
+def test_running_transformation_is_streamed_progressively(tmp_path, transformation_service):
+    live = LiveOutput(tmp_path / "fiche.txt")
+    live.path.write_text("Page 1\n\n", encoding="utf-8")
+
+    original_follow = live.follow
+
+    async def follow(chunk_size):
+        document = original_follow(chunk_size)
+        yield await document.__anext__()
+        # La suite est écrite pendant l'envoi
+        with live.path.open("a", encoding="utf-8") as output:
+            output.write("Page 2\n\n")
+        live.finish()
+        async for chunk in document:
+            yield chunk
+
+    transformation_service.live_output.return_value = live
+    with patch.object(live, "follow", follow):
+        response = client.get("/api/download/123")
+
+    assert response.status_code == 200
+    assert response.text == "Page 1\n\nPage 2\n\n"
+    assert response.headers["cache-control"] == "no-store"
+
+
+def test_download_rendered_format(supabase_service):
+    supabase_service.open_object.return_value = storage_response(content=b"%PDF-1.7")
+
+    response = client.get("/api/download/123?format=pdf")
+    unknown = client.get("/api/download/123?format=exe")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/pdf"
+    assert "fiche.pdf" in response.headers["content-disposition"]
+    assert response.headers["etag"] != transformed_etag(RECORD)
+    supabase_service.open_object.assert_awaited_once_with("transformed/123.pdf", None)
+    assert unknown.status_code == 404
+
+
+def test_local_storage_is_served_from_disk(tmp_path, supabase_service):
+    document = tmp_path / "123.txt"
+    document.write_bytes(b"Texte transforme")
+    supabase_service.local_path.return_value = document
+
+    response = client.get("/api/download/123")
+    partial = client.get("/api/download/123", headers={"Range": "bytes=0-4", "If-Range": transformed_etag(RECORD)})
+    stale = client.get("/api/download/123", headers={"Range": "bytes=0-4", "If-Range": '"autre"'})
+
+    assert response.status_code == 200
+    assert response.content == b"Texte transforme"
+    assert response.headers["etag"] == transformed_etag(RECORD)
+    assert "fiche.txt" in response.headers["content-disposition"]
+    assert (partial.status_code, partial.content, partial.headers["content-range"]) == (206, b"Texte", "bytes 0-4/16")
+    assert stale.status_code == 200
+    supabase_service.open_object.assert_not_awaited()
+
+
+async def test_local_file_is_handed_to_the_server_for_zero_copy(tmp_path):
+    document = tmp_path / "123.txt"
+    document.write_bytes(b"Texte transforme")
+    messages = []
+
+    async def send(message):
+        if message["type"] == "http.response.zerocopysend":
+            message = {**message, "file": message["file"].name}
+        messages.append(message)
+
+    scope = {
+        "type": "http", "method": "GET",
+        "headers": [(b"range", b"bytes=6-")],
+        "extensions": {"http.response.zerocopysend": {}},
+    }
+    await LocalFileResponse(document)(scope, None, send)
+
+    assert messages[0]["status"] == 206
+    assert messages[1] == {
+        "type": "http.response.zerocopysend", "file": str(document), "offset": 6, "count": 10, "more_body": False
+    }
@@ -0,0 +1,44 @@
+from unittest.mock import patch
+
+from fastapi.testclient import TestClient
+
+from app.dependencies import get_job_queue
+from app.main import app
+from app.services.job_queue import JobQueue, JobStatus
+
+client = TestClient(app)
+
+
+def make_queue():
+    queue = JobQueue(lambda job: None)
+    return queue
+
+def test_get_job_status():
+    queue = make_queue()
+    job = queue.submit("123")
+
+    with patch.dict(app.dependency_overrides, {get_job_queue: lambda: queue}):
+        response = client.get(f"/api/jobs/{job.id}")
+
+    assert response.status_code == 200
+    assert response.json()["status"] == "pending"
+    assert response.json()["finished"] is False
+
+def test_get_unknown_job():
+    with patch.dict(app.dependency_overrides, {get_job_queue: make_queue}):
+        response = client.get("/api/jobs/inconnu")
+
+    assert response.status_code == 404
+
+def test_fragment_polls_until_finished():
+    queue = make_queue()
+    job = queue.submit("123")
+
+    with patch.dict(app.dependency_overrides, {get_job_queue: lambda: queue}):
+        pending = client.get(f"/api/jobs/{job.id}/fragment")
+        queue._update(job, JobStatus.SUCCEEDED, result="transformed/123.pdf")
+        done = client.get(f"/api/jobs/{job.id}/fragment")
+
+    assert 'hx-trigger="every 2s"' in pending.text
+    assert "hx-trigger" not in done.text
+    assert "Document transformé" in done.text
@@ -0,0 +1,24 @@
+from unittest.mock import patch
+
+from fastapi.testclient import TestClient
+
+from app.main import app
+
+
+def test_metrics_exposes_request_durations_by_route():
+    client = TestClient(app)
+    client.get("/api/jobs/inconnu")
+
+    response = client.get("/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    assert 'route="/api/jobs/{job_id}",status="404"' in response.text
+    assert "todys_job_queue_depth" in response.text
+
+
+def test_metrics_can_be_disabled():
+    with patch("app.routes.metrics.registry.enabled", False):
+        response = TestClient(app).get("/metrics")
+
+    assert response.status_code == 404
@@ -0,0 +1,33 @@
+import json
+from unittest.mock import AsyncMock, patch
+
+from fastapi.testclient import TestClient
+
+from app.dependencies import get_progress_broker, get_supabase_service
+from app.main import app
+from app.services.progress import ProgressEvent, Stage
+
+client = TestClient(app)
+
+
+def read_events(response):
+    return [json.loads(line[len("data: "):]) for line in response.text.splitlines() if line.startswith("data: ")]
+
+
+def test_progress_stream_ends_with_ready_event():
+    get_progress_broker().publish(ProgressEvent("sse-1", Stage.READY, done=3, total=3))
+
+    response = client.get("/api/progress/sse-1")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    assert [(event["stage"], event["done"], event["total"]) for event in read_events(response)] == [("ready", 3, 3)]
+
+
+def test_progress_of_unknown_file_reads_status_once():
+    get_file = AsyncMock(return_value={"id": "sse-2", "status": "processed"})
+    with patch.object(get_supabase_service(), "get_file", get_file):
+        response = client.get("/api/progress/sse-2")
+
+    assert [event["stage"] for event in read_events(response)] == ["ready"]
+    get_file.assert_awaited_once_with("sse-2")
@@ -0,0 +1,134 @@
+import asyncio
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.middleware.rate_limit import MemoryBucketStore, RateLimitMiddleware
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def make_app(store, **options):
+    app = FastAPI()
+
+    @app.get("/api/ping")
+    async def ping():
+        return {"ok": True}
+
+    @app.post("/api/upload")
+    async def upload():
+        return {"ok": True}
+
+    @app.get("/api/jobs/{job_id}")
+    async def job(job_id: str):
+        return {"ok": True}
+
+    @app.get("/static/style.css")
+    async def static():
+        return {"ok": True}
+
+    app.add_middleware(RateLimitMiddleware, store=store, **options)
+    return app
+
+
+def test_token_bucket_rejects_bursts_with_retry_after():
+    clock = Clock()
+    client = TestClient(make_app(MemoryBucketStore(clock=clock), rate=1.0, capacity=2))
+
+    assert [client.get("/api/ping").status_code for _ in range(3)] == [200, 200, 429]
+    assert client.get("/api/ping").headers["Retry-After"] == "1"
+
+    clock.now += 1.0
+    assert client.get("/api/ping").status_code == 200
+    # Les chemins hors API ne sont pas limités
+    assert client.get("/static/style.css").status_code == 200
+
+
+def test_job_polling_is_exempted():
+    client = TestClient(make_app(
+        MemoryBucketStore(clock=Clock()), rate=1.0, capacity=1, exempt_prefixes=("/api/jobs/",)
+    ))
+
+    assert [client.get("/api/jobs/abc").status_code for _ in range(5)] == [200] * 5
+    assert [client.post("/api/upload").status_code for _ in range(2)] == [200, 429]
+
+
+def test_clients_have_separate_buckets():
+    client = TestClient(make_app(
+        MemoryBucketStore(clock=Clock()), rate=1.0, capacity=1, api_keys=("classe-a", "classe-b")
+    ))
+
+    assert client.get("/api/ping", headers={"X-API-Key": "classe-a"}).status_code == 200
+    assert client.get("/api/ping", headers={"X-API-Key": "classe-a"}).status_code == 429
+    assert client.get("/api/ping", headers={"X-API-Key": "classe-b"}).status_code == 200
+
+
+def test_unknown_api_keys_share_the_address_bucket():
+    client = TestClient(make_app(MemoryBucketStore(clock=Clock()), rate=1.0, capacity=1, api_keys=("classe-a",)))
+
+    # Une clé inventée à chaque requête ne donne pas de seau neuf
+    assert client.get("/api/ping", headers={"X-API-Key": "inventee-1"}).status_code == 200
+    assert client.get("/api/ping", headers={"X-API-Key": "inventee-2"}).status_code == 429
+    assert client.get("/api/ping").status_code == 429
+    assert client.get("/api/ping", headers={"X-API-Key": "classe-a"}).status_code == 200
+
+
+def test_uploads_are_shed_when_overloaded():
+    overloaded = {"value": False}
+    app = make_app(
+        MemoryBucketStore(), rate=100.0, capacity=100,
+        admission_paths=("/api/upload",), max_in_flight=4, is_overloaded=lambda: overloaded["value"]
+    )
+    client = TestClient(app)
+
+    assert client.post("/api/upload").status_code == 200
+    overloaded["value"] = True
+    response = client.post("/api/upload")
+
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "1"
+    assert client.get("/api/ping").status_code == 200
+
+
+async def test_in_flight_cap():
+    entered = asyncio.Event()
+    release = asyncio.Event()
+
+    async def slow_app(scope, receive, send):
+        entered.set()
+        await release.wait()
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b""})
+
+    middleware = RateLimitMiddleware(
+        slow_app, MemoryBucketStore(), rate=100.0, capacity=100,
+        admission_paths=("/api/upload",), max_in_flight=1
+    )
+    statuses = []
+
+    async def call():
+        scope = {"type": "http", "path": "/api/upload", "headers": [], "client": ("1.2.3.4", 1), "method": "POST"}
+
+        async def receive():
+            return {"type": "http.request", "body": b"", "more_body": False}
+
+        async def send(message):
+            if message["type"] == "http.response.start":
+                statuses.append(message["status"])
+
+        await middleware(scope, receive, send)
+
+    first = asyncio.create_task(call())
+    await entered.wait()
+    await call()
+    release.set()
+    await first
+
+    assert statuses == [503, 200]
+    assert middleware.in_flight == 0
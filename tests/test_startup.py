@@ -0,0 +1,36 @@
+import os
+import subprocess
+import sys
+from pathlib import Path
+from unittest.mock import patch
+
+from fastapi.testclient import TestClient
+
+from app import dependencies
+from app.main import app, settings
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+def test_import_creates_no_service():
+    script = (
+        "import app.main\n"
+        "from app import dependencies as d\n"
+        "print([p.__name__ for p in d.PROVIDERS if d.is_created(p)])\n"
+    )
+    result = subprocess.run([sys.executable, "-c", script], cwd=ROOT, env=os.environ.copy(),
+                            capture_output=True, text=True, check=True)
+
+    assert result.stdout.strip() == "[]"
+
+
+def test_warm_up_creates_services_during_lifespan():
+    with patch.object(settings, "WARM_UP", True), patch.object(settings, "CLEANUP_INTERVAL", 0):
+        with TestClient(app) as client:
+            assert dependencies.is_created(dependencies.get_file_validator)
+            assert dependencies.is_created(dependencies.get_transformation_service)
+            metrics = client.get("/metrics").text
+
+    assert not dependencies.is_created(dependencies.get_transformation_service)
+    startup = next(line for line in metrics.splitlines() if line.startswith("todys_startup_seconds "))
+    assert float(startup.split()[1]) > 0
@@ -0,0 +1,54 @@
+import re
+from pathlib import Path
+
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.static_assets import IMMUTABLE, CachedBody
+
+STATIC = Path("app/frontend/static")
+
+
+def test_home_page_links_versioned_assets_and_answers_304():
+    client = TestClient(app)
+
+    response = client.get("/")
+
+    assert response.status_code == 200
+    assert re.search(r'href="/static/css/styles\.[0-9a-f]{12}\.css"', response.text)
+    assert response.headers["cache-control"] == "no-cache"
+
+    repeat = client.get("/", headers={"If-None-Match": response.headers["etag"]})
+
+    assert repeat.status_code == 304
+    assert repeat.content == b""
+
+
+def test_versioned_asset_is_immutable_and_precompressed():
+    client = TestClient(app)
+    page = client.get("/").text
+    path = re.search(r'src="(/static/js/flowbite\.min\.[0-9a-f]{12}\.js)"', page).group(1)
+
+    response = client.get(path, headers={"Accept-Encoding": "gzip"})
+
+    assert response.status_code == 200
+    assert response.headers["cache-control"] == IMMUTABLE
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["vary"] == "Accept-Encoding"
+    assert response.content == (STATIC / "js/flowbite.min.js").read_bytes()
+
+    repeat = client.get(path, headers={"If-None-Match": response.headers["etag"]})
+    assert repeat.status_code == 304
+
+    # L'adresse d'origine reste servie, à revalider
+    assert client.get("/static/css/styles.css").headers["cache-control"] == "no-cache"
+
+
+def test_negotiation_honours_refused_encodings():
+    body = CachedBody.build(b"syllabe " * 512, "text/plain")
+    body.variants.pop("br", None)
+
+    assert body.negotiate("br, gzip;q=0.5") == "gzip"
+    assert body.negotiate("gzip;q=0, br") is None
+    assert body.negotiate("identity") is None
+    assert body.is_fresh(f'W/{body.etag("gzip")}')
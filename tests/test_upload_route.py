@@ -6,8 +6,9 @@ import pytest
 from fastapi.testclient import TestClient
 
 from app.config import get_settings
+from app.dependencies import get_job_queue, get_supabase_service
 from app.main import app
-from app.services.file_validator import ValidationResult
+from app.services.file_validator import CHUNK_SIZE, ValidationStream
 from app.services.supabase_service import SupabaseService
 
 client = TestClient(app)
@@ -17,18 +18,19 @@ logger = logging.getLogger(__name__)
 @pytest.mark.asyncio
 async def test_upload_success(mock_file):
     # Préparer les mocks
-    mock_validator = AsyncMock()
-    mock_validator.validate_file.return_value = ValidationResult(is_valid=True)
-
     mock_service = AsyncMock(spec=SupabaseService)
     mock_service.upload_file.return_value = {
         "file_name": "test.pdf",
+        "file_path": "abc.pdf",
         "file_url": "http://test.url/test.pdf",
+        "status": "uploaded",
         "id": "123"
     }
+    mock_queue = Mock()
+    mock_queue.submit.return_value.id = "job-1"
 
-    with patch('app.routes.upload.supabase_service', mock_service), \
-        patch('app.routes.upload.file_validator', mock_validator):
+    with patch.dict(app.dependency_overrides, {get_supabase_service: lambda: mock_service}), \
+        patch.dict(app.dependency_overrides, {get_job_queue: lambda: mock_queue}):
 
         # Créer un fichier test
         files = {
@@ -43,10 +45,35 @@ async def test_upload_success(mock_file):
         assert response.json()["success"] is True
         assert response.json()["filename"] == "test.pdf"
         assert response.json()["file_url"] == "http://test.url/test.pdf"
+        assert response.json()["job_id"] == "job-1"
 
-        # Vérifier que les mocks ont été appelés
-        mock_validator.validate_file.assert_called_once()
+        # Vérifier que le mock a été appelé avec la validation en flux
         mock_service.upload_file.assert_called_once()
+        assert isinstance(mock_service.upload_file.call_args.args[1], ValidationStream)
+        mock_queue.submit.assert_called_once_with("123", {"file_path": "abc.pdf", "file_name": "test.pdf"})
+
+def test_upload_names_the_version_it_replaces():
+    mock_service = AsyncMock(spec=SupabaseService)
+    mock_service.upload_file.return_value = {
+        "file_name": "test.txt",
+        "file_path": "abc.txt",
+        "file_url": "/api/download/abc.txt",
+        "status": "uploaded",
+        "id": "124"
+    }
+    mock_queue = Mock()
+    mock_queue.submit.return_value.id = "job-2"
+
+    with patch.dict(app.dependency_overrides, {get_supabase_service: lambda: mock_service,
+                                               get_job_queue: lambda: mock_queue}):
+        response = client.post(
+            "/api/upload", files={"file": ("test.txt", b"Bonjour.", "text/plain")}, data={"replaces": "123"}
+        )
+
+    assert response.status_code == 200
+    mock_queue.submit.assert_called_once_with(
+        "124", {"file_path": "abc.txt", "file_name": "test.txt", "previous_id": "123"}
+    )
 
 async def test_upload_validation_failure():
     # Créer un fichier invalide
@@ -61,22 +88,14 @@ async def test_upload_validation_failure():
     assert response.status_code == 400
     assert response.json()["detail"] == "Le fichier n'est pas valide"
 
-async def test_upload_file_too_large(mock_file):
-    # Préparer les mocks
-    mock_validator = AsyncMock()
-    mock_validator.validate_file.return_value = ValidationResult(is_valid=True)
-
-    # Patcher la fonction upload_file pour simuler un fichier trop volumineux
-    async def mock_get_size(*args, **kwargs):
-        return settings.MAX_UPLOAD_SIZE + 1024  # 1KB au-dessus de la limite
+async def test_upload_file_too_large():
+    mock_service = AsyncMock(spec=SupabaseService)
 
-    # Faire la requête avec le patch
-    with patch('app.routes.upload.get_upload_file_size', mock_get_size), \
-        patch('app.routes.upload.file_validator', mock_validator):
+    with patch.dict(app.dependency_overrides, {get_supabase_service: lambda: mock_service}):
 
-        # Créer un fichier test
+        # Créer un fichier test 1KB au-dessus de la limite
         files = {
-            "file": ("test.pdf", b"test content", "application/pdf")
+            "file": ("test.pdf", b"x" * (settings.MAX_UPLOAD_SIZE + 1024), "application/pdf")
         }
 
         # Faire la requête
@@ -86,6 +105,66 @@ async def test_upload_file_too_large(mock_file):
         logger.info(f"Response status: {response.status_code}")
         logger.info(f"Response body: {response.json() if response.status_code != 204 else 'No content'}")
 
-        # Vérifications
+        # Vérifications : rejet avant toute lecture du fichier
         assert response.status_code == 413
         assert response.json()["detail"] == f"Le fichier depasse la taille maximale de {settings.MAX_UPLOAD_SIZE / 1024 / 1024}MB"
+        mock_service.upload_file.assert_not_called()
+
+async def test_upload_malicious_content_rejected_while_streaming():
+    async def consume(file, stream):
+        while chunk := await file.read(CHUNK_SIZE):
+            await stream.feed(chunk)
+
+    mock_service = AsyncMock(spec=SupabaseService)
+    mock_service.upload_file.side_effect = consume
+
+    with patch.dict(app.dependency_overrides, {get_supabase_service: lambda: mock_service}):
+        files = {
+            "file": ("test.txt", b"a" * CHUNK_SIZE + b"<?php echo 1;", "text/plain")
+        }
+
+        response = client.post("/api/upload", files=files)
+
+        assert response.status_code == 400
+        assert response.json()["detail"] == "Le fichier n'est pas valide"
+
+async def test_upload_batch_reports_per_file_results():
+    async def upload_files(entries, max_parallel_uploads):
+        outcomes = []
+        for file, stream in entries:
+            if file.filename == "broken.txt":
+                outcomes.append(Exception("Erreur lors de l'upload: storage indisponible"))
+            else:
+                outcomes.append({
+                    "id": file.filename,
+                    "file_name": file.filename,
+                    "file_path": f"{file.filename}.hash",
+                    "file_url": f"http://test.url/{file.filename}",
+                    "status": "uploaded"
+                })
+        return outcomes
+
+    mock_service = AsyncMock(spec=SupabaseService)
+    mock_service.upload_files.side_effect = upload_files
+    mock_queue = Mock()
+    mock_queue.submit.return_value.id = "job-1"
+
+    with patch.dict(app.dependency_overrides, {get_supabase_service: lambda: mock_service}), \
+        patch.dict(app.dependency_overrides, {get_job_queue: lambda: mock_queue}):
+        files = [
+            ("files", ("a.txt", b"premier", "text/plain")),
+            ("files", ("virus.exe", b"MZ", "application/x-msdownload")),
+            ("files", ("broken.txt", b"second", "text/plain")),
+            ("files", ("b.pdf", b"troisieme", "application/pdf")),
+        ]
+
+        response = client.post("/api/upload/batch", files=files)
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body["success"] is False
+    assert [r["success"] for r in body["results"]] == [True, False, False, True]
+    assert body["results"][1]["error"] == "Extension .exe non autorisée"
+    assert body["results"][2]["error"] == "Erreur lors de l'upload: storage indisponible"
+    assert mock_queue.submit.call_count == 2
+    assert len(mock_service.upload_files.call_args.args[0]) == 3